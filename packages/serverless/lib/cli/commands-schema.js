@@ -412,6 +412,168 @@ commands.set('invoke local', {
       usage:
         'Arguments to docker run command. e.g. --docker-arg "-p 9229:9229"',
     },
+    'event-file': {
+      usage:
+        'Path to a file the event is read from by the handler runtime itself, for large events (Python only)',
+      type: 'string',
+    },
+    'event-format': {
+      usage:
+        'How the `--event-file` is passed to the handler: `json` (default), `str` or `bytes`',
+      type: 'string',
+    },
+    compact: {
+      usage:
+        'Write the result without indentation, faster for large results, and report the serialization time (Python only)',
+      type: 'boolean',
+    },
+    warm: {
+      usage:
+        'Keep a warm worker and invoke it once per line read from stdin (Python only)',
+      type: 'boolean',
+    },
+    reload: {
+      usage:
+        'Reload the changed modules of the service, and the ones depending on them, before every `--warm` invocation',
+      type: 'boolean',
+    },
+    replay: {
+      usage:
+        'Path to a JSONL file of events to replay through a single worker (Python only)',
+      type: 'string',
+    },
+    'replay-output': {
+      usage:
+        'Path to write replay or simulation results to as JSONL. Default: stdout',
+      type: 'string',
+    },
+    workers: {
+      usage:
+        'Number of worker processes to spread replayed or served events across. Default: `1`',
+      type: 'string',
+    },
+    unordered: {
+      usage:
+        'Write replay results as they complete, tagged with their event index',
+      type: 'boolean',
+    },
+    fork: {
+      usage:
+        'Run every replayed event in a process forked from a snapshot of the imported handler (Python only)',
+      type: 'boolean',
+    },
+    'before-snapshot': {
+      usage:
+        'Function to run once before forking with `--fork`, as `module:function`',
+      type: 'multiple',
+    },
+    'after-restore': {
+      usage:
+        'Function to run in every forked process with `--fork`, as `module:function`',
+      type: 'multiple',
+    },
+    simulate: {
+      usage:
+        'Path to a JSONL trace of `{"time", "event"}` arrivals to simulate the concurrency of, reporting cold starts, queueing and throttles (Python only)',
+      type: 'string',
+    },
+    concurrency: {
+      usage: 'Concurrency limit of the `--simulate` simulation. Default: `1000`',
+      type: 'string',
+    },
+    provisioned: {
+      usage:
+        'Provisioned concurrency of the `--simulate` simulation. Default: `0`',
+      type: 'string',
+    },
+    'idle-expiry': {
+      usage:
+        'Seconds after which idle environments of the `--simulate` simulation are removed. Default: `600`',
+      type: 'string',
+    },
+    benchmark: {
+      usage:
+        'Path to a JSON event to benchmark the handler with, reporting its mean wall and CPU times. Can be repeated (Python only)',
+      type: 'multiple',
+    },
+    warmup: {
+      usage:
+        'Number of `--benchmark` invocations per event not measured. Default: `10`',
+      type: 'string',
+    },
+    iterations: {
+      usage:
+        'Number of `--benchmark` invocations per event measured. Default: `100`',
+      type: 'string',
+    },
+    'save-baseline': {
+      usage: 'Path to save the `--benchmark` results to, as a JSON baseline',
+      type: 'string',
+    },
+    compare: {
+      usage:
+        'Path to a JSON baseline to compare the `--benchmark` results to, failing on regressions',
+      type: 'string',
+    },
+    threshold: {
+      usage:
+        'Percentage of increase of a mean time over the `--compare` baseline beyond which it is a regression. Default: `10`',
+      type: 'string',
+    },
+    report: {
+      usage:
+        'Print Lambda-style START/END/REPORT lines for every invocation (Python only)',
+      type: 'boolean',
+    },
+    'report-format': {
+      usage: 'Format of the invocation report: `text` (default) or `json`',
+      type: 'string',
+    },
+    'profile-imports': {
+      usage:
+        'Profile the import of the handler module, to find cold start costs (Python only)',
+      type: 'boolean',
+    },
+    'cpu-profile': {
+      usage:
+        'Profile handler calls and write the profile to .serverless/profiles (Python only)',
+      type: 'boolean',
+    },
+    'profile-format': {
+      usage:
+        'Format of the handler profile: `pstats` (default), `collapsed` or `speedscope`. Implies `--cpu-profile`',
+      type: 'string',
+    },
+    'enforce-memory': {
+      usage:
+        'Exit with a Runtime.OutOfMemory error once the function uses more than its memory size (Python only)',
+      type: 'boolean',
+    },
+    serve: {
+      usage:
+        'Serve the function behind a local Lambda Runtime API and Invoke API, on the given `[host:]port` (Python only)',
+      type: 'string',
+    },
+    'max-queue': {
+      usage:
+        'Number of invocations which wait for a worker when all are busy with `--serve` or `--simulate`, beyond which they are throttled (default: 0)',
+      type: 'string',
+    },
+    stream: {
+      usage:
+        'Stream the response chunk by chunk, from a returned generator or writes to `context.response_stream` (Python only)',
+      type: 'boolean',
+    },
+    'enforce-timeout': {
+      usage:
+        'Stop invocations running past the function timeout, writing the stacks of all threads (Python only)',
+      type: 'boolean',
+    },
+    'track-allocations': {
+      usage:
+        'Report the top allocation sites once the function gets near its memory size (Python only)',
+      type: 'boolean',
+    },
   },
   lifecycleEvents: ['loadEnvVars', 'invoke'],
   serviceDependencyMode: 'required',
@@ -2,6 +2,7 @@ import _ from 'lodash'
 import os from 'os'
 import { promises as fsp } from 'fs'
 import path from 'path'
+import readline from 'readline'
 import stripAnsi from 'strip-ansi'
 import validate from '../lib/validate.js'
 import stdin from 'get-stdin'
@@ -101,6 +102,73 @@ const dockerProgress = progress.get('invokeLocalDocker')
 
 const ensureRuntimeWrappers = () => __dirname
 
+// Options handled by the Python runtime wrapper (runtime-wrappers/invoke.py)
+const pythonOnlyOptions = [
+  'event-file',
+  'event-format',
+  'compact',
+  'warm',
+  'reload',
+  'replay',
+  'replay-output',
+  'workers',
+  'unordered',
+  'simulate',
+  'concurrency',
+  'provisioned',
+  'idle-expiry',
+  'benchmark',
+  'warmup',
+  'iterations',
+  'save-baseline',
+  'compare',
+  'threshold',
+  'report',
+  'report-format',
+  'profile-imports',
+  'cpu-profile',
+  'profile-format',
+  'enforce-memory',
+  'track-allocations',
+  'enforce-timeout',
+  'stream',
+  'serve',
+  'max-queue',
+  'fork',
+  'before-snapshot',
+  'after-restore',
+]
+
+// Exit statuses of the Python wrapper when killed for running out of memory,
+// or past the timeout
+const pythonOutOfMemoryExitStatus = 137
+const pythonTimedOutExitStatus = 124
+
+/**
+ * Error returned for a request whose Python worker exited, as Lambda returns
+ * when the runtime exits
+ */
+const getPythonExitError = ({ code, signal }, timeout) => {
+  if (code === pythonOutOfMemoryExitStatus) {
+    return {
+      errorMessage: 'Runtime exited with error: signal: killed',
+      errorType: 'Runtime.OutOfMemory',
+    }
+  }
+  if (code === pythonTimedOutExitStatus) {
+    return {
+      errorMessage: `Task timed out after ${timeout.toFixed(2)} seconds`,
+      errorType: 'Sandbox.Timedout',
+    }
+  }
+  return {
+    errorMessage: `Runtime exited with error: ${
+      signal ? `signal: ${signal}` : `exit status ${code}`
+    }`,
+    errorType: 'Runtime.ExitError',
+  }
+}
+
 /**
  * @param {string} runtime
  */
@@ -155,7 +223,24 @@ class AwsInvokeLocal {
     return path.resolve(artifactsPath, 'runtime-wrappers', filename)
   }
 
-  async validateFile(filePath, key) {
+  /**
+   * Directory profiles of this invocation are written to, i.e.
+   * `.serverless/profiles/<function>/<timestamp>`
+   */
+  getProfileDirectory() {
+    if (!this.profileDirectory) {
+      this.profileDirectory = path.join(
+        this.serverless.serviceDir,
+        '.serverless',
+        'profiles',
+        this.options.function,
+        new Date().toISOString().replace(/[:.]/g, '-'),
+      )
+    }
+    return this.profileDirectory
+  }
+
+  async resolveInputFilePath(filePath) {
     const absolutePath = path.isAbsolute(filePath)
       ? filePath
       : path.join(this.serverless.serviceDir, filePath)
@@ -168,6 +253,11 @@ class AwsInvokeLocal {
         'INVOKE_LOCAL_MISSING_FILE',
       )
     }
+    return absolutePath
+  }
+
+  async validateFile(filePath, key) {
+    const absolutePath = await this.resolveInputFilePath(filePath)
     if (absolutePath.endsWith('.js')) {
       // to support js - export as an input data
       this.options[key] = await import(absolutePath)
@@ -204,7 +294,178 @@ class AwsInvokeLocal {
       await this.validateFile(this.options.contextPath, 'context')
     }
 
-    if (!this.options.data) {
+    if (this.options.replay) {
+      this.options.replay = await this.resolveInputFilePath(this.options.replay)
+    }
+    if (this.options['event-file']) {
+      if (
+        this.options.data ||
+        this.options.path ||
+        this.options.warm ||
+        this.options.replay ||
+        this.options.serve
+      ) {
+        throw new ServerlessError(
+          'The "--event-file" option cannot be combined with "--data", "--path", "--warm", "--replay" or "--serve"',
+          'INVOKE_LOCAL_INVALID_EVENT_FILE_OPTION',
+        )
+      }
+      this.options['event-file'] = await this.resolveInputFilePath(
+        this.options['event-file'],
+      )
+    }
+    if (
+      this.options['event-format'] &&
+      (!this.options['event-file'] ||
+        !['json', 'str', 'bytes'].includes(this.options['event-format']))
+    ) {
+      throw new ServerlessError(
+        `Invalid "--event-format" value: ${this.options['event-format']}. Expected "json", "str" or "bytes", along with "--event-file"`,
+        'INVOKE_LOCAL_INVALID_EVENT_FORMAT',
+      )
+    }
+    if (this.options.workers !== undefined) {
+      const workers = Number(this.options.workers)
+      if (!Number.isInteger(workers) || workers < 1) {
+        throw new ServerlessError(
+          `Invalid "--workers" value: ${this.options.workers}. Expected a positive integer`,
+          'INVOKE_LOCAL_INVALID_WORKERS',
+        )
+      }
+      this.options.workers = workers
+    }
+    if (this.options.benchmark) {
+      this.options.benchmark = await Promise.all(
+        []
+          .concat(this.options.benchmark)
+          .map((fixture) => this.resolveInputFilePath(fixture)),
+      )
+    }
+    if (this.options.compare) {
+      this.options.compare = await this.resolveInputFilePath(
+        this.options.compare,
+      )
+    }
+    for (const option of ['warmup', 'iterations', 'threshold']) {
+      if (this.options[option] === undefined) continue
+      const value = Number(this.options[option])
+      // Only the threshold, a percentage, can be fractional
+      const isValid =
+        option === 'threshold'
+          ? Number.isFinite(value)
+          : Number.isInteger(value)
+      if (!isValid || value < 0) {
+        throw new ServerlessError(
+          `Invalid "--${option}" value: ${this.options[option]}. Expected a non-negative ${option === 'threshold' ? 'number' : 'integer'}`,
+          'INVOKE_LOCAL_INVALID_BENCHMARK_OPTION',
+        )
+      }
+      this.options[option] = value
+    }
+    if (this.options.simulate) {
+      this.options.simulate = await this.resolveInputFilePath(
+        this.options.simulate,
+      )
+    }
+    for (const option of ['concurrency', 'provisioned', 'idle-expiry']) {
+      if (this.options[option] === undefined) continue
+      const value = Number(this.options[option])
+      // Only the idle expiry, in seconds, can be fractional
+      const isValid =
+        option === 'idle-expiry'
+          ? Number.isFinite(value)
+          : Number.isInteger(value)
+      if (!isValid || value < 0) {
+        throw new ServerlessError(
+          `Invalid "--${option}" value: ${this.options[option]}. Expected a non-negative ${option === 'idle-expiry' ? 'number' : 'integer'}`,
+          'INVOKE_LOCAL_INVALID_SIMULATION_OPTION',
+        )
+      }
+      this.options[option] = value
+    }
+    if (this.options['max-queue'] !== undefined) {
+      const maxQueue = Number(this.options['max-queue'])
+      if (!Number.isInteger(maxQueue) || maxQueue < 0) {
+        throw new ServerlessError(
+          `Invalid "--max-queue" value: ${this.options['max-queue']}. Expected a non-negative integer`,
+          'INVOKE_LOCAL_INVALID_MAX_QUEUE',
+        )
+      }
+      this.options['max-queue'] = maxQueue
+    }
+    if (
+      this.options['report-format'] &&
+      !['text', 'json'].includes(this.options['report-format'])
+    ) {
+      throw new ServerlessError(
+        `Invalid "--report-format" value: ${this.options['report-format']}. Expected "text" or "json"`,
+        'INVOKE_LOCAL_INVALID_REPORT_FORMAT',
+      )
+    }
+    if (
+      this.options['profile-format'] &&
+      !['pstats', 'collapsed', 'speedscope'].includes(
+        this.options['profile-format'],
+      )
+    ) {
+      throw new ServerlessError(
+        `Invalid "--profile-format" value: ${this.options['profile-format']}. Expected "pstats", "collapsed" or "speedscope"`,
+        'INVOKE_LOCAL_INVALID_PROFILE_FORMAT',
+      )
+    }
+    if (
+      this.options.stream &&
+      (this.options.warm ||
+        this.options.replay ||
+        this.options.simulate ||
+        this.options.serve)
+    ) {
+      throw new ServerlessError(
+        'The "--stream" option cannot be combined with "--warm", "--replay", "--simulate" or "--serve"',
+        'INVOKE_LOCAL_INVALID_STREAM_OPTION',
+      )
+    }
+    if (this.options.reload && !this.options.warm) {
+      throw new ServerlessError(
+        'The "--reload" option can only be used with "--warm"',
+        'INVOKE_LOCAL_INVALID_RELOAD_OPTION',
+      )
+    }
+    if (
+      this.options.fork &&
+      (!this.options.replay ||
+        this.options['cpu-profile'] ||
+        this.options['profile-format'])
+    ) {
+      throw new ServerlessError(
+        'The "--fork" option can only be used with "--replay", and cannot be combined with "--cpu-profile"',
+        'INVOKE_LOCAL_INVALID_FORK_OPTION',
+      )
+    }
+    for (const option of ['before-snapshot', 'after-restore']) {
+      for (const hook of [].concat(this.options[option] || [])) {
+        // Functions are given as MODULE:FUNCTION, as the wrapper loads them
+        if (!/^\w+(\.\w+)*:\w+$/.test(hook)) {
+          throw new ServerlessError(
+            `Invalid "--${option}" value: ${hook}. Expected a function as "MODULE:FUNCTION", e.g. "hooks:close"`,
+            'INVOKE_LOCAL_INVALID_SNAPSHOT_HOOK',
+          )
+        }
+      }
+    }
+
+    // In warm mode stdin is read line by line, one event per invocation,
+    // events are received over HTTP when serving, and read by the wrapper
+    // itself when given as a file
+    if (
+      !this.options.data &&
+      !this.options['event-file'] &&
+      !this.options.warm &&
+      !this.options.replay &&
+      !this.options.simulate &&
+      !this.options.benchmark &&
+      !this.options.serve
+    ) {
       if (this.options.path) {
         await this.validateFile(this.options.path, 'data')
       } else {
@@ -359,6 +620,18 @@ class AwsInvokeLocal {
     // const runtime = this.getRuntime()
     const handler = this.options.functionObj.handler
 
+    if (!runtime.startsWith('python') || this.options.docker) {
+      const pythonOnlyOption = pythonOnlyOptions.find(
+        (name) => this.options[name],
+      )
+      if (pythonOnlyOption) {
+        throw new ServerlessError(
+          `The "--${pythonOnlyOption}" option is only supported for Python functions invoked without Docker`,
+          'INVOKE_LOCAL_PYTHON_ONLY_OPTION',
+        )
+      }
+    }
+
     if (this.options.docker) {
       return this.invokeLocalDocker()
     }
@@ -857,25 +1130,182 @@ class AwsInvokeLocal {
     })
   }
 
-  async invokeLocalPython(runtime, handlerPath, handlerName, event, context) {
-    const input = JSON.stringify({
-      event: event || {},
-      context: Object.assign(
-        {
-          name: this.options.functionObj.name,
-          version: 'LATEST',
-          logGroupName: this.provider.naming.getLogGroupName(
-            this.options.functionObj.name,
+  getPythonContext(context) {
+    return Object.assign(
+      {
+        name: this.options.functionObj.name,
+        version: 'LATEST',
+        logGroupName: this.provider.naming.getLogGroupName(
+          this.options.functionObj.name,
+        ),
+        timeout:
+          Number(this.options.functionObj.timeout) ||
+          Number(this.serverless.service.provider.timeout) ||
+          6,
+        memorySize:
+          Number(this.options.functionObj.memorySize) ||
+          Number(this.serverless.service.provider.memorySize) ||
+          1024,
+      },
+      context,
+    )
+  }
+
+  /**
+   * Arguments of the Python runtime wrapper for the options of the invocation
+   */
+  getPythonWrapperArgs(wrapperPath, handlerPath, handlerName, context) {
+    const wrapperArgs = ['-u', wrapperPath, handlerPath, handlerName]
+
+    if (this.options.report || this.options['report-format']) {
+      wrapperArgs.push('--report', this.options['report-format'] || 'text')
+    }
+    if (this.options['profile-imports']) {
+      wrapperArgs.push(
+        '--profile-imports',
+        path.join(this.getProfileDirectory(), 'imports.trace.json'),
+      )
+    }
+    if (this.options['cpu-profile'] || this.options['profile-format']) {
+      wrapperArgs.push(
+        '--cpu-profile',
+        this.getProfileDirectory(),
+        '--profile-format',
+        this.options['profile-format'] || 'pstats',
+      )
+    }
+    if (this.options['enforce-timeout']) wrapperArgs.push('--enforce-timeout')
+    if (this.options.stream) wrapperArgs.push('--stream')
+    if (this.options['enforce-memory'] || this.options['track-allocations']) {
+      wrapperArgs.push(
+        '--memory-limit',
+        String(this.getPythonContext(context).memorySize),
+      )
+      if (this.options['enforce-memory']) wrapperArgs.push('--enforce-memory')
+      if (this.options['track-allocations']) {
+        wrapperArgs.push('--track-allocations')
+      }
+    }
+
+    if (this.options.warm) {
+      if (this.options.reload) wrapperArgs.push('--reload')
+      return wrapperArgs
+    }
+
+    if (this.options.serve) {
+      wrapperArgs.push(
+        '--serve',
+        String(this.options.serve),
+        '--context',
+        JSON.stringify(this.getPythonContext(context)),
+      )
+      if (this.options.workers) {
+        wrapperArgs.push('--workers', String(this.options.workers))
+      }
+      if (this.options['max-queue'] !== undefined) {
+        wrapperArgs.push('--max-queue', String(this.options['max-queue']))
+      }
+    }
+
+    if (this.options.replay) {
+      wrapperArgs.push(
+        '--replay',
+        this.options.replay,
+        '--context',
+        JSON.stringify(this.getPythonContext(context)),
+      )
+      if (this.options['replay-output']) {
+        wrapperArgs.push(
+          '--output',
+          path.resolve(
+            this.serverless.serviceDir,
+            this.options['replay-output'],
           ),
-          timeout:
-            Number(this.options.functionObj.timeout) ||
-            Number(this.serverless.service.provider.timeout) ||
-            6,
-        },
-        context,
-      ),
-    })
+        )
+      }
+      if (this.options.workers) {
+        wrapperArgs.push('--workers', String(this.options.workers))
+      }
+      if (this.options.unordered) wrapperArgs.push('--unordered')
+      if (this.options.fork) {
+        wrapperArgs.push('--fork')
+        for (const hook of [].concat(this.options['before-snapshot'] || [])) {
+          wrapperArgs.push('--before-snapshot', hook)
+        }
+        for (const hook of [].concat(this.options['after-restore'] || [])) {
+          wrapperArgs.push('--after-restore', hook)
+        }
+      }
+    }
+
+    if (this.options.compact) wrapperArgs.push('--compact')
+
+    // Large events are better read by the wrapper straight from their file,
+    // than parsed and serialized again to be written to its stdin
+    if (this.options['event-file']) {
+      wrapperArgs.push(
+        '--event-file',
+        this.options['event-file'],
+        '--event-format',
+        this.options['event-format'] || 'json',
+      )
+    }
+
+    if (this.options.simulate) {
+      wrapperArgs.push(
+        '--simulate',
+        this.options.simulate,
+        '--context',
+        JSON.stringify(this.getPythonContext(context)),
+      )
+      if (this.options['replay-output']) {
+        wrapperArgs.push(
+          '--output',
+          path.resolve(
+            this.serverless.serviceDir,
+            this.options['replay-output'],
+          ),
+        )
+      }
+      for (const option of [
+        'concurrency',
+        'provisioned',
+        'idle-expiry',
+        'max-queue',
+      ]) {
+        if (this.options[option] !== undefined) {
+          wrapperArgs.push(`--${option}`, String(this.options[option]))
+        }
+      }
+    }
+
+    if (this.options.benchmark) {
+      wrapperArgs.push(
+        '--benchmark',
+        ...this.options.benchmark,
+        '--context',
+        JSON.stringify(this.getPythonContext(context)),
+      )
+      for (const option of ['warmup', 'iterations', 'compare', 'threshold']) {
+        if (this.options[option] !== undefined) {
+          wrapperArgs.push(`--${option}`, String(this.options[option]))
+        }
+      }
+      if (this.options['save-baseline']) {
+        wrapperArgs.push(
+          '--save-baseline',
+          path.resolve(
+            this.serverless.serviceDir,
+            this.options['save-baseline'],
+          ),
+        )
+      }
+    }
 
+    return wrapperArgs
+  }
+
+  async invokeLocalPython(runtime, handlerPath, handlerName, event, context) {
     if (process.env.VIRTUAL_ENV) {
       const runtimeDir = os.platform() === 'win32' ? 'Scripts' : 'bin'
       process.env.PATH = [
@@ -886,15 +1316,30 @@ class AwsInvokeLocal {
     }
 
     const wrapperPath = await this.resolveRuntimeWrapperPath('invoke.py')
+    const wrapperArgs = this.getPythonWrapperArgs(
+      wrapperPath,
+      handlerPath,
+      handlerName,
+      context,
+    )
 
-    return new Promise((resolve) => {
-      const python = spawnExt(
-        runtime.split('.')[0],
-        ['-u', wrapperPath, handlerPath, handlerName],
-        {
-          env: process.env,
-        },
+    if (this.options.warm) {
+      return this.invokeLocalPythonWarm(
+        runtime,
+        wrapperArgs,
+        this.getPythonContext(context),
       )
+    }
+
+    const input = JSON.stringify({
+      ...(this.options['event-file'] ? {} : { event: event || {} }),
+      context: this.getPythonContext(context),
+    })
+
+    return new Promise((resolve) => {
+      const python = spawnExt(runtime.split('.')[0], wrapperArgs, {
+        env: process.env,
+      })
       python.stdout.on('data', (buf) => {
         writeText(buf.toString())
       })
@@ -909,6 +1354,122 @@ class AwsInvokeLocal {
     })
   }
 
+  /**
+   * Keeps a single Python worker alive, with the handler imported once, and
+   * forwards every line read from stdin to it as a separate invocation.
+   * As Lambda replaces an execution environment that exits when running out of
+   * memory or past the timeout, a worker killed by its watchdog is replaced
+   * with a new one. A worker that fails to import the handler, or exits for
+   * any other reason, fails the invocation instead.
+   */
+  async invokeLocalPythonWarm(runtime, wrapperArgs, context) {
+    // Requests sent to the worker which have no result yet
+    const pending = []
+    let closed = false
+    let python
+    let events
+
+    return new Promise((resolve, reject) => {
+      const startWorker = () => {
+        python = spawnExt(
+          runtime.split('.')[0],
+          [...wrapperArgs, '--warm', '--notify-ready'],
+          { env: process.env },
+        )
+        // Whether the worker imported the handler, which it notifies with an
+        // empty line before the results
+        let ready = false
+        // Writes to a worker that exited are handled once it closes
+        python.child.stdin.on('error', () => {})
+        readline
+          .createInterface({ input: python.stdout })
+          .on('line', (line) => {
+            if (!ready) {
+              ready = true
+              return
+            }
+            pending.shift()
+            writeText(`${line}\n`)
+            if (line.includes('"errorType"')) process.exitCode = 1
+          })
+        python.stderr.on('data', (buf) => {
+          writeText(buf.toString())
+        })
+        for (const request of pending) python.child.stdin.write(request)
+        if (closed) python.child.stdin.end()
+
+        const onExit = ({ code, signal }) => {
+          if (!code && !signal) {
+            resolve()
+            return
+          }
+          const reason = signal ? `signal: ${signal}` : `exit status ${code}`
+          if (!ready) {
+            events.close()
+            reject(
+              new ServerlessError(
+                `Exception encountered when loading the handler, the Python worker exited with ${reason}`,
+                'INVOKE_LOCAL_LAMBDA_INITIALIZATION_FAILED',
+              ),
+            )
+            return
+          }
+          // The worker exited while running the first pending request
+          if (pending.length) {
+            pending.shift()
+            writeText(
+              `${JSON.stringify(
+                getPythonExitError({ code, signal }, context.timeout),
+              )}\n`,
+            )
+          }
+          process.exitCode = 1
+          if (
+            code !== pythonOutOfMemoryExitStatus &&
+            code !== pythonTimedOutExitStatus
+          ) {
+            events.close()
+            reject(
+              new ServerlessError(
+                `The Python worker exited with ${reason}`,
+                'INVOKE_LOCAL_PYTHON_WORKER_EXITED',
+              ),
+            )
+            return
+          }
+          if (closed && !pending.length) resolve()
+          else startWorker()
+        }
+        python.then(onExit, (error) => {
+          // Failures to spawn the worker have a string code
+          if (typeof error.code !== 'number') reject(error)
+          else onExit(error)
+        })
+      }
+      startWorker()
+
+      events = readline.createInterface({ input: process.stdin })
+      events.on('line', (line) => {
+        if (!line.trim()) return
+        let event = line
+        if (!this.options.raw) {
+          try {
+            event = JSON.parse(line)
+          } catch {
+            // pass the line as a raw string
+          }
+        }
+        const request = `${JSON.stringify({ event, context })}\n`
+        pending.push(request)
+        python.child.stdin.write(request)
+      })
+      events.on('close', () => {
+        closed = true
+        python.child.stdin.end()
+      })
+    })
+  }
+
   async callJavaBridge(artifactPath, className, handlerName, input) {
     const wrapperPath = await this.resolveRuntimeWrapperPath(
       'java/target/invoke-bridge-1.0.1.jar',
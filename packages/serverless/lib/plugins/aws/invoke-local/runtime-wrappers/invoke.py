@@ -1,62 +1,20 @@
-import subprocess
 import argparse
 import json
 import logging
+import os
 import sys
-import decimal
-from time import strftime, time
-from importlib import import_module
-
-def decimal_serializer(o):
-    if isinstance(o, decimal.Decimal):
-        f = float(o)
-        if f.is_integer():
-          return int(f)
-        return f
-    
-class FakeLambdaContext(object):
-    def __init__(self, name='Fake', version='LATEST', timeout=6, **kwargs):
-        self.name = name
-        self.version = version
-        self.created = time()
-        self.timeout = timeout
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-
-    def get_remaining_time_in_millis(self):
-        return int(max((self.timeout * 1000) - (int(round(time() * 1000)) - int(round(self.created * 1000))), 0))
-
-    @property
-    def function_name(self):
-        return self.name
-
-    @property
-    def function_version(self):
-        return self.version
-
-    @property
-    def invoked_function_arn(self):
-        return 'arn:aws:lambda:serverless:' + self.name
-
-    @property
-    def memory_limit_in_mb(self):
-        return '1024'
-
-    @property
-    def aws_request_id(self):
-        return '1234567890'
-
-    @property
-    def log_group_name(self):
-        return '/aws/lambda/' + self.name
-
-    @property
-    def log_stream_name(self):
-        return strftime('%Y/%m/%d') +'/[$' + self.version + ']58419525dade4d17a495dceeeed44708'
-
-    @property
-    def log(self):
-        return sys.stdout.write
+from time import perf_counter
+
+from invoke_local.benchmark import run_benchmark
+from invoke_local.environment import (
+    ExecutionEnvironment, open_tty_stdin, read_event_file, redirect_stdout)
+from invoke_local.profiling import PROFILE_FILES, write_profile
+from invoke_local.replay import run_replay
+from invoke_local.runtime_api import run_runtime_api_server, run_runtime_client
+from invoke_local.serialization import marshal_error, write_json
+from invoke_local.simulation import run_simulation
+from invoke_local.trace import run_trace
+from invoke_local.warm import run_warm
 
 logging.basicConfig()
 
@@ -71,25 +29,262 @@ parser.add_argument('handler_path',
 
 parser.add_argument('handler_name', help='Name of the handler function')
 
+parser.add_argument('--warm', action='store_true',
+                    help=('Import the handler once and serve newline-delimited'
+                          ' {"event", "context"} requests read from stdin,'
+                          ' writing one JSON result per line'))
+
+parser.add_argument('--reload', action='store_true',
+                    help=('With --warm, reload the modules of the service which'
+                          ' changed before every invocation, along with the'
+                          ' ones depending on them'))
+
+parser.add_argument('--notify-ready', action='store_true',
+                    help=('With --warm, write an empty line once the handler'
+                          ' is imported, before the results of the requests'))
+
+parser.add_argument('--replay', metavar='PATH',
+                    help=('Invoke the handler with every event of a JSONL file,'
+                          ' writing results as JSONL followed by a'
+                          ' throughput/latency summary on stderr'))
+
+parser.add_argument('--output', metavar='PATH',
+                    help='File to write replay results to, instead of stdout')
+
+parser.add_argument('--event-file', metavar='PATH',
+                    help=('Read the event of a single invocation from this file,'
+                          ' mapped in memory, instead of stdin'))
+
+parser.add_argument('--event-format', choices=['json', 'str', 'bytes'], default='json',
+                    help=('How the --event-file is passed to the handler: parsed'
+                          ' as JSON (default), or as is, as str or bytes'))
+
+parser.add_argument('--compact', action='store_true',
+                    help=('Write the result of a single invocation without'
+                          ' indentation, faster for large results'))
+
+parser.add_argument('--context', default='{}',
+                    help='JSON context used for replayed events')
+
+parser.add_argument('--workers', type=int, default=1,
+                    help=('Number of worker processes replayed events are'
+                          ' spread across, each importing the handler once'))
+
+parser.add_argument('--chunk-size', type=int, default=16,
+                    help='Number of events sent to a worker at a time')
+
+parser.add_argument('--report', choices=('text', 'json'),
+                    help=('Write Lambda-style START/END/REPORT lines, or JSON'
+                          ' platform events, to stderr for every invocation'))
+
+parser.add_argument('--profile-imports', metavar='PATH',
+                    help=('Profile the import of the handler, writing a'
+                          ' self/cumulative table to stderr and a Chrome trace'
+                          ' (also opened by speedscope) to PATH'))
+
+parser.add_argument('--profile-imports-top', type=int, default=10,
+                    help='Number of modules and packages listed by the import profile')
+
+parser.add_argument('--cpu-profile', metavar='DIRECTORY',
+                    help=('Profile handler calls, aggregated over all'
+                          ' invocations, and write the profile to DIRECTORY'))
+
+parser.add_argument('--profile-format', choices=sorted(PROFILE_FILES), default='pstats',
+                    help='Format of the CPU profile')
+
+parser.add_argument('--enforce-timeout', action='store_true',
+                    help=('Kill the process once an invocation runs past the'
+                          ' timeout of its context, writing the stacks of all'
+                          ' threads to stderr'))
+
+parser.add_argument('--memory-limit', type=int, metavar='MB',
+                    help=('Memory size of the function, defaulting to'
+                          ' AWS_LAMBDA_FUNCTION_MEMORY_SIZE or 1024'))
+
+parser.add_argument('--enforce-memory', action='store_true',
+                    help=('Kill the process once its resident memory exceeds'
+                          ' the memory size, as Lambda would'))
+
+parser.add_argument('--track-allocations', action='store_true',
+                    help=('Track allocations, and write the top allocation'
+                          ' sites to stderr when memory use gets near the'
+                          ' memory size'))
+
+parser.add_argument('--track-allocations-top', type=int, default=10,
+                    help='Number of allocation sites reported')
+
+parser.add_argument('--stream', action='store_true',
+                    help=('Stream the response to stdout chunk by chunk, from'
+                          ' the items of a returned (async) iterator or writes'
+                          ' to context.response_stream, writing the time to the'
+                          ' first chunk, bytes and chunk count to stderr'))
+
+parser.add_argument('--serve', metavar='[HOST:]PORT',
+                    help=('Serve the handler behind an emulation of the Lambda'
+                          ' Runtime API, run by --workers workers, and of the'
+                          ' Invoke API, writing queueing delays and handler'
+                          ' times to stderr once stopped'))
+
+parser.add_argument('--max-queue', type=int, default=0,
+                    help=('Number of invocations which wait for a worker when'
+                          ' all are busy, beyond which invocations are'
+                          ' throttled'))
+
+parser.add_argument('--runtime-api', metavar='HOST:PORT',
+                    help='Run invocations fetched from a Lambda Runtime API')
+
+parser.add_argument('--fork', action='store_true',
+                    help=('Import the handler once, then run every replayed'
+                          ' event in a process forked from a snapshot of it,'
+                          ' up to --workers at a time, reporting fork latencies'))
+
+parser.add_argument('--before-snapshot', metavar='MODULE:FUNCTION', action='append',
+                    help=('Function run once the handler is imported, before'
+                          ' forking, after the hooks registered with'
+                          ' snapshot_restore_py'))
+
+parser.add_argument('--after-restore', metavar='MODULE:FUNCTION', action='append',
+                    help='Function run in every forked process, before the invocation')
+
+parser.add_argument('--simulate', metavar='PATH',
+                    help=('Run the events of a JSONL trace of {"time", "event"}'
+                          ' arrivals against environments created on demand,'
+                          ' reporting cold and warm starts, queueing and'
+                          ' throttles'))
+
+parser.add_argument('--concurrency', type=int, default=1000,
+                    help='Concurrency limit of the simulation (default: 1000)')
+
+parser.add_argument('--provisioned', type=int, default=0,
+                    help='Number of environments initialized before the simulation')
+
+parser.add_argument('--idle-expiry', metavar='SECONDS', type=float, default=600,
+                    help=('Time after which idle environments of the simulation'
+                          ' are removed, unless provisioned (default: 600)'))
+
+parser.add_argument('--benchmark', metavar='PATH', nargs='+',
+                    help=('Invoke the handler with every one of these JSON'
+                          ' events, reporting the mean wall and CPU times'))
+
+parser.add_argument('--warmup', type=int, default=10,
+                    help='Number of benchmark invocations per event not measured (default: 10)')
+
+parser.add_argument('--iterations', type=int, default=100,
+                    help='Number of benchmark invocations per event measured (default: 100)')
+
+parser.add_argument('--save-baseline', metavar='PATH',
+                    help='Write the benchmark results to this JSON file')
+
+parser.add_argument('--compare', metavar='PATH',
+                    help=('Compare the benchmark results to a baseline, exiting'
+                          ' with an error on regressions'))
+
+parser.add_argument('--threshold', metavar='PERCENT', type=float, default=10,
+                    help=('Increase of the mean time over the baseline, beyond'
+                          ' which significant ones are regressions (default: 10)'))
+
+parser.add_argument('--trace-files', metavar='PATH',
+                    help=('Import the handler, invoke it with the --trace-events,'
+                          ' and write the list of the files loaded to PATH'))
+parser.add_argument('--trace-events', metavar='PATH', nargs='+',
+                    help='JSON event files to invoke the handler with when tracing files')
+parser.add_argument('--unordered', action='store_true',
+                    help=('Write replay results as soon as they are available,'
+                          ' tagged with the index of their event'))
+
 if __name__ == '__main__':
     args = parser.parse_args()
+    if args.stream and (args.warm or args.replay or args.simulate or args.serve
+                        or args.runtime_api):
+        parser.error('--stream can only be used for a single invocation')
+    if args.event_file and (args.warm or args.replay or args.serve or args.runtime_api):
+        parser.error('--event-file can only be used for a single invocation')
+    if args.event_format != 'json' and not args.event_file:
+        parser.error('--event-format can only be used with --event-file')
+    if args.benchmark and args.iterations < 2:
+        parser.error('--iterations must be at least 2')
+    if args.simulate and not 0 <= args.provisioned <= args.concurrency:
+        parser.error('--provisioned must be between 0 and --concurrency')
+    if args.trace_events and not args.trace_files:
+        parser.error('--trace-events can only be used with --trace-files')
+    if args.reload and not args.warm:
+        parser.error('--reload can only be used with --warm')
+    if args.notify_ready and not args.warm:
+        parser.error('--notify-ready can only be used with --warm')
+    if args.fork:
+        if not args.replay:
+            parser.error('--fork can only be used with --replay')
+        if not hasattr(os, 'fork'):
+            parser.error('--fork is not supported on this platform')
+        if args.cpu_profile:
+            # Profiling timers are not inherited by forked processes
+            parser.error('--cpu-profile cannot be used with --fork')
+    for hook in (args.before_snapshot or []) + (args.after_restore or []):
+        if not all(hook.partition(':')[::2]):
+            parser.error('hooks must be given as MODULE:FUNCTION, not {}'.format(hook))
 
     # this is needed because you need to import from where you've executed sls
     sys.path.append('.')
 
-    module = import_module(args.handler_path.replace('/', '.'))
-    handler = getattr(module, args.handler_name)
+    if args.replay:
+        run_replay(args)
+        sys.exit()
+
+    if args.simulate:
+        run_simulation(args)
+        sys.exit()
+
+    if args.benchmark:
+        run_benchmark(args)
+        sys.exit()
 
+    if args.trace_files:
+        run_trace(args)
+        sys.exit()
+
+    if args.serve:
+        run_runtime_api_server(args)
+        sys.exit()
+
+    if args.warm:
+        run_warm(args)
+        if args.cpu_profile:
+            write_profile(args.cpu_profile, args.profile_format)
+        sys.exit()
+
+    environment = ExecutionEnvironment(args)
+
+    if args.runtime_api:
+        run_runtime_client(environment, args.runtime_api, json.loads(args.context))
+
+    start = perf_counter()
     input = json.load(sys.stdin)
-    if sys.platform != 'win32':
+    if args.event_file:
+        input['event'] = read_event_file(args.event_file, args.event_format)
+    environment.parse_duration = (perf_counter() - start) * 1000
+    if args.stream:
+        # Anything the handler prints is sent to stderr, so that the stream
+        # only holds the response
+        environment.results = redirect_stdout()
+        environment.stream_output = environment.results.buffer
+    else:
+        environment.results = sys.stdout
+    open_tty_stdin()
+
+    try:
+        result = environment.call(input['event'], input.get('context', {}))
+    finally:
+        environment.close()
+        if args.cpu_profile:
+            write_profile(args.cpu_profile, args.profile_format)
+    if not args.stream:
+        start = perf_counter()
         try:
-            if sys.platform != 'darwin':
-                subprocess.check_call('tty', stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        except (OSError, subprocess.CalledProcessError):
-            pass
-        else:
-            sys.stdin = open('/dev/tty')
-
-    context = FakeLambdaContext(**input.get('context', {}))
-    result = handler(input['event'], context)
-    sys.stdout.write(json.dumps(result, default=decimal_serializer, indent=4))
+            size = write_json(sys.stdout, result, args.compact)
+        except (TypeError, ValueError, OverflowError) as error:
+            sys.stdout.write(json.dumps(marshal_error(error), indent=4))
+            sys.exit(1)
+        sys.stdout.flush()
+        if args.report or args.compact:
+            sys.stderr.write('\nSerialized the result ({} characters) in {:.2f} ms\n'.format(
+                size, (perf_counter() - start) * 1000))
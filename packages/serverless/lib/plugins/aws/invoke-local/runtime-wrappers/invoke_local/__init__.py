@@ -0,0 +1,11 @@
+"""Modes of the Python runtime wrapper of invoke local, run by invoke.py"""
+import os
+
+# Directories of the wrapper: the one of invoke.py, and this package
+PACKAGE_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
+WRAPPER_DIRECTORIES = (PACKAGE_DIRECTORY, os.path.dirname(PACKAGE_DIRECTORY))
+
+
+def is_wrapper_file(path):
+    # Frames of the wrapper are left out of the stacks shown for handlers
+    return os.path.dirname(os.path.realpath(path)) in WRAPPER_DIRECTORIES
@@ -0,0 +1,124 @@
+import json
+import math
+import os
+import platform
+import sys
+
+from invoke_local.environment import ExecutionEnvironment, open_tty_stdin, redirect_stdout
+
+
+# Two-sided 95% quantiles of Student's t-distribution, by degrees of freedom
+T_QUANTILES = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+def t_quantile(degrees_of_freedom):
+    if degrees_of_freedom <= len(T_QUANTILES):
+        return T_QUANTILES[max(int(degrees_of_freedom), 1) - 1]
+    # Cornish-Fisher expansion around the normal quantile, accurate to three
+    # decimals past the table
+    z = 1.959964
+    return (z + (z ** 3 + z) / (4 * degrees_of_freedom)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * degrees_of_freedom ** 2))
+
+
+def sample_statistics(values):
+    # Mean, standard deviation and half-width of the 95% confidence interval
+    # of the mean
+    count = len(values)
+    mean = sum(values) / count
+    stdev = math.sqrt(sum((value - mean) ** 2 for value in values) / (count - 1)) if count > 1 else 0
+    return {
+        'mean': mean,
+        'stdev': stdev,
+        'n': count,
+        'ci95': t_quantile(count - 1) * stdev / math.sqrt(count) if count > 1 else 0,
+    }
+
+
+def compare_statistics(baseline, current):
+    """Difference of the means of two samples, and half-width of its 95%
+    confidence interval, from Welch's t-test"""
+    variances = [stats['stdev'] ** 2 / stats['n'] for stats in (baseline, current)]
+    standard_error = math.sqrt(sum(variances))
+    difference = current['mean'] - baseline['mean']
+    if not standard_error:
+        return difference, 0
+    degrees_of_freedom = sum(variances) ** 2 / sum(
+        variance ** 2 / (stats['n'] - 1)
+        for variance, stats in zip(variances, (baseline, current)) if stats['n'] > 1)
+    return difference, t_quantile(degrees_of_freedom) * standard_error
+
+
+def run_benchmark(args):
+    """Invokes the handler with every fixture event, a number of times after
+    some warmup invocations, and reports the mean wall and CPU times, compared
+    to a baseline if given"""
+    context_args = json.loads(args.context)
+    output = redirect_stdout()
+    open_tty_stdin()
+    environment = ExecutionEnvironment(args)
+    results = {}
+    for path in args.benchmark:
+        with open(path) as fixture:
+            event = json.load(fixture)
+        wall_times = []
+        cpu_times = []
+        for iteration in range(args.warmup + args.iterations):
+            try:
+                environment.call(event, context_args)
+            except Exception as error:
+                sys.exit('Invocation with {} failed: {}'.format(path, error))
+            if iteration >= args.warmup:
+                # Both measured around the handler call only
+                wall_times.append(environment.duration)
+                cpu_times.append(environment.cpu_duration)
+        results[os.path.basename(path)] = {
+            'wallMs': sample_statistics(wall_times),
+            'cpuMs': sample_statistics(cpu_times),
+        }
+    environment.close()
+
+    output.write('{} iterations per event, after {} warmup ones (mean ± 95% CI):\n'.format(
+        args.iterations, args.warmup))
+    for name, result in results.items():
+        output.write('{}  wall: {:.3f} ms ± {:.3f} ms  cpu: {:.3f} ms ± {:.3f} ms\n'.format(
+            name, result['wallMs']['mean'], result['wallMs']['ci95'],
+            result['cpuMs']['mean'], result['cpuMs']['ci95']))
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({
+                'handler': '{}.{}'.format(args.handler_path, args.handler_name),
+                'python': platform.python_version(),
+                'warmup': args.warmup,
+                'iterations': args.iterations,
+                'results': results,
+            }, baseline_file, indent=2)
+        output.write('Baseline saved to {}\n'.format(args.save_baseline))
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        output.write('Compared to {} (threshold: {:g}%):\n'.format(args.compare, args.threshold))
+        for name, result in results.items():
+            if name not in baseline:
+                output.write('{}  not in the baseline\n'.format(name))
+                continue
+            for metric in ('wallMs', 'cpuMs'):
+                before = baseline[name][metric]
+                difference, ci95 = compare_statistics(before, result[metric])
+                change = difference / before['mean'] * 100 if before['mean'] else 0
+                # Only significant changes past the threshold are regressions
+                regression = change > args.threshold and difference - ci95 > 0
+                output.write('{}  {}: {:+.1f}% ({:+.3f} ms ± {:.3f} ms){}\n'.format(
+                    name, metric[:-2], change, difference, ci95,
+                    ', regression' if regression else ''))
+                if regression:
+                    regressions.append('{} {}'.format(name, metric[:-2]))
+    output.close()
+    if regressions:
+        sys.exit('Performance regressions: {}'.format(', '.join(regressions)))
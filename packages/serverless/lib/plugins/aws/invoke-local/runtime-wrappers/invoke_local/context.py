@@ -0,0 +1,55 @@
+import os
+import sys
+import uuid
+from time import strftime, time
+
+
+class FakeLambdaContext(object):
+    def __init__(self, name='Fake', version='LATEST', timeout=6,
+                 memorySize=os.environ.get('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', 1024),
+                 awsRequestId=None,
+                 environmentId='58419525dade4d17a495dceeeed44708', **kwargs):
+        self.name = name
+        self.version = version
+        self.memory_size = int(memorySize)
+        self.request_id = awsRequestId or str(uuid.uuid4())
+        self.environment_id = environmentId
+        self.created = time()
+        self.timeout = timeout
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def get_remaining_time_in_millis(self):
+        return int(max((self.timeout * 1000) - (int(round(time() * 1000)) - int(round(self.created * 1000))), 0))
+
+    @property
+    def function_name(self):
+        return self.name
+
+    @property
+    def function_version(self):
+        return self.version
+
+    @property
+    def invoked_function_arn(self):
+        return 'arn:aws:lambda:serverless:' + self.name
+
+    @property
+    def memory_limit_in_mb(self):
+        return str(self.memory_size)
+
+    @property
+    def aws_request_id(self):
+        return self.request_id
+
+    @property
+    def log_group_name(self):
+        return '/aws/lambda/' + self.name
+
+    @property
+    def log_stream_name(self):
+        return strftime('%Y/%m/%d') +'/[$' + self.version + ']' + self.environment_id
+
+    @property
+    def log(self):
+        return sys.stdout.write
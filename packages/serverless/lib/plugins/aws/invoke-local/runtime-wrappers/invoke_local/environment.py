@@ -0,0 +1,258 @@
+import json
+import mmap
+import os
+import subprocess
+import sys
+import traceback
+import warnings
+from contextlib import nullcontext
+from importlib import import_module
+from time import perf_counter, process_time
+
+from invoke_local import is_wrapper_file
+from invoke_local.context import FakeLambdaContext
+from invoke_local.profiling import CPUProfiler, ImportProfiler, partial_profile_path
+from invoke_local.report import resident_memory, write_report, write_start
+from invoke_local.serialization import json_default, marshal_error
+from invoke_local.streaming import ResponseStream, collect
+from invoke_local.watchdogs import MemoryWatchdog, TimeoutWatchdog
+
+
+def load_handler(handler_path, handler_name):
+    module = import_module(handler_path.replace('/', '.'))
+    return getattr(module, handler_name)
+
+
+class ExecutionEnvironment(object):
+    """A handler imported once and invoked any number of times, like a Lambda
+    execution environment"""
+
+    def __init__(self, args):
+        # Stream the result of a killed invocation is written to, if any
+        self.results = None
+        self.context = None
+        self.start = None
+        self.args = args
+        self.start_watchdogs()
+        self.import_profiler = None
+        if args.profile_imports:
+            self.import_profiler = ImportProfiler(args.profile_imports, args.profile_imports_top)
+        start = perf_counter()
+        with self.import_profiler or nullcontext():
+            self.handler = load_handler(args.handler_path, args.handler_name)
+        self.init_duration = (perf_counter() - start) * 1000
+        # Time to restore a snapshot of the environment, when forked from one
+        self.restore_duration = None
+        # Time to parse the event of the next invocation, when known
+        self.parse_duration = None
+        self.report = args.report
+        self.profile_directory = args.cpu_profile
+        self.cpu_profiler = None
+        if args.cpu_profile:
+            self.cpu_profiler = CPUProfiler(args.profile_format, self.call_handler.__code__)
+        self.invoked = False
+        # Duration of the last invocation, and CPU time of the process during
+        # it, in milliseconds
+        self.duration = 0
+        self.cpu_duration = 0
+        self.loop = None
+        # Binary output responses are streamed to, if streaming
+        self.stream_output = None
+
+    def reload_handler(self):
+        module = sys.modules.get(self.args.handler_path.replace('/', '.'))
+        if module is not None:
+            self.handler = getattr(module, self.args.handler_name, self.handler)
+
+    def start_watchdogs(self):
+        args = self.args
+        self.timeout_watchdog = TimeoutWatchdog(self) if args.enforce_timeout else None
+        self.memory_watchdog = None
+        if args.enforce_memory or args.track_allocations:
+            if resident_memory() is None:
+                sys.stderr.write('Memory use cannot be measured on this platform\n')
+            else:
+                self.memory_watchdog = MemoryWatchdog(
+                    self, args.memory_limit or FakeLambdaContext().memory_size,
+                    args.enforce_memory, args.track_allocations, args.track_allocations_top)
+
+    def call(self, event, context_args):
+        context = FakeLambdaContext(**context_args)
+        # As with Lambda, only the first invocation reports the init duration
+        init_duration = None if self.invoked else self.init_duration
+        self.invoked = True
+        write_start(self.report, context)
+        import_profiler, self.import_profiler = self.import_profiler, None
+        status = 'error'
+        if self.memory_watchdog is not None:
+            self.memory_watchdog.reported = False
+        self.context = context
+        if self.stream_output is not None:
+            context.response_stream = ResponseStream(self.stream_output)
+        self.start = start = perf_counter()
+        cpu_start = process_time()
+        if self.timeout_watchdog is not None:
+            self.timeout_watchdog.arm(float(context.timeout))
+        try:
+            if import_profiler is not None:
+                # Not CPU profiled, as tracing for the import profile would
+                # skew it
+                result = import_profiler.trace_usage(lambda: self.call_handler(event, context))
+            elif self.cpu_profiler is not None:
+                result = self.cpu_profiler.run(lambda: self.call_handler(event, context))
+            else:
+                result = self.call_handler(event, context)
+            status = 'success'
+            return result
+        finally:
+            self.duration = (perf_counter() - start) * 1000
+            self.cpu_duration = (process_time() - cpu_start) * 1000
+            if self.timeout_watchdog is not None:
+                self.timeout_watchdog.disarm()
+            self.context = None
+            if import_profiler is not None:
+                import_profiler.write_report()
+            if self.stream_output is not None:
+                context.response_stream.write_summary()
+            write_report(self.report, context, self.duration, init_duration, status,
+                         self.restore_duration, self.parse_duration)
+            self.parse_duration = None
+
+    def call_handler(self, event, context):
+        result = self.handler(event, context)
+        # Async handlers are run to completion. Checked with hasattr(), which
+        # is cheaper than ABCs.
+        if hasattr(result, '__await__'):
+            result = self.get_event_loop().run_until_complete(result)
+        if self.stream_output is None:
+            # Async generators are collected into a list
+            if hasattr(result, '__anext__'):
+                return self.get_event_loop().run_until_complete(collect(result))
+            return result
+        # Generators and other iterators are streamed chunk by chunk, as is
+        # anything written to context.response_stream by the handler
+        stream = context.response_stream
+        if hasattr(result, '__anext__'):
+            self.get_event_loop().run_until_complete(stream.write_all(result))
+        elif hasattr(result, '__next__'):
+            for chunk in result:
+                stream.write(chunk)
+        elif result is not None or not stream.chunks:
+            stream.write(result)
+        return None
+
+    def get_event_loop(self):
+        # A single loop runs all the invocations of the environment, so that
+        # clients bound to it at import (aiohttp sessions & co.) keep working
+        if self.loop is None:
+            import asyncio
+            with warnings.catch_warnings():
+                # Getting the loop outside of one is deprecated, but it is the
+                # one such clients were bound to, if any
+                warnings.simplefilter('ignore', DeprecationWarning)
+                try:
+                    self.loop = asyncio.get_event_loop()
+                except RuntimeError:
+                    self.loop = None
+            if self.loop is None or self.loop.is_closed():
+                self.loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self.loop)
+        return self.loop
+
+    def kill(self, status, error, exit_status):
+        # Called from a watchdog thread, while the handler keeps running. The
+        # supervisor of the process, if any, reports the error from the exit
+        # status.
+        context = self.context
+        if context is not None:
+            write_report(self.report, context, (perf_counter() - self.start) * 1000, None, status)
+        if self.results is not None:
+            self.results.write(json.dumps(error) + '\n')
+            self.results.flush()
+        sys.stderr.flush()
+        os._exit(exit_status)
+
+    def close(self):
+        if self.cpu_profiler is not None:
+            os.makedirs(self.profile_directory, exist_ok=True)
+            self.cpu_profiler.dump(partial_profile_path(self.profile_directory))
+
+
+def open_tty_stdin():
+    # Re-attach stdin to the terminal once the input has been consumed, so
+    # that debuggers (pdb & co.) keep working inside handlers
+    if sys.platform == 'win32':
+        return
+    try:
+        if sys.platform != 'darwin':
+            subprocess.check_call('tty', stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    else:
+        sys.stdin = open('/dev/tty')
+
+
+def format_error(error):
+    # Same shape as the error payload returned by the Lambda Python runtime,
+    # leaving out the frames of this wrapper, and of the event loop running
+    # async handlers
+    frames = [frame for frame in traceback.extract_tb(error.__traceback__)
+              if not is_wrapper_file(frame.filename)]
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is not None:
+        asyncio_directory = os.path.dirname(asyncio.__file__) + os.sep
+        while frames and frames[0].filename.startswith(asyncio_directory):
+            frames.pop(0)
+    return {
+        'errorMessage': str(error),
+        'errorType': type(error).__name__,
+        'stackTrace': traceback.format_list(frames),
+    }
+
+
+def invoke(environment, event, context_args):
+    """Runs a single invocation, returning its JSON output, whether it failed
+    and the handler duration in milliseconds"""
+    try:
+        result = environment.call(event, context_args)
+    except Exception as error:
+        return json.dumps(format_error(error)), True, environment.duration
+    try:
+        return json.dumps(result, default=json_default), False, environment.duration
+    except (TypeError, ValueError, OverflowError) as error:
+        return json.dumps(marshal_error(error)), True, environment.duration
+
+
+def read_event_file(path, event_format):
+    """Reads an event from a file mapped in memory, so that it is decoded and
+    parsed straight from the page cache, without other copies"""
+    with open(path, 'rb') as event_file:
+        # Empty files cannot be mapped
+        if not os.fstat(event_file.fileno()).st_size:
+            data = b''
+        else:
+            with mmap.mmap(event_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = mapped[:] if event_format == 'bytes' else str(mapped, 'utf-8')
+    if event_format == 'json':
+        return json.loads(data or '{}')
+    if event_format == 'str' and not data:
+        return ''
+    return data
+
+
+def redirect_stdout():
+    # Results are written to the original stdout, while anything the handler
+    # prints is sent to stderr, as Lambda would send it to the logs instead of
+    # the response
+    results = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return results
+
+
+def invoke_line(environment, line, context_args):
+    try:
+        event = json.loads(line)
+    except ValueError as error:
+        return json.dumps(format_error(error)), True, 0
+    return invoke(environment, event, context_args)
@@ -0,0 +1,109 @@
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import traceback
+from importlib import import_module
+from time import perf_counter
+
+from invoke_local.context import FakeLambdaContext
+from invoke_local.environment import ExecutionEnvironment, invoke_line
+from invoke_local.results import read_events
+from invoke_local.watchdogs import exit_error
+
+
+def load_hook(hook):
+    module, _, name = hook.partition(':')
+    return getattr(import_module(module), name)
+
+
+def snapshot_hooks(registry, hooks):
+    # Hooks registered with the snapshot_restore_py library, as for SnapStart,
+    # followed by the ones given as MODULE:FUNCTION
+    library = sys.modules.get('snapshot_restore_py')
+    registered = list(getattr(library, registry)()) if library is not None else []
+    return registered + [(load_hook(hook), (), {}) for hook in hooks or ()]
+
+
+def exit_code(status):
+    # Same as os.waitstatus_to_exitcode(), which needs Python 3.9
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_forked(environment, args, line, context_args, connection, fork_start, first):
+    # In the child process, which never returns
+    status = 1
+    try:
+        started = perf_counter()
+        for hook, hook_args, hook_kwargs in snapshot_hooks('get_after_restore', args.after_restore):
+            hook(*hook_args, **hook_kwargs)
+        # As with SnapStart, the REPORT has a restore duration instead of an
+        # init one
+        environment.invoked = True
+        environment.restore_duration = (perf_counter() - fork_start) * 1000
+        # Imports are only profiled by the first child, as they were by the
+        # first invocation otherwise
+        if not first:
+            environment.import_profiler = None
+        # Threads are not forked along with the parent
+        environment.start_watchdogs()
+        output, is_error, duration = invoke_line(environment, line, context_args)
+        connection.send((output, is_error, duration, (started - fork_start) * 1000))
+        status = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+def replay_in_forks(args, context_args, replay_results):
+    """Imports the handler and runs the before snapshot hooks once, then runs
+    every event in a child process forked from this one, which starts with
+    the same clean state, up to --workers at a time"""
+    environment = ExecutionEnvironment(args)
+    for hook, hook_args, hook_kwargs in snapshot_hooks('get_before_snapshot', args.before_snapshot):
+        hook(*hook_args, **hook_kwargs)
+    timeout = FakeLambdaContext(**context_args).timeout
+    # Index of the event, process id and fork time of every running child, by
+    # the connection its result is read from
+    children = {}
+
+    def collect(connection):
+        index, pid, fork_start = children.pop(connection)
+        try:
+            output, is_error, duration, fork_latency = connection.recv()
+            replay_results.fork_latencies.append(fork_latency)
+        except (EOFError, OSError):
+            output = None
+        connection.close()
+        _, status = os.waitpid(pid, 0)
+        if output is None:
+            # The child was killed, after running for as long as it was alive
+            output = json.dumps(exit_error(exit_code(status), timeout))
+            is_error, duration = True, (perf_counter() - fork_start) * 1000
+        replay_results.record(index, output, is_error, duration)
+
+    start = perf_counter()
+    for index, line in enumerate(read_events(args.replay)):
+        while len(children) >= args.workers:
+            for connection in multiprocessing.connection.wait(list(children)):
+                collect(connection)
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        fork_start = perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            reader.close()
+            run_forked(environment, args, line, context_args, writer, fork_start, index == 0)
+        writer.close()
+        children[reader] = (index, pid, fork_start)
+    while children:
+        for connection in multiprocessing.connection.wait(list(children)):
+            collect(connection)
+    return perf_counter() - start
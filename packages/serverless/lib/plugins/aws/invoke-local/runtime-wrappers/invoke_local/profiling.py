@@ -0,0 +1,304 @@
+import cProfile
+import glob
+import importlib._bootstrap
+import json
+import os
+import pstats
+import signal
+import sys
+import threading
+from time import perf_counter, process_time, sleep
+
+
+def top_level_package(module_name):
+    return module_name.partition('.')[0]
+
+
+class ImportProfiler(object):
+    """Times every module import, nested under the import that triggered it,
+    by wrapping the importlib function all import statements go through"""
+
+    def __init__(self, trace_path, top):
+        self.trace_path = trace_path
+        self.top = top
+        self.roots = []
+        self.stack = []
+        self.used = set()
+        self.thread = threading.get_ident()
+
+    def __enter__(self):
+        self.find_and_load = importlib._bootstrap._find_and_load
+        importlib._bootstrap._find_and_load = self.profiled_find_and_load
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        importlib._bootstrap._find_and_load = self.find_and_load
+
+    def profiled_find_and_load(self, name, *args):
+        # Imports made by other threads would be nested under unrelated ones
+        if threading.get_ident() != self.thread:
+            return self.find_and_load(name, *args)
+        node = {'name': name, 'start': perf_counter(), 'children': [], 'failed': False}
+        (self.stack[-1]['children'] if self.stack else self.roots).append(node)
+        self.stack.append(node)
+        try:
+            return self.find_and_load(name, *args)
+        except ImportError:
+            # Optional dependencies probed with try/except ImportError
+            node['failed'] = True
+            raise
+        finally:
+            self.stack.pop()
+            node['end'] = perf_counter()
+            node['cumulative'] = node['end'] - node['start']
+            node['self'] = node['cumulative'] - sum(
+                child['cumulative'] for child in node['children'])
+
+    def walk(self, nodes=None, ancestors=()):
+        # Yields every import along with the names of the ones it is nested in
+        for node in self.roots if nodes is None else nodes:
+            yield node, ancestors
+            for item in self.walk(node['children'], ancestors + (node['name'],)):
+                yield item
+
+    def trace_usage(self, call):
+        """Runs the first invocation, recording which top-level packages had
+        code executed during it"""
+        used = self.used = set()
+
+        def profile(frame, event, arg):
+            if event == 'call':
+                used.add(top_level_package(frame.f_globals.get('__name__') or ''))
+            elif event == 'c_call':
+                module = (getattr(arg, '__module__', None)
+                          or type(getattr(arg, '__self__', None)).__module__)
+                used.add(top_level_package(module or ''))
+
+        sys.setprofile(profile)
+        threading.setprofile(profile)
+        try:
+            return call()
+        finally:
+            sys.setprofile(None)
+            threading.setprofile(None)
+
+    def write_report(self):
+        records = list(self.walk())
+        packages = {}
+        for node, ancestors in records:
+            package = top_level_package(node['name'])
+            if node['failed']:
+                continue
+            # Only count the outermost import of a package, as nested ones are
+            # already part of its cumulative time
+            if package not in map(top_level_package, ancestors):
+                packages[package] = packages.get(package, 0) + node['cumulative']
+
+        output = sys.stderr
+        output.write('Import time of {} modules (ms):\n'.format(len(records)))
+        output.write('{:>10} {:>11}  {}\n'.format('self', 'cumulative', 'module'))
+        by_self = sorted(records, key=lambda record: record[0]['self'], reverse=True)
+        for node, ancestors in by_self[:self.top]:
+            output.write('{:>10.2f} {:>11.2f}  {}{}\n'.format(
+                node['self'] * 1000, node['cumulative'] * 1000,
+                '  ' * len(ancestors), node['name']))
+
+        output.write('Most expensive packages (ms):\n')
+        by_cost = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        for package, cumulative in by_cost[:self.top]:
+            output.write('{:>10.2f}  {}\n'.format(cumulative * 1000, package))
+
+        # Standard library modules are cheap to keep and mostly imported by
+        # other packages, only third-party and project ones are flagged
+        stdlib = set(getattr(sys, 'stdlib_module_names', ())) | set(sys.builtin_module_names)
+        unused = [(package, cumulative) for package, cumulative in by_cost
+                  if package not in self.used and package not in stdlib]
+        if unused:
+            output.write('Packages with no code run by the first invocation'
+                         ' (candidates for lazy imports) (ms):\n')
+            for package, cumulative in unused[:self.top]:
+                output.write('{:>10.2f}  {}\n'.format(cumulative * 1000, package))
+
+        # Chrome trace event format, which speedscope and chrome://tracing open
+        trace_events = [{
+            'name': node['name'],
+            'cat': 'import',
+            'ph': 'X',
+            'ts': (node['start'] - self.start) * 1e6,
+            'dur': node['cumulative'] * 1e6,
+            'pid': os.getpid(),
+            'tid': 1,
+        } for node, _ in records]
+        directory = os.path.dirname(self.trace_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.trace_path, 'w') as trace:
+            json.dump({'traceEvents': trace_events}, trace)
+        output.write('Import trace written to {}\n'.format(self.trace_path))
+
+
+PROFILE_FILES = {
+    'pstats': 'profile.pstats',
+    'collapsed': 'profile.collapsed.txt',
+    'speedscope': 'profile.speedscope.json',
+}
+
+
+class CPUProfiler(object):
+    """Profiles handler calls only, accumulating over all the invocations of
+    an execution environment. pstats profiles are recorded with cProfile,
+    other formats by sampling stacks, as they need whole ones."""
+
+    def __init__(self, profile_format, root, interval=0.001):
+        self.profile_format = profile_format
+        # Code of the function calling the handler, whose frame and the ones
+        # above it are left out of the samples
+        self.root = root
+        self.interval = interval
+        if profile_format == 'pstats':
+            self.profile = cProfile.Profile()
+            return
+        # Sampled stacks, root first, mapped to the time spent in them in
+        # microseconds
+        self.samples = {}
+        self.running = False
+        if hasattr(signal, 'setitimer'):
+            # Sampled on the CPU time of the process, in the thread running
+            # the handler. The timer keeps running between invocations, so
+            # that those shorter than the interval are still sampled in
+            # proportion to their duration.
+            self.last_sample = process_time()
+            self.previous_handler = signal.signal(signal.SIGPROF, self.on_signal)
+            signal.setitimer(signal.ITIMER_PROF, interval, interval)
+        else:
+            # Windows: sampled from another thread, which needs the GIL to do
+            # so, make other threads hand it over as often as samples are taken
+            self.previous_switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(interval)
+            self.sampling = True
+            threading.Thread(target=self.sample, daemon=True).start()
+
+    def run(self, call):
+        if self.profile_format == 'pstats':
+            self.profile.enable()
+            try:
+                return call()
+            finally:
+                self.profile.disable()
+        self.thread = threading.get_ident()
+        self.running = True
+        try:
+            return call()
+        finally:
+            self.running = False
+
+    def record(self, frame, weight):
+        stack = []
+        # Only keep the frames below the handler call
+        while (frame is not None
+               and frame.f_code is not self.root):
+            code = frame.f_code
+            stack.append('{} ({}:{})'.format(code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        if frame is not None and stack:
+            key = tuple(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + weight
+
+    def on_signal(self, signum, frame):
+        # Each sample accounts for the time elapsed since the previous one,
+        # as the timer resolution can be coarser than the interval
+        now = process_time()
+        if self.running:
+            self.record(frame, int((now - self.last_sample) * 1e6))
+        self.last_sample = now
+
+    def sample(self):
+        last = perf_counter()
+        while self.sampling:
+            sleep(self.interval)
+            now = perf_counter()
+            if self.running:
+                self.record(sys._current_frames().get(self.thread), int((now - last) * 1e6))
+            last = now
+
+    def stop(self):
+        if hasattr(signal, 'setitimer'):
+            # A timer left running would kill the process with SIGPROF once
+            # the default handler is restored at exit
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self.previous_handler or signal.SIG_DFL)
+        else:
+            self.sampling = False
+            sys.setswitchinterval(self.previous_switch_interval)
+
+    def dump(self, path):
+        if self.profile_format == 'pstats':
+            self.profile.dump_stats(path)
+            return
+        self.stop()
+        with open(path, 'w') as output:
+            for stack, weight in self.samples.items():
+                output.write('{} {}\n'.format(';'.join(stack), weight))
+
+
+def partial_profile_path(directory):
+    return os.path.join(directory, 'profile-{}.partial'.format(os.getpid()))
+
+
+def write_profile(directory, profile_format):
+    """Merges the partial profiles dumped by every execution environment into
+    the final profile"""
+    partials = glob.glob(os.path.join(directory, 'profile-*.partial'))
+    if not partials:
+        return
+    path = os.path.join(directory, PROFILE_FILES[profile_format])
+    if profile_format == 'pstats':
+        pstats.Stats(*partials).dump_stats(path)
+    else:
+        samples = {}
+        for partial in partials:
+            with open(partial) as lines:
+                for line in lines:
+                    stack, _, weight = line.rstrip('\n').rpartition(' ')
+                    samples[stack] = samples.get(stack, 0) + int(weight)
+        with open(path, 'w') as output:
+            if profile_format == 'collapsed':
+                for stack, weight in samples.items():
+                    output.write('{} {}\n'.format(stack, weight))
+            else:
+                json.dump(speedscope_profile(samples), output)
+    for partial in partials:
+        os.remove(partial)
+    sys.stderr.write('CPU profile written to {}\n'.format(path))
+
+
+def speedscope_profile(samples):
+    frames = []
+    frame_indexes = {}
+    stacks = []
+    for stack in samples:
+        indexes = []
+        for frame in stack.split(';'):
+            if frame not in frame_indexes:
+                frame_indexes[frame] = len(frames)
+                name, _, location = frame.rpartition(' (')
+                file, _, line = location.rstrip(')').rpartition(':')
+                frames.append({'name': name, 'file': file, 'line': int(line)})
+            indexes.append(frame_indexes[frame])
+        stacks.append(indexes)
+    weights = list(samples.values())
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': 'handler',
+            'unit': 'microseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': stacks,
+            'weights': weights,
+        }],
+        'exporter': 'serverless invoke local',
+    }
@@ -0,0 +1,140 @@
+import ast
+import importlib
+import importlib.util
+import os
+import sys
+import traceback
+import types
+
+from invoke_local import is_wrapper_file
+
+
+class ModuleReloader(object):
+    """Reloads the modules of the service which changed since they were
+    imported, along with the modules depending on them, while third party
+    ones stay in memory"""
+
+    def __init__(self, root):
+        self.root = os.path.join(os.path.realpath(root), '')
+        # (mtime, size) of the source of every module of the service, by name
+        self.sources = {}
+        self.paths = {}
+        # Size of sys.modules when last scanned for new modules
+        self.scanned = 0
+        self.scan()
+
+    def is_project_file(self, path):
+        path = os.path.realpath(path)
+        return (path.startswith(self.root) and path.endswith('.py')
+                and 'site-packages' not in path and 'dist-packages' not in path
+                and not is_wrapper_file(path))
+
+    def scan(self):
+        for name, module in list(sys.modules.items()):
+            if name in self.sources:
+                continue
+            path = getattr(module, '__file__', None)
+            if path and self.is_project_file(path):
+                self.paths[name] = path
+                self.sources[name] = self.stat(path)
+        self.scanned = len(sys.modules)
+
+    def stat(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def imports(self, name):
+        # Modules named by the import statements of a module, which also
+        # covers values with no module of their own, e.g. constants
+        try:
+            with open(self.paths[name], 'rb') as source:
+                tree = ast.parse(source.read(), self.paths[name])
+        except (OSError, SyntaxError, ValueError):
+            return set()
+        package = getattr(sys.modules.get(name), '__package__', None) or ''
+        imported = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                imported.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                try:
+                    base = importlib.util.resolve_name(
+                        '.' * node.level + (node.module or ''), package)
+                except (ImportError, ValueError):
+                    continue
+                imported.add(base)
+                # Names imported from a package can be submodules of it
+                imported.update('{}.{}'.format(base, alias.name) for alias in node.names)
+        return imported
+
+    def dependencies(self, name):
+        # Modules of the service a module got names from, either as modules
+        # or as functions, classes, ... defined in them
+        module = sys.modules.get(name)
+        dependencies = {dependency for dependency in self.imports(name)
+                        if dependency != name and dependency in self.sources}
+        for value in list(vars(module).values()) if module is not None else ():
+            if isinstance(value, types.ModuleType):
+                dependency = value.__name__
+                # Submodules of a package are set on it once imported, which
+                # does not make the package depend on them
+                if dependency.startswith(name + '.'):
+                    continue
+            else:
+                dependency = getattr(value, '__module__', None)
+            if dependency != name and dependency in self.sources:
+                dependencies.add(dependency)
+        return dependencies
+
+    def check(self):
+        """Reloads the modules which changed along with their dependents, and
+        returns the names of the ones reloaded, in order"""
+        if len(sys.modules) != self.scanned:
+            self.scan()
+        changed = [name for name, source in self.sources.items()
+                   if self.stat(self.paths[name]) != source]
+        if not changed:
+            return []
+        graph = {name: self.dependencies(name) for name in self.sources}
+        stale = set(changed)
+        pending = list(changed)
+        while pending:
+            name = pending.pop()
+            for dependent, dependencies in graph.items():
+                if name in dependencies and dependent not in stale:
+                    stale.add(dependent)
+                    pending.append(dependent)
+        # Dependencies are reloaded before their dependents, so that these get
+        # the new definitions
+        order = []
+
+        def visit(name, visiting):
+            if name in order or name in visiting:
+                return
+            visiting.add(name)
+            for dependency in graph[name] & stale:
+                visit(dependency, visiting)
+            order.append(name)
+
+        for name in sorted(stale):
+            visit(name, set())
+        reloaded = []
+        for name in order:
+            self.sources[name] = self.stat(self.paths[name])
+            module = sys.modules.get(name)
+            if module is None:
+                continue
+            try:
+                importlib.reload(module)
+            except Exception as error:
+                # The previous version of the module stays in use until the
+                # next change
+                sys.stderr.write('Could not reload {}: {}\n'.format(
+                    name, ''.join(traceback.format_exception_only(type(error), error)).strip()))
+            else:
+                reloaded.append(name)
+        self.scan()
+        return reloaded
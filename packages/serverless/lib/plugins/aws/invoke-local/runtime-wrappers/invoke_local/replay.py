@@ -0,0 +1,193 @@
+import json
+import multiprocessing
+import multiprocessing.connection
+import queue
+import sys
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+from time import perf_counter
+
+from invoke_local.context import FakeLambdaContext
+from invoke_local.environment import (
+    ExecutionEnvironment, invoke_line, open_tty_stdin, redirect_stdout)
+from invoke_local.fork import replay_in_forks
+from invoke_local.profiling import write_profile
+from invoke_local.results import ReplayResults, print_replay_summary, read_events
+from invoke_local.watchdogs import exit_error
+
+
+def replay_in_process(args, context_args, replay_results):
+    environment = ExecutionEnvironment(args)
+    start = perf_counter()
+    for index, line in enumerate(read_events(args.replay)):
+        replay_results.record(index, *invoke_line(environment, line, context_args))
+    elapsed = perf_counter() - start
+    environment.close()
+    return elapsed
+
+
+def pool_worker(connection, args, context_args):
+    # Every worker is a separate execution environment, with its own import of
+    # the handler and its own log stream
+    sys.path.append('.')
+    # Imports are only profiled for in-process invocations
+    args.profile_imports = None
+    context_args = dict(context_args, environmentId=uuid.uuid4().hex)
+    environment = ExecutionEnvironment(args)
+    connection.send(('ready', environment.init_duration))
+
+    # Chunks are received on a separate thread, so that the parent is never
+    # blocked sending a chunk while this worker is blocked sending a result
+    chunks = queue.Queue()
+
+    def receive():
+        while True:
+            chunk = connection.recv()
+            chunks.put(chunk)
+            if chunk is None:
+                break
+
+    threading.Thread(target=receive, daemon=True).start()
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            break
+        for index, line in chunk:
+            connection.send(('result', index) + invoke_line(environment, line, context_args))
+    environment.close()
+
+
+class PoolWorker(object):
+    def __init__(self, multiprocessing_context, args, context_args):
+        self.connection, worker_connection = multiprocessing_context.Pipe()
+        self.process = multiprocessing_context.Process(
+            target=pool_worker,
+            args=(worker_connection, args, context_args))
+        self.timeout = FakeLambdaContext(**context_args).timeout
+        self.process.daemon = True
+        self.process.start()
+        worker_connection.close()
+        self.ready = False
+        # (index, line) of the events sent to the worker, in order
+        self.pending = deque()
+        # Time the worker started running the first pending event
+        self.started = None
+
+    def submit(self, chunk):
+        if not self.pending:
+            self.started = perf_counter()
+        self.pending.extend(chunk)
+        try:
+            self.connection.send(chunk)
+        except OSError:
+            # The worker died, which is handled when reading its results
+            pass
+
+    def exit_error(self):
+        self.process.join()
+        return json.dumps(exit_error(self.process.exitcode, self.timeout))
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join()
+
+
+def replay_in_pool(args, context_args, replay_results):
+    # Workers are spawned rather than forked, so that each of them pays its
+    # own cold start, like separate Lambda execution environments
+    multiprocessing_context = multiprocessing.get_context('spawn')
+    workers = [PoolWorker(multiprocessing_context, args, context_args)
+               for _ in range(args.workers)]
+    for worker in workers:
+        try:
+            worker.connection.recv()
+        except (EOFError, OSError):
+            sys.exit('Handler initialization failed in a worker')
+        worker.ready = True
+
+    events = enumerate(read_events(args.replay))
+    exhausted = False
+    # In ordered mode, bound how far ahead of the next result to write events
+    # are dispatched, so that a slow event cannot make the results held back
+    # grow without limit
+    window = args.workers * args.chunk_size * 4
+    dispatched = 0
+    record = replay_results.record
+
+    start = perf_counter()
+    while True:
+        for worker in workers:
+            # Keep up to two chunks in flight per worker, so it never waits
+            # for the next one
+            while (not exhausted and len(worker.pending) < args.chunk_size
+                   and (args.unordered or dispatched - replay_results.next_index < window)):
+                chunk = list(islice(events, args.chunk_size))
+                if not chunk:
+                    exhausted = True
+                    break
+                worker.submit(chunk)
+                dispatched += len(chunk)
+
+        busy = {worker.connection: worker for worker in workers if worker.pending}
+        if not busy:
+            break
+        for connection in multiprocessing.connection.wait(list(busy)):
+            worker = busy[connection]
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                if not worker.ready:
+                    sys.exit('Handler initialization failed in a worker')
+                # The worker died: fail the event it was running, with the
+                # time it ran for, and hand the rest of its events to a fresh
+                # one
+                duration = (perf_counter() - worker.started) * 1000
+                index, _ = worker.pending.popleft()
+                record(index, worker.exit_error(), True, duration)
+                replacement = PoolWorker(multiprocessing_context, args, context_args)
+                if worker.pending:
+                    replacement.submit(list(worker.pending))
+                workers[workers.index(worker)] = replacement
+                continue
+            # The next pending event starts once the worker is ready, or done
+            # with the previous one
+            worker.started = perf_counter()
+            if message[0] == 'ready':
+                worker.ready = True
+                continue
+            _, index, output, is_error, duration = message
+            worker.pending.popleft()
+            record(index, output, is_error, duration)
+
+    elapsed = perf_counter() - start
+    for worker in workers:
+        worker.stop()
+    return elapsed
+
+
+def run_replay(args):
+    context_args = json.loads(args.context)
+    results = open(args.output, 'w') if args.output else redirect_stdout()
+    open_tty_stdin()
+
+    if args.workers > 1 and args.profile_imports and not args.fork:
+        sys.stderr.write('Imports are not profiled when replaying with several workers\n')
+
+    with results:
+        replay_results = ReplayResults(results, args.unordered)
+        if args.fork:
+            elapsed = replay_in_forks(args, context_args, replay_results)
+        # Events of environments which may be killed are run in a worker, which
+        # is replaced when it is
+        elif args.workers > 1 or args.enforce_memory or args.enforce_timeout:
+            elapsed = replay_in_pool(args, context_args, replay_results)
+        else:
+            elapsed = replay_in_process(args, context_args, replay_results)
+    print_replay_summary(replay_results, elapsed, args.workers)
+    if args.cpu_profile:
+        write_profile(args.cpu_profile, args.profile_format)
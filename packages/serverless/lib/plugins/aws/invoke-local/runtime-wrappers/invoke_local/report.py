@@ -0,0 +1,95 @@
+import json
+import math
+import sys
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+def max_memory_used():
+    # Peak RSS of the process in MB, or None where it cannot be measured
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return int(math.ceil(peak / (1024.0 * 1024 if sys.platform == 'darwin' else 1024.0)))
+
+
+def resident_memory():
+    # Current RSS of the process in MB where /proc is available, the peak one
+    # otherwise
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return max_memory_used()
+    return pages * resource.getpagesize() / (1024.0 * 1024)
+
+
+def write_log_event(event_type, record):
+    # Same shape as Lambda platform events in the JSON log format
+    sys.stderr.write(json.dumps({
+        'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+        'type': event_type,
+        'record': record,
+    }) + '\n')
+
+
+def write_start(report_format, context):
+    if report_format == 'json':
+        write_log_event('platform.start', {
+            'requestId': context.aws_request_id,
+            'version': '$' + context.function_version,
+        })
+    elif report_format == 'text':
+        sys.stderr.write('START RequestId: {} Version: ${}\n'.format(
+            context.aws_request_id, context.function_version))
+
+
+def write_report(report_format, context, duration, init_duration, status,
+                 restore_duration=None, parse_duration=None):
+    if not report_format:
+        return
+    # Lambda bills the duration rounded up to the nearest millisecond
+    billed_duration = max(int(math.ceil(duration)), 1)
+    memory_used = max_memory_used()
+    if report_format == 'json':
+        metrics = {
+            'durationMs': round(duration, 2),
+            'billedDurationMs': billed_duration,
+            'memorySizeMB': context.memory_size,
+        }
+        if memory_used is not None:
+            metrics['maxMemoryUsedMB'] = memory_used
+        if init_duration is not None:
+            metrics['initDurationMs'] = round(init_duration, 2)
+        if restore_duration is not None:
+            metrics['restoreDurationMs'] = round(restore_duration, 2)
+        if parse_duration is not None:
+            metrics['parseDurationMs'] = round(parse_duration, 2)
+        write_log_event('platform.report', {
+            'requestId': context.aws_request_id,
+            'metrics': metrics,
+            'status': status,
+        })
+        return
+    fields = [
+        'Duration: {:.2f} ms'.format(duration),
+        'Billed Duration: {} ms'.format(billed_duration),
+        'Memory Size: {} MB'.format(context.memory_size),
+    ]
+    if memory_used is not None:
+        fields.append('Max Memory Used: {} MB'.format(memory_used))
+    if init_duration is not None:
+        fields.append('Init Duration: {:.2f} ms'.format(init_duration))
+    if restore_duration is not None:
+        fields.append('Restore Duration: {:.2f} ms'.format(restore_duration))
+    if parse_duration is not None:
+        fields.append('Parse Duration: {:.2f} ms'.format(parse_duration))
+    sys.stderr.write('END RequestId: {}\n'.format(context.aws_request_id))
+    sys.stderr.write('REPORT RequestId: {}\t{}\t\n'.format(
+        context.aws_request_id, '\t'.join(fields)))
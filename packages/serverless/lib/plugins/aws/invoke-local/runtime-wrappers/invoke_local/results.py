@@ -0,0 +1,65 @@
+import math
+import sys
+
+
+def percentile(sorted_values, percent):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0
+    rank = max(int(math.ceil(percent / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[rank]
+
+
+def write_percentiles(label, values):
+    values.sort()
+    sys.stderr.write(
+        '{} p50: {:.2f} ms, p90: {:.2f} ms, p99: {:.2f} ms, max: {:.2f} ms\n'.format(
+            label, percentile(values, 50), percentile(values, 90),
+            percentile(values, 99), values[-1] if values else 0))
+
+
+def print_replay_summary(replay_results, elapsed, workers):
+    durations = replay_results.durations
+    sys.stderr.write(
+        'Replayed {} events ({} errors) in {:.2f} s with {} worker(s), {:.1f} events/s\n'.format(
+            len(durations), replay_results.errors, elapsed, workers,
+            len(durations) / elapsed if elapsed else 0))
+    write_percentiles('Duration', durations)
+    if replay_results.fork_latencies:
+        write_percentiles('Fork latency', replay_results.fork_latencies)
+
+
+def read_events(path):
+    # Lazily yields the events of a JSONL file, so that large captures do not
+    # have to fit in memory
+    with open(path) as events:
+        for line in events:
+            if line.strip():
+                yield line
+
+
+class ReplayResults(object):
+    """Writes the results of replayed events, in the order of the events
+    unless unordered, and keeps their durations"""
+
+    def __init__(self, output, unordered):
+        self.output = output
+        self.unordered = unordered
+        # In ordered mode, results are held back until all previous ones are
+        # written
+        self.buffered = {}
+        self.next_index = 0
+        self.durations = []
+        self.errors = 0
+        self.fork_latencies = []
+
+    def record(self, index, output, is_error, duration):
+        self.durations.append(duration)
+        self.errors += is_error
+        if self.unordered:
+            self.output.write('{{"index": {}, "result": {}}}\n'.format(index, output))
+            return
+        self.buffered[index] = output
+        while self.next_index in self.buffered:
+            self.output.write(self.buffered.pop(self.next_index) + '\n')
+            self.next_index += 1
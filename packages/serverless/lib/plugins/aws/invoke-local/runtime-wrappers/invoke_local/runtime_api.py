@@ -0,0 +1,269 @@
+import json
+import multiprocessing
+import queue
+import signal
+import sys
+import threading
+import uuid
+from time import perf_counter, time
+
+from invoke_local.context import FakeLambdaContext
+from invoke_local.environment import ExecutionEnvironment, invoke_line
+from invoke_local.results import write_percentiles
+from invoke_local.watchdogs import exit_error
+
+
+# Path prefix of the Lambda Runtime API
+RUNTIME_API_PATH = '/2018-06-01/runtime/'
+
+
+def run_runtime_client(environment, api, context_args):
+    """Runs invocations fetched from a Lambda Runtime API, at HOST:PORT
+    optionally followed by a path prefix, as the Lambda runtime does"""
+    import http.client
+    host, _, prefix = api.partition('/')
+    base = ('/' + prefix if prefix else '') + RUNTIME_API_PATH
+    connection = http.client.HTTPConnection(host)
+    while True:
+        connection.request('GET', base + 'invocation/next')
+        response = connection.getresponse()
+        event = response.read().decode('utf-8')
+        request_id = response.getheader('Lambda-Runtime-Aws-Request-Id')
+        output, is_error, _ = invoke_line(
+            environment, event, dict(context_args, awsRequestId=request_id))
+        connection.request(
+            'POST', '{}invocation/{}/{}'.format(base, request_id, 'error' if is_error else 'response'),
+            output.encode('utf-8'), {'Content-Type': 'application/json'})
+        connection.getresponse().read()
+
+
+def runtime_api_worker(api, args, context_args):
+    sys.path.append('.')
+    args.profile_imports = None
+    context_args = dict(context_args, environmentId=uuid.uuid4().hex)
+    environment = ExecutionEnvironment(args)
+    try:
+        run_runtime_client(environment, api, context_args)
+    except KeyboardInterrupt:
+        # Stopped along with the server
+        pass
+
+
+class Invocation(object):
+    def __init__(self, event):
+        self.request_id = str(uuid.uuid4())
+        self.event = event
+        self.arrived = perf_counter()
+        self.dispatched = None
+        self.done = threading.Event()
+        self.output = None
+        self.is_error = False
+
+
+class RuntimeAPI(object):
+    """Invocations of a Lambda Runtime API served to a pool of workers. They
+    wait in a queue until a worker fetches the next one. As with reserved
+    concurrency, invocations beyond the number of workers, and the size of the
+    queue, are throttled."""
+
+    def __init__(self, concurrency, max_queue):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        # Invocations queued or running
+        self.admitted = 0
+        # Invocation run by each worker
+        self.running = {}
+        # Workers which exited
+        self.retired = set()
+        self.queue_delays = []
+        self.handler_times = []
+        self.errors = 0
+        self.throttled = 0
+        self.start = perf_counter()
+
+    def submit(self, event):
+        # None when throttled
+        with self.lock:
+            if self.admitted >= self.concurrency + self.max_queue:
+                self.throttled += 1
+                return None
+            self.admitted += 1
+        invocation = Invocation(event)
+        self.pending.put(invocation)
+        return invocation
+
+    def next(self, worker):
+        invocation = self.pending.get()
+        if worker in self.retired:
+            # The worker exited while waiting for it, another one runs it
+            self.pending.put(invocation)
+            return None
+        invocation.dispatched = perf_counter()
+        self.running[worker] = invocation
+        return invocation
+
+    def retire(self, worker):
+        # Returns the invocation the worker was running, if any
+        self.retired.add(worker)
+        return self.running.get(worker)
+
+    def complete(self, worker, request_id, output, is_error):
+        invocation = self.running.get(worker)
+        if invocation is None or invocation.request_id != request_id:
+            return False
+        del self.running[worker]
+        now = perf_counter()
+        with self.lock:
+            self.admitted -= 1
+            self.queue_delays.append((invocation.dispatched - invocation.arrived) * 1000)
+            self.handler_times.append((now - invocation.dispatched) * 1000)
+            self.errors += is_error
+        invocation.output = output
+        invocation.is_error = is_error
+        invocation.done.set()
+        return True
+
+    def print_summary(self, workers):
+        elapsed = perf_counter() - self.start
+        served = len(self.handler_times)
+        sys.stderr.write(
+            'Served {} invocations ({} errors, {} throttled) in {:.2f} s with {} worker(s),'
+            ' {:.1f} invocations/s\n'.format(
+                served, self.errors, self.throttled, elapsed, workers,
+                served / elapsed if elapsed else 0))
+        write_percentiles('Queueing delay', self.queue_delays)
+        write_percentiles('Handler time', self.handler_times)
+
+
+def run_runtime_api_server(args):
+    # Only imported in this mode, as they add to the cold start otherwise
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    context_args = json.loads(args.context)
+    context = FakeLambdaContext(**context_args)
+    api = RuntimeAPI(args.workers, args.max_queue)
+    # Workers which fetched an invocation, and so initialized successfully
+    ready = set()
+    initialization_failed = threading.Event()
+
+    class RuntimeAPIHandler(BaseHTTPRequestHandler):
+        # Keep-alive connections, with headers and body sent without waiting
+        # for the acknowledgement of the previous segment
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def send(self, status, body, headers=()):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_error_type(self, status, error_type, message):
+            self.send(status, json.dumps({'Type': 'User', 'message': message}).encode('utf-8'),
+                      [('X-Amzn-ErrorType', error_type)])
+
+        def do_GET(self):
+            # Workers are told apart by the path prefix of their API
+            worker, _, path = self.path.partition(RUNTIME_API_PATH)
+            if path != 'invocation/next':
+                self.send_error_type(404, 'ResourceNotFoundException', 'Not found')
+                return
+            ready.add(worker)
+            invocation = api.next(worker)
+            if invocation is None:
+                self.close_connection = True
+                return
+            self.send(200, invocation.event, [
+                ('Lambda-Runtime-Aws-Request-Id', invocation.request_id),
+                ('Lambda-Runtime-Deadline-Ms', str(int((time() + context.timeout) * 1000))),
+                ('Lambda-Runtime-Invoked-Function-Arn', context.invoked_function_arn),
+            ])
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            worker, _, path = self.path.partition(RUNTIME_API_PATH)
+            parts = path.split('/')
+            if path == 'init/error':
+                sys.stderr.write('Handler initialization failed: {}\n'.format(body.decode('utf-8')))
+                self.send(202, b'{"status":"OK"}')
+            elif len(parts) == 3 and parts[0] == 'invocation' and parts[2] in ('response', 'error'):
+                if api.complete(worker, parts[1], body, parts[2] == 'error'):
+                    self.send(202, b'{"status":"OK"}')
+                else:
+                    self.send_error_type(400, 'InvalidRequestID', 'Invalid request ID')
+            elif (self.path.startswith('/2015-03-31/functions/')
+                  and self.path.endswith('/invocations')):
+                # Invoke API, used by load generators and AWS SDKs
+                invocation = api.submit(body or b'{}')
+                if invocation is None:
+                    self.send_error_type(429, 'TooManyRequestsException', 'Rate Exceeded.')
+                    return
+                invocation.done.wait()
+                headers = [('X-Amz-Function-Error', 'Unhandled')] if invocation.is_error else []
+                self.send(200, invocation.output, headers)
+            else:
+                self.send_error_type(404, 'ResourceNotFoundException', 'Not found')
+
+    class RuntimeAPIServer(ThreadingHTTPServer):
+        daemon_threads = True
+        # Load generators open many connections at once
+        request_queue_size = 1024
+
+    host, _, port = args.serve.rpartition(':')
+    server = RuntimeAPIServer((host or '127.0.0.1', int(port)), RuntimeAPIHandler)
+    address = '{}:{}'.format(*server.server_address[:2])
+
+    multiprocessing_context = multiprocessing.get_context('spawn')
+    worker_ids = iter(range(sys.maxsize))
+    stopping = False
+
+    def start_worker():
+        worker = '/{}'.format(next(worker_ids))
+        process = multiprocessing_context.Process(
+            target=runtime_api_worker, args=(address + worker, args, context_args))
+        process.daemon = True
+        process.start()
+        threading.Thread(target=supervise, args=(worker, process), daemon=True).start()
+
+    def supervise(worker, process):
+        # Replaces a worker that exits, failing the invocation it was running
+        process.join()
+        if stopping:
+            return
+        if worker not in ready:
+            initialization_failed.set()
+            server.shutdown()
+            return
+        invocation = api.retire(worker)
+        if invocation is not None:
+            api.complete(worker, invocation.request_id,
+                         json.dumps(exit_error(process.exitcode, context.timeout)).encode('utf-8'),
+                         True)
+        start_worker()
+
+    for _ in range(args.workers):
+        start_worker()
+    sys.stderr.write(
+        'Lambda Runtime API listening on http://{}, invoke the function with'
+        ' POST /2015-03-31/functions/{}/invocations\n'.format(address, context.function_name))
+    # Stopped with Ctrl+C, or SIGTERM, handled alike so that the summary is
+    # written either way
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopping = True
+        server.server_close()
+    if initialization_failed.is_set():
+        sys.exit('Handler initialization failed in a worker')
+    api.print_summary(args.workers)
@@ -0,0 +1,43 @@
+import base64
+import decimal
+import json
+from datetime import date, time as time_of_day
+
+
+def json_default(o):
+    # Values of types json does not handle itself. Anything else cannot be
+    # marshalled, as with Lambda, rather than being written as null.
+    if isinstance(o, decimal.Decimal):
+        # Integral values, as most DynamoDB numbers are, are kept exact
+        if o.is_finite() and o == o.to_integral_value():
+            return int(o)
+        return float(o)
+    if isinstance(o, (date, time_of_day)):
+        return o.isoformat()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, (bytes, bytearray, memoryview)):
+        return base64.b64encode(o).decode('ascii')
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(o).__name__))
+
+
+def marshal_error(error):
+    return {
+        'errorMessage': 'Unable to marshal response: {}'.format(error),
+        'errorType': 'Runtime.MarshalError',
+        'stackTrace': [],
+    }
+
+
+def write_json(output, result, compact):
+    """Writes a result to a text stream and returns the number of characters
+    written"""
+    if not compact:
+        serialized = json.dumps(result, default=json_default, indent=4)
+    else:
+        # json.dump() would write as it goes, but only json.dumps() runs the C
+        # encoder, several times faster, at the cost of holding the whole
+        # result in memory until it is written
+        serialized = json.dumps(result, default=json_default, separators=(',', ':'))
+    output.write(serialized)
+    return len(serialized)
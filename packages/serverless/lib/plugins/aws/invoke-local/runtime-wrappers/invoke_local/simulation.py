@@ -0,0 +1,165 @@
+import heapq
+import json
+import multiprocessing
+import sys
+from collections import deque
+from datetime import datetime
+from time import perf_counter
+
+from invoke_local.environment import open_tty_stdin, redirect_stdout
+from invoke_local.replay import PoolWorker
+from invoke_local.results import ReplayResults, read_events, write_percentiles
+
+
+def trace_time(value):
+    # Arrival times of a trace are in seconds, or ISO 8601 timestamps
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    return float(value)
+
+
+class SimulatedEnvironment(object):
+    """An execution environment of a simulation, backed by a worker process.
+    Its events are run one at a time, while the simulation keeps track of the
+    simulated time it is busy until."""
+
+    def __init__(self, multiprocessing_context, args, context_args, provisioned):
+        self.worker = PoolWorker(multiprocessing_context, args, context_args)
+        try:
+            _, init_duration = self.worker.connection.recv()
+        except (EOFError, OSError):
+            sys.exit('Handler initialization failed in a worker')
+        self.worker.ready = True
+        self.init_duration = init_duration
+        self.provisioned = provisioned
+        # Simulated time the environment is busy until, or idle since
+        self.available_at = 0
+        self.exited = False
+
+    def invoke(self, index, line):
+        start = perf_counter()
+        self.worker.submit([(index, line)])
+        try:
+            _, _, output, is_error, duration = self.worker.connection.recv()
+        except (EOFError, OSError):
+            # The environment is not reused once its worker exited, e.g. out
+            # of memory or past its timeout
+            self.exited = True
+            return self.worker.exit_error(), True, (perf_counter() - start) * 1000
+        finally:
+            self.worker.pending.clear()
+        return output, is_error, duration
+
+
+def run_simulation(args):
+    """Runs the events of a trace of arrivals against execution environments
+    created on demand up to a concurrency limit, and reused until idle for
+    longer than their expiry, to count cold starts, queueing and throttles"""
+    context_args = json.loads(args.context)
+    results = open(args.output, 'w') if args.output else redirect_stdout()
+    open_tty_stdin()
+    multiprocessing_context = multiprocessing.get_context('spawn')
+    replay_results = ReplayResults(results, False)
+
+    provisioned = [SimulatedEnvironment(multiprocessing_context, args, context_args, True)
+                   for _ in range(args.provisioned)]
+    idle = list(provisioned)
+    # (available_at, sequence, environment) of busy environments
+    busy = []
+    # (arrival, index, line) of events waiting for an environment
+    waiting = deque()
+    stats = {'environments': len(idle), 'cold': 0, 'warm': 0, 'throttles': 0, 'peak': 0}
+    init_durations = []
+    queueing_delays = []
+    durations = []
+
+    def run(environment, arrival, index, line, at):
+        queueing_delays.append((at - arrival) * 1000)
+        if environment is None:
+            environment = SimulatedEnvironment(
+                multiprocessing_context, args, context_args, False)
+            stats['environments'] += 1
+            stats['cold'] += 1
+            init_durations.append(environment.init_duration)
+            at += environment.init_duration / 1000
+        else:
+            stats['warm'] += 1
+        output, is_error, duration = environment.invoke(index, line)
+        replay_results.record(index, output, is_error, duration)
+        durations.append(duration)
+        environment.available_at = at + duration / 1000
+        heapq.heappush(busy, (environment.available_at, index, environment))
+        stats['peak'] = max(stats['peak'], len(busy))
+
+    def release(now):
+        # Environments done by now run the events waiting for one, or become
+        # idle
+        while busy and busy[0][0] <= now:
+            at, _, environment = heapq.heappop(busy)
+            if environment.exited:
+                environment.worker.process.join()
+                stats['environments'] -= 1
+                environment = None
+            if waiting:
+                arrival, index, line = waiting.popleft()
+                run(environment, arrival, index, line, at)
+            elif environment is not None:
+                idle.append(environment)
+
+    def expire(now):
+        for environment in list(idle):
+            if (not environment.provisioned
+                    and now - environment.available_at > args.idle_expiry):
+                idle.remove(environment)
+                environment.worker.stop()
+                stats['environments'] -= 1
+
+    first = last = None
+    with results:
+        for index, line in enumerate(read_events(args.simulate)):
+            arrival = json.loads(line)
+            now = trace_time(arrival['time'])
+            if last is not None and now < last:
+                sys.exit('Arrivals of the trace must be in order of time')
+            first = now if first is None else first
+            last = now
+            release(now)
+            expire(now)
+            line = json.dumps(arrival.get('event', {}))
+            if idle:
+                # Provisioned environments are used first, then the most
+                # recently used ones
+                environment = max(idle, key=lambda idle_environment: (
+                    idle_environment.provisioned, idle_environment.available_at))
+                idle.remove(environment)
+                run(environment, now, index, line, now)
+            elif stats['environments'] < args.concurrency:
+                run(None, now, index, line, now)
+            elif len(waiting) < args.max_queue:
+                waiting.append((now, index, line))
+            else:
+                stats['throttles'] += 1
+                replay_results.record(index, json.dumps({
+                    'errorMessage': 'Rate Exceeded.',
+                    'errorType': 'TooManyRequestsException',
+                }), True, 0)
+        release(float('inf'))
+
+    for _, _, environment in busy:
+        environment.worker.stop()
+    for environment in idle:
+        environment.worker.stop()
+
+    sys.stderr.write(
+        'Simulated {} invocations over {:.2f} s of traffic, with a concurrency of {} ({} provisioned)\n'.format(
+            len(durations) + stats['throttles'], (last - first) if first is not None else 0,
+            args.concurrency, args.provisioned))
+    sys.stderr.write('Cold starts: {}, warm starts: {}, throttles: {}, peak concurrency: {}\n'.format(
+        stats['cold'], stats['warm'], stats['throttles'], stats['peak']))
+    if provisioned:
+        sys.stderr.write('Provisioned init duration: {:.2f} ms\n'.format(
+            sum(environment.init_duration for environment in provisioned)))
+    sys.stderr.write('Init duration: {:.2f} ms\n'.format(sum(init_durations)))
+    write_percentiles('Cold start init', init_durations)
+    write_percentiles('Queueing delay', queueing_delays)
+    write_percentiles('Duration', durations)
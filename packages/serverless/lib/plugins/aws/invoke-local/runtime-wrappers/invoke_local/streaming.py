@@ -0,0 +1,47 @@
+import json
+import sys
+from time import perf_counter
+
+from invoke_local.serialization import json_default
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+class ResponseStream(object):
+    """Writes the chunks of a streamed response as soon as they are produced,
+    keeping count of them. Chunks other than strings and bytes are written as
+    JSON."""
+
+    def __init__(self, output):
+        self.output = output
+        self.start = perf_counter()
+        # Time to the first chunk, in milliseconds
+        self.first_chunk = None
+        self.bytes = 0
+        self.chunks = 0
+
+    def write(self, chunk):
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        elif not isinstance(chunk, (bytes, bytearray, memoryview)):
+            chunk = json.dumps(chunk, default=json_default).encode('utf-8')
+        if self.first_chunk is None:
+            self.first_chunk = (perf_counter() - self.start) * 1000
+        self.output.write(chunk)
+        self.output.flush()
+        self.bytes += len(chunk)
+        self.chunks += 1
+
+    async def write_all(self, iterator):
+        async for chunk in iterator:
+            self.write(chunk)
+
+    def write_summary(self):
+        if self.first_chunk is None:
+            sys.stderr.write('Streamed no chunks\n')
+            return
+        sys.stderr.write(
+            'Streamed {} bytes in {} chunks, time to first chunk: {:.2f} ms\n'.format(
+                self.bytes, self.chunks, self.first_chunk))
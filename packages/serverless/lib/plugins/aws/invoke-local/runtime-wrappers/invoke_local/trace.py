@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+
+from invoke_local.environment import ExecutionEnvironment, redirect_stdout
+
+
+class FileTracer(object):
+    """Records the files loaded by the process: the modules imported, the
+    files opened, e.g. data files or package metadata, and the shared
+    libraries mapped by the dynamic loader, which no audit event reports"""
+
+    def __init__(self):
+        self.paths = set()
+        self.tracing = False
+
+    def start(self):
+        # Audit hooks cannot be removed, only disabled
+        self.tracing = True
+        sys.addaudithook(self.audit)
+
+    def audit(self, event, event_args):
+        if not self.tracing or event != 'open' or isinstance(event_args[0], int):
+            return
+        try:
+            self.paths.add(os.path.abspath(os.fsdecode(event_args[0])))
+        except (TypeError, ValueError):
+            pass
+
+    def stop(self):
+        self.tracing = False
+        for module in list(sys.modules.values()):
+            path = getattr(module, '__file__', None)
+            if isinstance(path, str):
+                self.paths.add(os.path.abspath(path))
+        try:
+            with open('/proc/self/maps') as maps:
+                for line in maps:
+                    fields = line.split(None, 5)
+                    if len(fields) == 6 and fields[5].startswith('/'):
+                        self.paths.add(fields[5].rstrip('\n'))
+        except OSError:
+            # Not on Linux, where only the libraries loaded through ctypes
+            # are known, from the files opened
+            pass
+        return sorted(set(os.path.realpath(path) for path in self.paths))
+
+
+def run_trace(args):
+    """Imports the handler and invokes it with every fixture event, then
+    writes the real paths of the files loaded meanwhile, as a JSON list"""
+    context_args = json.loads(args.context)
+    output = redirect_stdout()
+    tracer = FileTracer()
+    tracer.start()
+    environment = ExecutionEnvironment(args)
+    for path in args.trace_events or []:
+        with open(path) as fixture:
+            event = json.load(fixture)
+        # Failed invocations loaded files too, e.g. up to a missing credential
+        try:
+            environment.call(event, context_args)
+        except Exception as error:
+            sys.stderr.write('Invocation with {} failed: {}\n'.format(path, error))
+    environment.close()
+    paths = tracer.stop()
+    with open(args.trace_files, 'w') as trace_file:
+        json.dump(paths, trace_file, indent=2)
+    output.write('Traced {} files loaded by {}.{}\n'.format(
+        len(paths), args.handler_path, args.handler_name))
+    output.close()
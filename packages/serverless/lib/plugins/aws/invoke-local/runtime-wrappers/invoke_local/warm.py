@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+from time import perf_counter
+
+from invoke_local.environment import (
+    ExecutionEnvironment, format_error, invoke, open_tty_stdin, redirect_stdout)
+from invoke_local.reload import ModuleReloader
+
+
+def parse_request(line):
+    """Parses a line of warm mode input, a JSON object of the event and an
+    optional context"""
+    request = json.loads(line)
+    if not isinstance(request, dict) or 'event' not in request:
+        raise ValueError('Expected a JSON object with an "event" key')
+    if not isinstance(request.get('context', {}), dict):
+        raise ValueError('Expected "context" to be a JSON object')
+    return request
+
+
+def run_warm(args):
+    requests = os.fdopen(os.dup(sys.stdin.fileno()), 'r')
+    # Redirected before the handler is imported, so that anything printed at
+    # import time does not end up among the results either
+    results = redirect_stdout()
+    environment = ExecutionEnvironment(args)
+    open_tty_stdin()
+    reloader = ModuleReloader('.') if environment.args.reload else None
+    if args.notify_ready:
+        results.write('\n')
+        results.flush()
+
+    for line in requests:
+        if not line.strip():
+            continue
+        if reloader is not None:
+            start = perf_counter()
+            reloaded = reloader.check()
+            if reloaded:
+                environment.reload_handler()
+                sys.stderr.write('Reloaded {} in {:.2f} ms\n'.format(
+                    ', '.join(reloaded), (perf_counter() - start) * 1000))
+        try:
+            input = parse_request(line)
+        except ValueError as error:
+            output = json.dumps(format_error(error))
+        else:
+            output, _, _ = invoke(environment, input['event'], input.get('context', {}))
+        results.write(output + '\n')
+        results.flush()
+    environment.close()
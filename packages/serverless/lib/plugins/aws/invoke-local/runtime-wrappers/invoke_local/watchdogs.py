@@ -0,0 +1,189 @@
+import linecache
+import sys
+import threading
+import traceback
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import islice
+from time import perf_counter, sleep
+
+from invoke_local import is_wrapper_file
+from invoke_local.report import max_memory_used, resident_memory
+
+
+# Exit status of a process running out of memory, as if killed by SIGKILL
+OUT_OF_MEMORY_EXIT_STATUS = 137
+# Exit status of a process running past the timeout, as with timeout(1)
+TIMED_OUT_EXIT_STATUS = 124
+
+
+def out_of_memory_error():
+    # Same error as Lambda returns once the runtime is killed for using more
+    # than the memory size of the function
+    return {
+        'errorMessage': 'Runtime exited with error: signal: killed',
+        'errorType': 'Runtime.OutOfMemory',
+    }
+
+
+def timed_out_error(timeout):
+    return {
+        'errorMessage': 'Task timed out after {:.2f} seconds'.format(timeout),
+        'errorType': 'Sandbox.Timedout',
+    }
+
+
+class TimeoutWatchdog(object):
+    """Kills the environment when an invocation runs past the timeout of the
+    function, after writing the stacks of all threads to stderr"""
+
+    def __init__(self, environment):
+        self.environment = environment
+        self.condition = threading.Condition()
+        self.deadline = None
+        self.timeout = None
+        # When the thread wakes up next, None if it waits to be notified
+        self.wake = None
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def arm(self, timeout):
+        # The lock is only taken when the thread would wake up past the
+        # deadline, as waking it up on every invocation is costly
+        self.timeout = timeout
+        self.deadline = deadline = perf_counter() + timeout
+        wake = self.wake
+        if wake is None or wake > deadline:
+            with self.condition:
+                self.condition.notify()
+
+    def disarm(self):
+        self.deadline = None
+
+    def watch(self):
+        with self.condition:
+            while True:
+                deadline = self.deadline
+                now = perf_counter()
+                if deadline is None:
+                    # Between invocations, wait as long as the last timeout, as
+                    # the next deadline is later than that
+                    self.wake = None if self.timeout is None else now + self.timeout
+                    # Checked again once the wake-up time is set, as arm() may
+                    # have seen the previous one
+                    if self.deadline is None:
+                        self.condition.wait(self.timeout)
+                    continue
+                remaining = deadline - now
+                if remaining > 0:
+                    self.wake = deadline
+                    self.condition.wait(remaining)
+                    continue
+                self.write_stacks()
+                sys.stderr.write('{} {} Task timed out after {:.2f} seconds\n'.format(
+                    datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+                    self.environment.context.aws_request_id,
+                    self.timeout - remaining))
+                self.environment.kill('timeout', timed_out_error(self.timeout),
+                                      TIMED_OUT_EXIT_STATUS)
+
+    def write_stacks(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        output = sys.stderr
+        for ident, frame in sys._current_frames().items():
+            stack = traceback.extract_stack(frame)
+            wrapper_frames = [index for index, entry in enumerate(stack)
+                              if is_wrapper_file(entry.filename)]
+            if ident == threading.main_thread().ident:
+                # Only the frames of the handler
+                stack = stack[wrapper_frames[-1] + 1:] if wrapper_frames else stack
+            elif wrapper_frames:
+                # Threads of this wrapper, like this one
+                continue
+            output.write('Stack of thread {} (most recent call last):\n'.format(
+                names.get(ident, ident)))
+            output.write(''.join(traceback.format_list(stack)))
+
+
+class MemoryWatchdog(object):
+    """Polls the memory used by the process, which Lambda caps at the memory
+    size of the function. Near the limit, the top allocation sites are written
+    to stderr when allocations are tracked. Over it, the environment is killed
+    when the limit is enforced."""
+
+    # Share of the limit from which memory use is reported
+    NEAR_LIMIT = 0.9
+
+    def __init__(self, environment, limit, enforce, track_allocations, top, interval=0.01):
+        self.environment = environment
+        self.limit = limit
+        self.enforce = enforce
+        self.track_allocations = track_allocations
+        self.top = top
+        self.interval = interval
+        # Whether allocation sites were reported during the current invocation
+        self.reported = False
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def watch(self):
+        while True:
+            sleep(self.interval)
+            # The peak is checked against the limit, so that spikes between
+            # two polls are not missed
+            peak = max_memory_used()
+            used = resident_memory()
+            if used is None:
+                return
+            if self.enforce and peak > self.limit:
+                if self.track_allocations and not self.reported:
+                    self.write_allocation_sites(used)
+                sys.stderr.write('Error: Runtime exited with error: used {} MB of {} MB\n'.format(
+                    peak, self.limit))
+                self.environment.kill('error', out_of_memory_error(),
+                                      OUT_OF_MEMORY_EXIT_STATUS)
+            if (self.track_allocations and not self.reported
+                    and used >= self.limit * self.NEAR_LIMIT):
+                self.reported = True
+                self.write_allocation_sites(used)
+
+    def write_allocation_sites(self, used):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        statistics = snapshot.statistics('traceback')
+        total = sum(stat.size for stat in statistics)
+        output = sys.stderr
+        output.write('Memory used is {:.0f} MB of {} MB, top allocation sites:\n'.format(
+            used, self.limit))
+        for stat in statistics[:self.top]:
+            # Small sites are noise next to the ones filling the memory
+            if stat.size < total * 0.01:
+                break
+            output.write('{:.1f} MB in {} blocks\n'.format(
+                stat.size / (1024.0 * 1024), stat.count))
+            # Frames from the allocation up to the wrapper
+            for frame in islice(reversed(stat.traceback), 5):
+                if is_wrapper_file(frame.filename):
+                    break
+                output.write('  File "{}", line {}\n    {}\n'.format(
+                    frame.filename, frame.lineno,
+                    linecache.getline(frame.filename, frame.lineno).strip()))
+        output.flush()
+
+
+def exit_error(exitcode, timeout):
+    # Error of the invocation running in a worker process which exited
+    if exitcode == OUT_OF_MEMORY_EXIT_STATUS:
+        return out_of_memory_error()
+    if exitcode == TIMED_OUT_EXIT_STATUS:
+        return timed_out_error(timeout)
+    if exitcode < 0:
+        reason = 'signal: {}'.format(-exitcode)
+    else:
+        reason = 'exit status {}'.format(exitcode)
+    return {
+        'errorMessage': 'Runtime exited with error: ' + reason,
+        'errorType': 'Runtime.ExitError',
+    }
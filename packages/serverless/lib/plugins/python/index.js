@@ -10,6 +10,7 @@
  */
 
 /* jshint ignore:start */
+import os from 'os'
 import {
   addVendorHelper,
   packRequirements,
@@ -21,6 +22,7 @@ import { installAllRequirements } from './lib/pip.js'
 import { pipfileToRequirements } from './lib/pipenv.js'
 import { uvToRequirements } from './lib/uv.js'
 import { cleanup, cleanupCache } from './lib/clean.js'
+import { shakeRequirements } from './lib/treeShake.js'
 
 class ServerlessPythonRequirements {
   /**
@@ -33,7 +35,10 @@ class ServerlessPythonRequirements {
         slim: false,
         slimPatterns: false,
         slimPatternsAppendDefaults: true,
+        compileBytecode: false,
+        treeShake: false,
         zip: false,
+        zipExclude: [],
         layer: false,
         cleanupZipHelper: true,
         invalidateCaches: false,
@@ -58,6 +63,9 @@ class ServerlessPythonRequirements {
         dockerRootless: false,
         useStaticCache: true,
         useDownloadCache: true,
+        distributionCache: false,
+        // No CPUs are listed in some containers
+        installConcurrency: Math.max(1, os.cpus().length),
         cacheLocation: false,
         staticCacheMaxVersions: 0,
         pipCmdExtraArgs: [],
@@ -118,12 +126,28 @@ class ServerlessPythonRequirements {
       )
     }
 
+    // Numbers may be given as strings, e.g. from environment variables
+    options.installConcurrency = Number(options.installConcurrency)
+    if (
+      !Number.isInteger(options.installConcurrency) ||
+      options.installConcurrency < 1
+    ) {
+      throw new Error(
+        'Python Requirements: installConcurrency must be a positive integer.',
+      )
+    }
+
     if (options.layer) {
       // If layer was set as a boolean, set it to an empty object to use the layer defaults.
       if (options.layer === true) {
         options.layer = {}
       }
     }
+
+    // If treeShake was set as a boolean, set it to an empty object to use the defaults.
+    if (options.treeShake === true) {
+      options.treeShake = {}
+    }
     return options
   }
 
@@ -309,6 +333,7 @@ class ServerlessPythonRequirements {
       await uvToRequirements(this)
       await addVendorHelper.call(this)
       await installAllRequirements.call(this)
+      await shakeRequirements.call(this)
       await packRequirements.call(this)
       await setupArtifactPathCapturing()
     }
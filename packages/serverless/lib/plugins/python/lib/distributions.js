@@ -0,0 +1,234 @@
+import fse from 'fs-extra'
+import { constants } from 'fs'
+import path from 'path'
+import { globSync } from 'glob'
+import { getDistributionCachePath } from './shared.js'
+
+// Options of a requirements file applying to all of its requirements, kept
+// when installing only some of them
+const GLOBAL_OPTION =
+  /^\s*(-i|-f|--index-url|--extra-index-url|--find-links|--trusted-host|--no-index|--pre|--prefer-binary|--only-binary|--no-binary)\b/
+
+/**
+ * Normalize the name of a distribution, as in PEP 503, with underscores so
+ * that names do not run into versions in keys
+ * @param {string} name
+ * @return {string}
+ */
+function normalizeName(name) {
+  return name.toLowerCase().replace(/[-_.]+/g, '_')
+}
+
+/**
+ * Key of a distribution installed from a wheel, from its name, version, and
+ * the python, ABI and platform tags of the wheel, e.g.
+ * numpy-2.1.0-cp312-cp312-manylinux_2_17_x86_64.manylinux2014_x86_64
+ * @param {string} name
+ * @param {string} version
+ * @param {string} url URL the distribution is downloaded from
+ * @return {string|null} null for source distributions, whose tags are only
+ * known once built
+ */
+function getDistributionKey(name, version, url) {
+  const filename = decodeURIComponent(url.split(/[?#]/)[0].split('/').pop())
+  if (!filename.endsWith('.whl')) return null
+  // {name}-{version}(-{build tag})?-{python tag}-{abi tag}-{platform tag}.whl
+  const tags = filename.slice(0, -'.whl'.length).split('-').slice(-3)
+  return [normalizeName(name), version, ...tags].join('-')
+}
+
+/**
+ * The distributions requirements resolve to, from the report of
+ * `pip install --dry-run --report`
+ * @param {string} reportPath
+ * @param {Object} options
+ * @return {Object[]|null} the name, version and key of each distribution,
+ * and whether it is cached, or null if any is a direct reference, e.g. a
+ * local path or a VCS URL, which cannot be pinned by version
+ */
+function getResolvedDistributions(reportPath, options) {
+  const { install } = fse.readJsonSync(reportPath)
+  if (install.some((item) => item.is_direct)) return null
+  return install.map(({ metadata, download_info: downloadInfo }) => {
+    const key = getDistributionKey(
+      metadata.name,
+      metadata.version,
+      downloadInfo.url,
+    )
+    return {
+      name: metadata.name,
+      version: metadata.version,
+      key,
+      cached:
+        key !== null && fse.existsSync(getDistributionCachePath(key, options)),
+    }
+  })
+}
+
+/**
+ * Write a requirements file of the given requirements, with the global
+ * options of the original requirements file, such as index URLs
+ * @param {string} requirementsTxt original requirements file
+ * @param {string[]} requirements
+ * @param {string} targetFile
+ * @return {undefined}
+ */
+function writeRequirementsSubset(requirementsTxt, requirements, targetFile) {
+  const globalOptions = fse
+    .readFileSync(requirementsTxt, 'utf-8')
+    .split(/\r?\n/)
+    .filter((line) => GLOBAL_OPTION.test(line))
+  fse.writeFileSync(
+    targetFile,
+    `${globalOptions.concat(requirements).join('\n')}\n`,
+  )
+}
+
+/**
+ * Path of a line of a RECORD file, a CSV file of the path, hash and size of
+ * every file of a distribution
+ * @param {string} line
+ * @return {string|null}
+ */
+function recordPath(line) {
+  if (line.startsWith('"')) {
+    const match = line.match(/^"((?:[^"]|"")*)"/)
+    return match ? match[1].replace(/""/g, '"') : null
+  }
+  return line.split(',')[0] || null
+}
+
+/**
+ * Name and version of an installed distribution, from its METADATA
+ * @param {string} distInfoPath
+ * @return {string[]}
+ */
+function readNameAndVersion(distInfoPath) {
+  const headers = fse
+    .readFileSync(path.join(distInfoPath, 'METADATA'), 'utf-8')
+    .split(/\r?\n\r?\n/)[0]
+  const header = (name) =>
+    (headers.match(new RegExp(`^${name}:\\s*(.*)$`, 'm')) || [])[1]
+  return [header('Name'), header('Version')]
+}
+
+/**
+ * Link the files of a folder into another one, with hard links, or else
+ * reflinks or copies, e.g. across devices, keeping files already there
+ * @param {string} source
+ * @param {string} target
+ * @param {boolean} copy whether to always reflink or copy, for files which
+ * may be modified in place once linked
+ * @return {undefined}
+ */
+function linkTree(source, target, copy = false) {
+  fse.ensureDirSync(target)
+  for (const entry of fse.readdirSync(source, { withFileTypes: true })) {
+    const sourcePath = path.join(source, entry.name)
+    const targetPath = path.join(target, entry.name)
+    if (entry.isDirectory()) {
+      linkTree(sourcePath, targetPath, copy)
+    } else if (!fse.existsSync(targetPath)) {
+      if (!copy) {
+        try {
+          fse.linkSync(sourcePath, targetPath)
+          continue
+        } catch (e) {
+          // e.g. across devices, copied instead
+        }
+      }
+      fse.copyFileSync(sourcePath, targetPath, constants.COPYFILE_FICLONE)
+    }
+  }
+}
+
+/**
+ * Move the files of the distributions installed to a staging folder to the
+ * cache, by the keys of their distributions, and link whatever else was
+ * installed, such as distributions built from source, to the target folder
+ * @param {string} stagingFolder
+ * @param {string} targetFolder
+ * @param {Object[]} distributions
+ * @param {Object} options
+ * @return {undefined}
+ */
+function cacheDistributions(
+  stagingFolder,
+  targetFolder,
+  distributions,
+  options,
+) {
+  const keys = new Map(
+    distributions.map(({ name, version, key }) => [
+      `${normalizeName(name)}==${version}`,
+      key,
+    ]),
+  )
+  for (const distInfo of globSync('*.dist-info', { cwd: stagingFolder })) {
+    const [name, version] = readNameAndVersion(
+      path.join(stagingFolder, distInfo),
+    )
+    const key = name && keys.get(`${normalizeName(name)}==${version}`)
+    if (!key) continue
+
+    const cachePath = getDistributionCachePath(key, options)
+    // Moved in place once complete, as concurrent installs may cache the
+    // same distribution
+    const tempPath = `${cachePath}.tmp-${process.pid}-${Date.now()}`
+    const record = fse.readFileSync(
+      path.join(stagingFolder, distInfo, 'RECORD'),
+      'utf-8',
+    )
+    for (const line of record.split(/\r?\n/)) {
+      const file = recordPath(line)
+      if (!file) continue
+      const relativeFile = path.relative(
+        stagingFolder,
+        path.resolve(stagingFolder, file),
+      )
+      if (
+        relativeFile.startsWith('..') ||
+        path.isAbsolute(relativeFile) ||
+        !fse.existsSync(path.join(stagingFolder, relativeFile))
+      ) {
+        continue
+      }
+      fse.moveSync(
+        path.join(stagingFolder, relativeFile),
+        path.join(tempPath, relativeFile),
+      )
+    }
+    try {
+      fse.renameSync(tempPath, cachePath)
+    } catch (e) {
+      // Cached by a concurrent install in the meantime
+      fse.removeSync(tempPath)
+    }
+  }
+  linkTree(stagingFolder, targetFolder)
+}
+
+/**
+ * Link the cached distributions into the target folder
+ * @param {Object[]} distributions
+ * @param {string} targetFolder
+ * @param {Object} options
+ * @param {boolean} copy whether to copy rather than link them, as files of
+ * the target folder are then modified in place, e.g. stripped
+ * @return {undefined}
+ */
+function linkDistributions(distributions, targetFolder, options, copy) {
+  for (const { key } of distributions) {
+    if (key) {
+      linkTree(getDistributionCachePath(key, options), targetFolder, copy)
+    }
+  }
+}
+
+export {
+  cacheDistributions,
+  getDistributionKey,
+  getResolvedDistributions,
+  linkDistributions,
+  writeRequirementsSubset,
+}
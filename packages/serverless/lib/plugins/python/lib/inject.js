@@ -3,31 +3,46 @@ import { globSync } from 'glob'
 import path from 'path'
 import JSZip from 'jszip'
 import { writeZip, zipFile } from './zipTree.js'
+import {
+  mergeRequirementsArchive,
+  writeRequirementsArchive,
+} from './zipMerge.js'
 
 /**
- * Inject requirements into packaged application.
+ * Top-level package or module a file of the requirements belongs to, e.g.
+ * six for six.py and __pycache__/six.cpython-312.pyc
+ * @param {string} relativeFile path of the file in the requirements folder
+ * @return {string}
+ */
+function getTopLevelName(relativeFile) {
+  const bytecode = relativeFile.match(/^__pycache__[\\/]([^.]+)\./)
+  if (bytecode) return bytecode[1]
+  return relativeFile.split(/([-\\/]|\.py$|\.pyc$)/, 1)[0]
+}
+
+/**
+ * Files of a requirements folder to inject, with their paths in the package.
  * @param {string} requirementsPath requirements folder path
- * @param {string} packagePath target package path
  * @param {string} injectionRelativePath installation directory in target package
  * @param {Object} options our options object
- * @return {Promise} the JSZip object constructed.
+ * @return {string[][]} the path of each file and its path in the package
  */
-async function injectRequirements(
+function getRequirementsFiles(
   requirementsPath,
-  packagePath,
   injectionRelativePath,
   options,
 ) {
   const noDeploy = new Set(options.noDeploy || [])
-  const buffer = await fse.readFile(packagePath)
-  const zip = await JSZip.loadAsync(buffer)
+  // Bytecode of top-level modules is only kept when compiled ahead of time
+  const compileBytecode =
+    options.compileBytecode === true || options.compileBytecode === 'true'
   const files = globSync([path.join(requirementsPath, '**')], {
     nodir: true,
     dot: true,
     follow: true,
     windowsPathsNoEscape: true,
   })
-  const pairs = files
+  return files
     .map((file) => [
       file,
       path
@@ -37,9 +52,57 @@ async function injectRequirements(
     .filter(
       ([file, relativeFile]) =>
         !file.endsWith('/') &&
-        !relativeFile.match(/^__pycache__[\\/]/) &&
-        !noDeploy.has(relativeFile.split(/([-\\/]|\.py$|\.pyc$)/, 1)[0]),
+        (compileBytecode || !relativeFile.match(/^__pycache__[\\/]/)) &&
+        !noDeploy.has(getTopLevelName(relativeFile)),
     )
+}
+
+/**
+ * Compress the requirements to inject once into an archive, to be merged into
+ * every package using them.
+ * @param {string} requirementsPath requirements folder path
+ * @param {string} injectionRelativePath installation directory in target package
+ * @param {Object} options our options object
+ * @return {Promise<string|null>} the archive path, or null if the requirements
+ * are too many or too large for it, without ZIP64
+ */
+async function buildRequirementsArchive(
+  requirementsPath,
+  injectionRelativePath,
+  options,
+) {
+  const archivePath = `${requirementsPath}-inject.zip`
+  const pairs = getRequirementsFiles(
+    requirementsPath,
+    injectionRelativePath,
+    options,
+  )
+  return (await writeRequirementsArchive(pairs, archivePath))
+    ? archivePath
+    : null
+}
+
+/**
+ * Inject requirements into packaged application, rewriting it in memory.
+ * @param {string} requirementsPath requirements folder path
+ * @param {string} packagePath target package path
+ * @param {string} injectionRelativePath installation directory in target package
+ * @param {Object} options our options object
+ * @return {Promise} the JSZip object constructed.
+ */
+async function injectRequirementsInMemory(
+  requirementsPath,
+  packagePath,
+  injectionRelativePath,
+  options,
+) {
+  const buffer = await fse.readFile(packagePath)
+  const zip = await JSZip.loadAsync(buffer)
+  const pairs = getRequirementsFiles(
+    requirementsPath,
+    injectionRelativePath,
+    options,
+  )
 
   for (const [file, relativeFile] of pairs) {
     const fileStat = await fse.stat(file)
@@ -51,6 +114,49 @@ async function injectRequirements(
   await writeZip(zip, packagePath)
 }
 
+/**
+ * Inject requirements into packaged application. The requirements are
+ * compressed once, then their entries copied as they are into every package,
+ * falling back to rewriting packages in memory when they need ZIP64.
+ * @param {string} requirementsPath requirements folder path
+ * @param {string} packagePath target package path
+ * @param {string} injectionRelativePath installation directory in target package
+ * @param {Object} options our options object
+ * @param {Map} archives promises of the archives of requirements folders
+ * @return {Promise}
+ */
+async function injectRequirements(
+  requirementsPath,
+  packagePath,
+  injectionRelativePath,
+  options,
+  archives,
+) {
+  if (!archives.has(requirementsPath)) {
+    archives.set(
+      requirementsPath,
+      buildRequirementsArchive(
+        requirementsPath,
+        injectionRelativePath,
+        options,
+      ),
+    )
+  }
+  const archivePath = await archives.get(requirementsPath)
+  if (
+    archivePath &&
+    (await mergeRequirementsArchive(packagePath, archivePath))
+  ) {
+    return
+  }
+  await injectRequirementsInMemory(
+    requirementsPath,
+    packagePath,
+    injectionRelativePath,
+    options,
+  )
+}
+
 /**
  * Remove all modules but the selected module from a package.
  * @param {string} source path to original package
@@ -101,6 +207,8 @@ async function injectAllRequirements(funcArtifact) {
     injectionRelativePath = 'package'
   }
 
+  // Archives of the requirements folders injected so far, built once each
+  const archives = new Map()
   try {
     const servicePath =
       this.servicePath ||
@@ -183,6 +291,7 @@ async function injectAllRequirements(funcArtifact) {
           packagePath,
           injectionRelativePath,
           this.options,
+          archives,
         )
       }
     }
@@ -204,6 +313,7 @@ async function injectAllRequirements(funcArtifact) {
         packagePath,
         injectionRelativePath,
         this.options,
+        archives,
       )
     }
 
@@ -239,11 +349,16 @@ async function injectAllRequirements(funcArtifact) {
         packagePath,
         injectionRelativePath,
         this.options,
+        archives,
       )
     }
   } finally {
+    for (const archive of archives.values()) {
+      const archivePath = await archive.catch(() => null)
+      if (archivePath) await fse.remove(archivePath)
+    }
     injectProgress && injectProgress.remove()
   }
 }
 
-export { injectAllRequirements }
+export { getRequirementsFiles, injectAllRequirements, injectRequirements }
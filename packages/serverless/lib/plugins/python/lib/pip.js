@@ -3,11 +3,23 @@ import path from 'path'
 import spawn from 'child-process-ext/spawn.js'
 import shellQuote from 'shell-quote'
 import os from 'os'
+import pLimit from 'p-limit'
 import { ServerlessError } from '@serverless/util'
 import { buildImage, getBindPath, getDockerUid } from './docker.js'
-import { deleteFiles, getStripCommand, getStripMode } from './slim.js'
+import {
+  deleteFiles,
+  getCompileCommand,
+  getStripCommand,
+  getStripMode,
+} from './slim.js'
 import { isPoetryProject, pyprojectTomlToRequirements } from './poetry.js'
 import { getUvVersion } from './uv.js'
+import {
+  cacheDistributions,
+  getResolvedDistributions,
+  linkDistributions,
+  writeRequirementsSubset,
+} from './distributions.js'
 import tomlParse from '@iarna/toml/parse-string.js'
 import {
   checkForAndDeleteMaxCacheVersions,
@@ -139,6 +151,36 @@ function generateRequirementsFile(
   }
 }
 
+/**
+ * Version of Python, as X.Y, run by a runtime, such as python3.12, or
+ * PYTHON_3_12 for agents
+ * @param {string} runtime
+ * @return {string|null}
+ */
+function getRuntimePythonVersion(runtime) {
+  const match = (runtime || '')
+    .toLowerCase()
+    .match(/^python_?(\d+)[._](\d+)$/)
+  return match ? `${match[1]}.${match[2]}` : null
+}
+
+/**
+ * Version of Python, as X.Y, run by pythonBin
+ * @param {string} pythonBin
+ * @return {Promise<string|null>}
+ */
+async function getPythonVersion(pythonBin) {
+  try {
+    const { stdoutBuffer } = await spawn(pythonBin, [
+      '-c',
+      "import sys; print('%d.%d' % sys.version_info[:2])",
+    ])
+    return stdoutBuffer.toString().trim()
+  } catch (e) {
+    return null
+  }
+}
+
 async function pipAcceptsSystem(pythonBin, pluginInstance) {
   // Check if pip has Debian's --system option and set it if so
   try {
@@ -167,9 +209,15 @@ async function pipAcceptsSystem(pythonBin, pluginInstance) {
  * @param {string} targetFolder
  * @param {Object} pluginInstance
  * @param {Object} funcOptions
+ * @param {string} label
  * @return {undefined}
  */
-async function installRequirements(targetFolder, pluginInstance, funcOptions) {
+async function installRequirements(
+  targetFolder,
+  pluginInstance,
+  funcOptions,
+  label,
+) {
   const { options, serverless, log, progress, dockerImageForFunction } =
     pluginInstance
   const targetRequirementsTxt = path.join(targetFolder, 'requirements.txt')
@@ -177,8 +225,9 @@ async function installRequirements(targetFolder, pluginInstance, funcOptions) {
   let installProgress
   if (progress) {
     log.info(`Installing requirements from "${targetRequirementsTxt}"`)
-    installProgress = progress.get('python-install')
-    installProgress.update('Installing requirements')
+    // A progress per install, as they run concurrently
+    installProgress = progress.get(`python-install-${targetFolder}`)
+    installProgress.update(`Installing requirements for ${label}`)
   } else {
     serverless.cli.log(
       `Installing requirements from ${targetRequirementsTxt} ...`,
@@ -426,17 +475,7 @@ async function installRequirements(targetFolder, pluginInstance, funcOptions) {
         }
         // Install requirements with pip
         // Set the ownership of the current folder to user
-        // If you use docker-rootless, you don't need to set the ownership
-        if (options.dockerRootless !== true) {
-          pipCmds.push([
-            'chown',
-            '-R',
-            `${process.getuid()}:${process.getgid()}`,
-            '/var/task',
-          ])
-        } else {
-          pipCmds.push(['chown', '-R', '0:0', '/var/task'])
-        }
+        pipCmds.push(getOwnershipCommand(options))
       } else {
         // Use same user so --cache-dir works
         dockerCmd.push('-u', await getDockerUid(bindPath, pluginInstance))
@@ -485,79 +524,278 @@ async function installRequirements(targetFolder, pluginInstance, funcOptions) {
         break
     }
 
+    // If enabled, install from the per-distribution cache, with pip only
+    // installing the distributions missing from it
+    let installedFromCache = false
+    if (options.distributionCache && !usingUv && !options.dockerizePip) {
+      installedFromCache = await installFromDistributionCache(
+        pipCmd,
+        targetFolder,
+        pluginInstance,
+        // Commands run once installed, such as strip, modify files in place,
+        // which would modify the cache through hard links
+        postCmds.length > 0,
+      )
+    }
+
     let spawnArgs = { shell: true }
     if (process.env.SLS_DEBUG) {
       spawnArgs.stdio = 'inherit'
     }
     let mainCmds = []
     if (dockerCmd.length) {
-      dockerCmd.push(...mergeCommands(pipCmds))
-      mainCmds = [dockerCmd]
+      mainCmds = [[...dockerCmd, ...mergeCommands(pipCmds)]]
+    } else if (installedFromCache) {
+      mainCmds = []
     } else {
       mainCmds = pipCmds
     }
     mainCmds.push(...postCmds)
+    await runCommands(mainCmds, pluginInstance)
 
-    for (const [cmd, ...args] of mainCmds) {
-      // Log the exact command about to be executed
-      const rendered = quote([cmd, ...args])
-      if (log) {
-        log.info(`Running: ${rendered}`)
-      } else {
-        serverless.cli.log(`Running: ${rendered}`)
-      }
-      try {
-        await spawn(cmd, args)
-      } catch (e) {
-        const stderr = (e.stderrBuffer && e.stderrBuffer.toString()) || ''
-        const stdout = (e.stdoutBuffer && e.stdoutBuffer.toString()) || ''
-        const mentionsCommandNotFound =
-          stderr.includes('command not found') ||
-          stdout.includes('command not found')
-        if (cmd !== 'docker' && mentionsCommandNotFound) {
-          const advice =
-            cmd.indexOf('python') > -1
-              ? 'Try the pythonBin option'
-              : 'Please install it'
-          throw new ServerlessError(
-            `${cmd} not found! ${advice}`,
-            'PYTHON_REQUIREMENTS_COMMAND_NOT_FOUND',
-            { stack: false },
-          )
-        }
+    // If enabled slimming, delete files in slimPatterns
+    if (options.slim === true || options.slim === 'true') {
+      deleteFiles(options, targetFolder)
+    }
 
-        if (cmd === 'docker') {
-          const lines = [
-            `Running "${cmd} ${args.join(' ')}" failed.`,
-            stderr && `Error: ${stderr.trim()}`,
-            stdout && `Command output: ${stdout.trim()}`,
-          ].filter(Boolean)
-          throw new ServerlessError(
-            lines.join('\n'),
-            'PYTHON_REQUIREMENTS_DOCKER_COMMAND_FAILED',
-            { stack: false },
-          )
+    // If enabled, compile the requirements to bytecode once slimmed, by the
+    // Python of the runtime, as it cannot write it to /var/task at import
+    if (
+      options.compileBytecode === true ||
+      options.compileBytecode === 'true'
+    ) {
+      if (dockerCmd.length) {
+        const compileCmds = [getCompileCommand(options, '/var/task')]
+        if (process.platform === 'linux') {
+          compileCmds.push(getOwnershipCommand(options))
         }
-
-        if (log) {
-          log.error(`Stdout: ${e.stdoutBuffer}`)
-          log.error(`Stderr: ${e.stderrBuffer}`)
+        await runCommands(
+          [[...dockerCmd, ...mergeCommands(compileCmds)]],
+          pluginInstance,
+        )
+      } else {
+        // Bytecode is tagged with the version of Python compiling it, so the
+        // runtime would ignore that of another version
+        const runtimeVersion = getRuntimePythonVersion(
+          funcOptions.isAgent
+            ? funcOptions.config?.runtime || 'python3.13'
+            : funcOptions.runtime || serverless.service.provider.runtime,
+        )
+        const version = await getPythonVersion(options.pythonBin)
+        if (runtimeVersion && version !== runtimeVersion) {
+          const message = `Skipping compileBytecode for ${label}, as ${options.pythonBin} is not Python ${runtimeVersion} like the runtime${version ? ` but ${version}` : ''}. Set pythonBin to a Python ${runtimeVersion}, or use dockerizePip.`
+          if (log) {
+            log.warning(message)
+          } else {
+            serverless.cli.log(`WARNING: ${message}`)
+          }
         } else {
-          serverless.cli.log(`Stdout: ${e.stdoutBuffer}`)
-          serverless.cli.log(`Stderr: ${e.stderrBuffer}`)
+          await runCommands(
+            [getCompileCommand(options, dockerPathForWin(targetFolder))],
+            pluginInstance,
+          )
         }
-        throw e
       }
     }
-    // If enabled slimming, delete files in slimPatterns
-    if (options.slim === true || options.slim === 'true') {
-      deleteFiles(options, targetFolder)
-    }
   } finally {
     installProgress && installProgress.remove()
   }
 }
 
+/**
+ * Replace the value of an option of a command
+ * @param {string[]} command
+ * @param {string} option
+ * @param {string} value
+ * @return {string[]}
+ */
+function withOption(command, option, value) {
+  return command.map((arg, index) =>
+    command[index - 1] === option ? value : arg,
+  )
+}
+
+/**
+ * Install requirements to the target folder by linking the distributions
+ * they resolve to from the per-distribution cache, after installing those
+ * missing from it to the cache. Requirements which cannot be pinned by
+ * version, with hashes or direct references, are left to pip.
+ * @param {string[]} pipCmd pip command installing the requirements
+ * @param {string} targetFolder
+ * @param {Object} pluginInstance
+ * @param {boolean} copy whether to copy rather than link the distributions
+ * @return {Promise<boolean>} whether the requirements were installed
+ */
+async function installFromDistributionCache(
+  pipCmd,
+  targetFolder,
+  pluginInstance,
+  copy,
+) {
+  const { options, serverless, log } = pluginInstance
+  const targetRequirementsTxt = path.join(targetFolder, 'requirements.txt')
+  const emitMsg = (msg) => {
+    if (log) {
+      log.info(msg)
+    } else {
+      serverless.cli.log(msg)
+    }
+  }
+  if (
+    /(^|\s)(--hash|-e|--editable)\b/m.test(
+      fse.readFileSync(targetRequirementsTxt, 'utf-8'),
+    )
+  ) {
+    emitMsg(
+      'Not using the distribution cache, as requirements have hashes or are editable',
+    )
+    return false
+  }
+
+  const workFolder = fse.mkdtempSync(path.join(os.tmpdir(), 'sls-py-dist-'))
+  try {
+    const reportPath = path.join(workFolder, 'report.json')
+    let distributions
+    try {
+      await runCommands(
+        [
+          [
+            ...withOption(pipCmd, '--target', path.join(workFolder, 'target')),
+            '--dry-run',
+            '--ignore-installed',
+            '--quiet',
+            '--report',
+            reportPath,
+          ],
+        ],
+        pluginInstance,
+      )
+      distributions = getResolvedDistributions(reportPath, options)
+    } catch (e) {
+      if (e instanceof ServerlessError) throw e
+      distributions = null
+    }
+    if (!distributions) {
+      emitMsg(
+        'Not using the distribution cache, as requirements could not be pinned',
+      )
+      return false
+    }
+
+    const missing = distributions.filter(({ cached }) => !cached)
+    emitMsg(
+      `Reusing ${distributions.length - missing.length} of ${distributions.length} distributions from the distribution cache`,
+    )
+    if (missing.length) {
+      const missingRequirementsTxt = path.join(workFolder, 'requirements.txt')
+      writeRequirementsSubset(
+        targetRequirementsTxt,
+        missing.map(({ name, version }) => `${name}==${version}`),
+        missingRequirementsTxt,
+      )
+      const stagingFolder = path.join(workFolder, 'staging')
+      await runCommands(
+        [
+          [
+            ...withOption(
+              withOption(pipCmd, '--target', stagingFolder),
+              '-r',
+              missingRequirementsTxt,
+            ),
+            '--no-deps',
+          ],
+        ],
+        pluginInstance,
+      )
+      cacheDistributions(stagingFolder, targetFolder, distributions, options)
+    }
+    linkDistributions(distributions, targetFolder, options, copy)
+    return true
+  } finally {
+    fse.removeSync(workFolder)
+  }
+}
+
+/**
+ * Command giving the files created in the docker container to the user, so
+ * that the requirements folder is not owned by root.
+ * @param {Object} options
+ * @return {string[]}
+ */
+function getOwnershipCommand(options) {
+  // If you use docker-rootless, you don't need to set the ownership
+  if (options.dockerRootless !== true) {
+    return [
+      'chown',
+      '-R',
+      `${process.getuid()}:${process.getgid()}`,
+      '/var/task',
+    ]
+  }
+  return ['chown', '-R', '0:0', '/var/task']
+}
+
+/**
+ * Run commands one after the other, logging each of them.
+ * @param {string[][]} commands
+ * @param {Object} pluginInstance
+ * @return {Promise}
+ */
+async function runCommands(commands, pluginInstance) {
+  const { serverless, log } = pluginInstance
+  for (const [cmd, ...args] of commands) {
+    // Log the exact command about to be executed
+    const rendered = quote([cmd, ...args])
+    if (log) {
+      log.info(`Running: ${rendered}`)
+    } else {
+      serverless.cli.log(`Running: ${rendered}`)
+    }
+    try {
+      await spawn(cmd, args)
+    } catch (e) {
+      const stderr = (e.stderrBuffer && e.stderrBuffer.toString()) || ''
+      const stdout = (e.stdoutBuffer && e.stdoutBuffer.toString()) || ''
+      const mentionsCommandNotFound =
+        stderr.includes('command not found') ||
+        stdout.includes('command not found')
+      if (cmd !== 'docker' && mentionsCommandNotFound) {
+        const advice =
+          cmd.indexOf('python') > -1
+            ? 'Try the pythonBin option'
+            : 'Please install it'
+        throw new ServerlessError(
+          `${cmd} not found! ${advice}`,
+          'PYTHON_REQUIREMENTS_COMMAND_NOT_FOUND',
+          { stack: false },
+        )
+      }
+
+      if (cmd === 'docker') {
+        const lines = [
+          `Running "${cmd} ${args.join(' ')}" failed.`,
+          stderr && `Error: ${stderr.trim()}`,
+          stdout && `Command output: ${stdout.trim()}`,
+        ].filter(Boolean)
+        throw new ServerlessError(
+          lines.join('\n'),
+          'PYTHON_REQUIREMENTS_DOCKER_COMMAND_FAILED',
+          { stack: false },
+        )
+      }
+
+      if (log) {
+        log.error(`Stdout: ${e.stdoutBuffer}`)
+        log.error(`Stderr: ${e.stderrBuffer}`)
+      } else {
+        serverless.cli.log(`Stdout: ${e.stdoutBuffer}`)
+        serverless.cli.log(`Stderr: ${e.stderrBuffer}`)
+      }
+      throw e
+    }
+  }
+}
+
 /**
  * Convert path from Windows style to Linux style, if needed.
  * @param {string} path
@@ -758,18 +996,12 @@ function requirementsFileExists(servicePath, options, fileName) {
  * This evaluates if requirements are actually needed to be installed, but fails
  * gracefully if no req file is found intentionally.  It also assists with code
  * re-use for this logic pertaining to individually packaged functions
- * @param {string} servicePath
  * @param {string} modulePath
- * @param {Object} options
  * @param {Object} funcOptions
- * @param {Object} serverless
- * @return {string}
+ * @param {Object} pluginInstance
+ * @return {Object|false} the generated requirements file and the folder to install it to
  */
-async function installRequirementsIfNeeded(
-  modulePath,
-  funcOptions,
-  pluginInstance,
-) {
+async function prepareRequirements(modulePath, funcOptions, pluginInstance) {
   const { servicePath, options, serverless } = pluginInstance
   // Our source requirements, under our service path, and our module path (if specified)
   const fileName = path.join(servicePath, modulePath, options.fileName)
@@ -823,6 +1055,25 @@ async function installRequirementsIfNeeded(
     serverless,
     architectureOverride,
   )
+  return { slsReqsTxt, workingReqsFolder, checksum: reqChecksum }
+}
+
+/**
+ * Install prepared requirements to their folder, unless the static cache has
+ * them already
+ * @param {Object} requirements
+ * @param {Object} funcOptions
+ * @param {Object} pluginInstance
+ * @param {string} label what the requirements are installed for
+ * @return {string}
+ */
+async function installRequirementsIfNeeded(
+  { slsReqsTxt, workingReqsFolder },
+  funcOptions,
+  pluginInstance,
+  label,
+) {
+  const { options, serverless } = pluginInstance
 
   // Check if our static cache is present and is valid
   if (fse.existsSync(workingReqsFolder)) {
@@ -859,7 +1110,12 @@ async function installRequirementsIfNeeded(
   fse.copySync(slsReqsTxt, path.join(workingReqsFolder, 'requirements.txt'))
 
   // Then install our requirements from this folder
-  await installRequirements(workingReqsFolder, pluginInstance, funcOptions)
+  await installRequirements(
+    workingReqsFolder,
+    pluginInstance,
+    funcOptions,
+    label,
+  )
 
   // Copy vendor libraries to requirements folder
   if (options.vendor) {
@@ -924,6 +1180,75 @@ async function installAllRequirements() {
     }
   }
 
+  // Requirements are generated one after the other, as generating them may
+  // write to the folder of the service, and then installed concurrently.
+  // Installs to the same folder, such as identical requirements sharing a
+  // static cache folder, run one after the other, so that the first one
+  // installs them and the others reuse them. Without the static cache,
+  // identical requirements are installed once, then copied from wherever the
+  // first install linked them to. Once an install failed, the ones not
+  // started yet are skipped, while those running are waited for.
+  const limit = pLimit(this.options.installConcurrency)
+  let failure
+  const installs = new Map()
+  const linkedInstalls = new Map()
+  const install = (requirements, funcOptions, label, link) => {
+    const folder = requirements.workingReqsFolder
+    const key = JSON.stringify([
+      requirements.checksum,
+      funcOptions.isAgent
+        ? [funcOptions.architecture, funcOptions.config?.runtime]
+        : null,
+      funcOptions.vendor || null,
+    ])
+    const linked = linkedInstalls.get(key)
+    let installed
+    if (!this.options.useStaticCache && linked) {
+      installed = linked.then(async ({ linkedAt, linkedLabel }) => {
+        const message = `Copying the requirements installed for ${linkedLabel} for ${label}`
+        if (this.log) {
+          this.log.info(message)
+        } else {
+          this.serverless.cli.log(message)
+        }
+        await fse.remove(folder)
+        await fse.copy(linkedAt, folder, { dereference: true })
+        return folder
+      })
+    } else {
+      const previous = installs.get(folder) || Promise.resolve()
+      installed = previous
+        .catch(() => {})
+        .then(() =>
+          limit(async () => {
+            if (failure) throw failure
+            try {
+              return await installRequirementsIfNeeded(
+                requirements,
+                funcOptions,
+                this,
+                label,
+              )
+            } catch (e) {
+              failure = failure || e
+              throw e
+            }
+          }),
+        )
+      installs.set(folder, installed)
+    }
+    const task = installed.then(async (reqsInstalledAt) => ({
+      linkedAt: await link(reqsInstalledAt),
+      linkedLabel: label,
+    }))
+    if (!linked) linkedInstalls.set(key, task)
+    // Failures are thrown once every install is settled, and must not be
+    // reported as unhandled while the next requirements are prepared
+    task.catch(() => {})
+    return task
+  }
+  const tasks = []
+
   // Step 3: Install requirements for individually packaged functions
   // Process each unique module once (functions can share modules)
   if (individuallyPackagedFuncs.length > 0) {
@@ -932,35 +1257,42 @@ async function installAllRequirements() {
     for (const func of individuallyPackagedFuncs) {
       // If we didn't already process this module
       if (!doneModules.includes(func.module)) {
-        const reqsInstalledAt = await installRequirementsIfNeeded(
-          func.module,
-          func,
-          this,
-        )
-        // Add modulePath into .serverless for each module so it's easier for injecting and for users to see where reqs are
-        let modulePath = path.join(
-          this.servicePath,
-          '.serverless',
-          `${func.module}`,
-          'requirements',
-        )
-        // Only do if we didn't already do it
-        if (
-          reqsInstalledAt &&
-          !fse.existsSync(modulePath) &&
-          reqsInstalledAt != modulePath
-        ) {
-          if (this.options.useStaticCache) {
-            // Windows can't symlink so we have to copy on Windows,
-            // it's not as fast, but at least it works
-            if (process.platform == 'win32') {
-              fse.copySync(reqsInstalledAt, modulePath)
-            } else {
-              fse.symlink(reqsInstalledAt, modulePath)
-            }
-          } else {
-            fse.rename(reqsInstalledAt, modulePath)
-          }
+        const requirements = await prepareRequirements(func.module, func, this)
+        if (requirements) {
+          const installed = install(
+            requirements,
+            func,
+            `module "${func.module}"`,
+            async (reqsInstalledAt) => {
+              // Add modulePath into .serverless for each module so it's easier for injecting and for users to see where reqs are
+              let modulePath = path.join(
+                this.servicePath,
+                '.serverless',
+                `${func.module}`,
+                'requirements',
+              )
+              // Only do if we didn't already do it
+              if (
+                reqsInstalledAt &&
+                !fse.existsSync(modulePath) &&
+                reqsInstalledAt != modulePath
+              ) {
+                if (this.options.useStaticCache) {
+                  // Windows can't symlink so we have to copy on Windows,
+                  // it's not as fast, but at least it works
+                  if (process.platform == 'win32') {
+                    fse.copySync(reqsInstalledAt, modulePath)
+                  } else {
+                    await fse.symlink(reqsInstalledAt, modulePath)
+                  }
+                } else {
+                  await fse.rename(reqsInstalledAt, modulePath)
+                }
+              }
+              return modulePath
+            },
+          )
+          tasks.push(installed)
         }
         doneModules.push(func.module)
       }
@@ -975,68 +1307,97 @@ async function installAllRequirements() {
   const isLayerOnlyService =
     pythonFuncs.length === 0 && Boolean(this.options.layer)
   if (sharedPackagedFuncs.length > 0 || isLayerOnlyService) {
-    const reqsInstalledAt = await installRequirementsIfNeeded('', {}, this)
-    // Add symlinks into .serverless for so it's easier for injecting and for users to see where reqs are
-    let symlinkPath = path.join(this.servicePath, '.serverless', `requirements`)
-    // Only do if we didn't already do it
-    if (
-      reqsInstalledAt &&
-      !fse.existsSync(symlinkPath) &&
-      reqsInstalledAt != symlinkPath
-    ) {
-      // Windows can't symlink so we have to use junction on Windows
-      if (process.platform == 'win32') {
-        fse.symlink(reqsInstalledAt, symlinkPath, 'junction')
-      } else {
-        fse.symlink(reqsInstalledAt, symlinkPath)
-      }
+    const requirements = await prepareRequirements('', {}, this)
+    if (requirements) {
+      const installed = install(
+        requirements,
+        {},
+        'the service',
+        async (reqsInstalledAt) => {
+          // Add symlinks into .serverless for so it's easier for injecting and for users to see where reqs are
+          let symlinkPath = path.join(
+            this.servicePath,
+            '.serverless',
+            `requirements`,
+          )
+          // Only do if we didn't already do it
+          if (
+            reqsInstalledAt &&
+            !fse.existsSync(symlinkPath) &&
+            reqsInstalledAt != symlinkPath
+          ) {
+            // Windows can't symlink so we have to use junction on Windows
+            if (process.platform == 'win32') {
+              await fse.symlink(reqsInstalledAt, symlinkPath, 'junction')
+            } else {
+              await fse.symlink(reqsInstalledAt, symlinkPath)
+            }
+          }
+          return symlinkPath
+        },
+      )
+      tasks.push(installed)
     }
   }
 
   // Step 5: Install requirements for agents (always ARM64, always individual)
   const targetAgents = this.targetAgents || []
-  if (targetAgents.length > 0) {
-    for (const agent of targetAgents) {
-      if (this.log) {
-        this.log.info(
-          `Installing Python requirements for agent "${agent.name}" (ARM64)`,
-        )
-      }
-
-      const reqsInstalledAt = await installRequirementsIfNeeded(
-        agent.module,
-        { ...agent, architecture: 'arm64', isAgent: true },
-        this,
+  for (const agent of targetAgents) {
+    if (this.log) {
+      this.log.info(
+        `Installing Python requirements for agent "${agent.name}" (ARM64)`,
       )
+    }
 
-      // Add requirements into .serverless/agent-{name}/requirements
-      let modulePath = path.join(
-        this.servicePath,
-        '.serverless',
-        `agent-${agent.name}`,
-        'requirements',
-      )
+    const agentOptions = { ...agent, architecture: 'arm64', isAgent: true }
+    const requirements = await prepareRequirements(
+      agent.module,
+      agentOptions,
+      this,
+    )
+    if (!requirements) continue
+
+    const installed = install(
+      requirements,
+      agentOptions,
+      `agent "${agent.name}"`,
+      async (reqsInstalledAt) => {
+        // Add requirements into .serverless/agent-{name}/requirements
+        let modulePath = path.join(
+          this.servicePath,
+          '.serverless',
+          `agent-${agent.name}`,
+          'requirements',
+        )
 
-      if (
-        reqsInstalledAt &&
-        !fse.existsSync(modulePath) &&
-        reqsInstalledAt != modulePath
-      ) {
-        // Ensure parent directory exists
-        fse.ensureDirSync(path.dirname(modulePath))
-
-        if (this.options.useStaticCache) {
-          if (process.platform == 'win32') {
-            fse.copySync(reqsInstalledAt, modulePath)
+        if (
+          reqsInstalledAt &&
+          !fse.existsSync(modulePath) &&
+          reqsInstalledAt != modulePath
+        ) {
+          // Ensure parent directory exists
+          fse.ensureDirSync(path.dirname(modulePath))
+
+          if (this.options.useStaticCache) {
+            if (process.platform == 'win32') {
+              fse.copySync(reqsInstalledAt, modulePath)
+            } else {
+              fse.symlinkSync(reqsInstalledAt, modulePath)
+            }
           } else {
-            fse.symlinkSync(reqsInstalledAt, modulePath)
+            fse.renameSync(reqsInstalledAt, modulePath)
           }
-        } else {
-          fse.renameSync(reqsInstalledAt, modulePath)
         }
-      }
-    }
+        return modulePath
+      },
+    )
+    tasks.push(installed)
   }
+
+  // Every install is settled before failing, rather than left running
+  const results = await Promise.allSettled(tasks)
+  const rejected = results.find(({ status }) => status === 'rejected')
+  if (rejected) throw failure || rejected.reason
 }
 
 export { installAllRequirements }
@@ -109,6 +109,18 @@ function getRequirementsLayerPath(hash, fallback, options, serverless) {
   return fallback
 }
 
+/**
+ * Path of a distribution in the per-distribution cache
+ * @param  {string} key name, version and wheel tags of the distribution
+ * @param  {Object} options
+ * @return {string}
+ */
+function getDistributionCachePath(key, options) {
+  // Named so that cleanupCache removes it, while staticCacheMaxVersions only
+  // counts the *_slspyc requirements folders
+  return path.join(getUserCachePath(options), 'distributions.slspyc', key)
+}
+
 /**
  * The default per-user cache directory. On macOS and Linux the paths match
  * the historical defaults, so existing users' pip caches stay where they
@@ -168,6 +180,7 @@ export {
   checkForAndDeleteMaxCacheVersions,
   getRequirementsWorkingPath,
   getRequirementsLayerPath,
+  getDistributionCachePath,
   getDefaultUserCachePath,
   getUserCachePath,
   sha256Path,
@@ -33,6 +33,19 @@ const getStripCommand = (options, folderPath) => [
   ';',
 ]
 
+const getCompileCommand = (options, folderPath) => [
+  options.pythonBin,
+  '-m',
+  'compileall',
+  '-q',
+  '-f',
+  '-j',
+  '0',
+  '--invalidation-mode',
+  'unchecked-hash',
+  folderPath,
+]
+
 const deleteFiles = (options, folderPath) => {
   let patterns = ['**/*.py[c|o]', '**/__pycache__*', '**/*.dist-info*']
   if (options.slimPatterns) {
@@ -52,4 +65,4 @@ const deleteFiles = (options, folderPath) => {
   }
 }
 
-export { getStripMode, getStripCommand, deleteFiles }
+export { getStripMode, getStripCommand, getCompileCommand, deleteFiles }
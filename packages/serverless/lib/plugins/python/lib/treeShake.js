@@ -0,0 +1,333 @@
+import fse from 'fs-extra'
+import os from 'os'
+import path from 'path'
+import spawn from 'child-process-ext/spawn.js'
+import micromatch from 'micromatch'
+import { globSync } from 'glob'
+import { fileURLToPath } from 'url'
+import { ServerlessError } from '@serverless/util'
+
+// Kept whatever the trace, as they are read by tools rather than by handlers
+const DEFAULT_KEEP_PATTERNS = ['*.dist-info/**', '*.egg-info/**']
+
+// Files of the requirements folder itself, rather than of a requirement
+const REQUIREMENTS_FILES = ['requirements.txt', '.completed_requirements']
+
+/**
+ * Get the path to the invoke-local Python wrapper, handling both source and
+ * bundled environments
+ * @return {string}
+ */
+function getInvokeWrapperPath() {
+  let __dirname = path.dirname(fileURLToPath(import.meta.url))
+
+  // When bundled with esbuild, we're in the dist directory
+  if (__dirname.endsWith('dist')) {
+    return path.join(
+      __dirname,
+      '../lib/plugins/aws/invoke-local/runtime-wrappers/invoke.py',
+    )
+  }
+
+  return fileURLToPath(
+    new URL(
+      '../../aws/invoke-local/runtime-wrappers/invoke.py',
+      import.meta.url,
+    ),
+  )
+}
+
+/**
+ * Environment variables of a function with a string value, leaving out
+ * CloudFormation intrinsic functions, which cannot be resolved when packaging
+ * @param {Object} environment
+ * @return {Object}
+ */
+function stringEnvironment(environment) {
+  return Object.fromEntries(
+    Object.entries(environment || {}).filter(
+      ([, value]) => typeof value === 'string',
+    ),
+  )
+}
+
+/**
+ * Source module of a bytecode file, e.g. pkg/__pycache__/mod.cpython-312.pyc
+ * is compiled from pkg/mod.py
+ * @param {string} file
+ * @return {string|null}
+ */
+function bytecodeSource(file) {
+  const match = file.match(/^(.*\/)?__pycache__\/([^/.]+)\.[^/]+\.pyc$/)
+  return match ? `${match[1] || ''}${match[2]}.py` : null
+}
+
+/**
+ * Import the handler of a function and invoke it with the fixture events,
+ * through the invoke-local wrapper, recording the files it loaded.
+ * @param {Object} func
+ * @param {string} handlerDirectory directory the handler is imported from
+ * @param {string} requirementsPath real path of the requirements folder
+ * @param {string[]} events paths of the fixture events
+ * @param {Object} pluginInstance
+ * @return {Promise<string[]>} real paths of the files loaded
+ */
+async function traceFiles(
+  func,
+  handlerDirectory,
+  requirementsPath,
+  events,
+  pluginInstance,
+) {
+  const { options, serverless } = pluginInstance
+  const handlerComponents = func.handler.split(/\./)
+  const handlerPath = handlerComponents.slice(0, -1).join('.')
+  const handlerName = handlerComponents.pop()
+  const traceDirectory = fse.mkdtempSync(path.join(os.tmpdir(), 'sls-py-'))
+  const traceFile = path.join(traceDirectory, 'files.json')
+  const args = [
+    getInvokeWrapperPath(),
+    handlerPath,
+    handlerName,
+    '--trace-files',
+    traceFile,
+  ]
+  if (events.length) {
+    args.push('--trace-events', ...events)
+  }
+  try {
+    await spawn(options.pythonBin, args, {
+      cwd: handlerDirectory,
+      env: {
+        ...process.env,
+        ...stringEnvironment(serverless.service.provider.environment),
+        ...stringEnvironment(func.environment),
+        IS_LOCAL: 'true',
+        PYTHONPATH: requirementsPath,
+        // Imports would write bytecode to the requirements otherwise, which
+        // may be the static cache
+        PYTHONDONTWRITEBYTECODE: '1',
+        // The requirements are imported from their folder, as they are not
+        // archived yet with the zip option
+        SLS_SKIP_UNZIP_REQUIREMENTS: '1',
+      },
+    })
+    return fse.readJsonSync(traceFile)
+  } finally {
+    fse.removeSync(traceDirectory)
+  }
+}
+
+/**
+ * Remove the files of a requirements folder never loaded by the functions
+ * using it. A folder linked to the static cache is replaced with a copy of
+ * the files loaded, leaving the cache whole.
+ * @param {string} requirementsPath
+ * @param {string} handlerDirectory
+ * @param {Object[]} funcs
+ * @param {string[]} events
+ * @param {Object} pluginInstance
+ * @return {Promise}
+ */
+async function shakeRequirementsFolder(
+  requirementsPath,
+  handlerDirectory,
+  funcs,
+  events,
+  pluginInstance,
+) {
+  const { options, serverless, log } = pluginInstance
+  if (!fse.existsSync(requirementsPath)) return
+
+  const realRequirementsPath = fse.realpathSync(requirementsPath)
+  const loaded = new Set()
+  for (const func of funcs) {
+    let files
+    try {
+      files = await traceFiles(
+        func,
+        handlerDirectory,
+        realRequirementsPath,
+        events,
+        pluginInstance,
+      )
+    } catch (e) {
+      // Packaging the requirements whole would hide the error until the
+      // function is invoked
+      const stderr =
+        (e.stderrBuffer && e.stderrBuffer.toString().trim()) || e.message
+      throw new ServerlessError(
+        `Could not trace the files loaded by ${func.handler} to tree shake ${requirementsPath}:\n${stderr}`,
+        'PYTHON_REQUIREMENTS_TREE_SHAKE_FAILED',
+        { stack: false },
+      )
+    }
+    for (const file of files) {
+      const relativeFile = path.relative(realRequirementsPath, file)
+      if (!relativeFile.startsWith('..') && !path.isAbsolute(relativeFile)) {
+        loaded.add(relativeFile.replace(/\\/g, '/'))
+      }
+    }
+  }
+
+  const keepPatterns = DEFAULT_KEEP_PATTERNS.concat(
+    options.treeShake.keep || [],
+  )
+  const files = globSync('**', {
+    cwd: realRequirementsPath,
+    nodir: true,
+    dot: true,
+  }).map((file) => file.replace(/\\/g, '/'))
+  const isKept = (file) =>
+    REQUIREMENTS_FILES.includes(file) ||
+    loaded.has(file) ||
+    loaded.has(bytecodeSource(file)) ||
+    micromatch.isMatch(file, keepPatterns, { dot: true })
+  const removed = files.filter((file) => !isKept(file))
+  const removedSize = removed.reduce(
+    (size, file) =>
+      size + fse.statSync(path.join(realRequirementsPath, file)).size,
+    0,
+  )
+
+  if (fse.lstatSync(requirementsPath).isSymbolicLink()) {
+    const shakenPath = `${requirementsPath}.shaken`
+    fse.removeSync(shakenPath)
+    for (const file of files.filter(isKept)) {
+      fse.copySync(
+        path.join(realRequirementsPath, file),
+        path.join(shakenPath, file),
+      )
+    }
+    fse.removeSync(requirementsPath)
+    fse.renameSync(shakenPath, requirementsPath)
+  } else {
+    for (const file of removed) {
+      fse.removeSync(path.join(requirementsPath, file))
+    }
+    // Then the folders left empty, deepest first
+    const folders = globSync('**/', { cwd: requirementsPath, dot: true })
+      .sort((a, b) => b.length - a.length)
+      .map((folder) => path.join(requirementsPath, folder))
+    for (const folder of folders) {
+      if (folder !== requirementsPath && !fse.readdirSync(folder).length) {
+        fse.rmdirSync(folder)
+      }
+    }
+  }
+
+  const message = `Removed ${removed.length} of ${files.length} files never loaded from ${requirementsPath} (${(removedSize / 1024 / 1024).toFixed(1)} MB)`
+  if (log) {
+    log.info(message)
+  } else {
+    serverless.cli.log(message)
+  }
+}
+
+/**
+ * Remove the files of the requirements never loaded when importing the
+ * handlers of the functions and invoking them with the fixture events.
+ * @return {Promise}
+ */
+async function shakeRequirements() {
+  // Layers are shared beyond the functions of the service
+  if (!this.options.treeShake || this.options.layer) return
+
+  // Requirements built for another platform cannot be imported here
+  const foreignPlatform = this.options.pipCmdExtraArgs?.some((arg) =>
+    arg.startsWith('--platform'),
+  )
+  if (this.options.dockerizePip || foreignPlatform) {
+    const message = `Skipping treeShake, as the requirements are built for another platform with ${this.options.dockerizePip ? 'dockerizePip' : '--platform'}`
+    if (this.log) {
+      this.log.warning(message)
+    } else {
+      this.serverless.cli.log(`WARNING: ${message}`)
+    }
+    return
+  }
+
+  const servicePath =
+    this.servicePath ||
+    this.serverless?.config?.servicePath ||
+    this.serverless?.serviceDir ||
+    process.cwd()
+
+  let shakeProgress
+  if (this.progress && this.log) {
+    shakeProgress = this.progress.get('python-tree-shake')
+    shakeProgress.update('Tracing the Python requirements loaded by handlers')
+    this.log.info('Tracing the Python requirements loaded by handlers')
+  } else {
+    this.serverless.cli.log(
+      'Tracing the Python requirements loaded by handlers...',
+    )
+  }
+
+  try {
+    const events = (this.options.treeShake.events || []).flatMap((pattern) =>
+      globSync(pattern, { cwd: servicePath, absolute: true, nodir: true }),
+    )
+
+    // Step 1: Get all Python functions and set default module
+    const pythonFuncs = this.targetFuncs
+      .filter((func) => {
+        const runtime = func.runtime || this.serverless.service.provider.runtime
+        return runtime && runtime.match(/^python.*/)
+      })
+      .map((func) => {
+        // Default module to '.' if not specified
+        if (!func.module) {
+          func.module = '.'
+        }
+        return func
+      })
+
+    // Step 2: Separate functions by packaging mode
+    // Check BOTH function-level AND service-level package.individually
+    const individuallyPackagedFuncs = []
+    const sharedPackagedFuncs = []
+
+    for (const func of pythonFuncs) {
+      const isFunctionIndividual = func.package?.individually === true
+      const isServiceIndividual =
+        this.serverless.service.package?.individually === true
+
+      if (isFunctionIndividual || isServiceIndividual) {
+        individuallyPackagedFuncs.push(func)
+      } else {
+        sharedPackagedFuncs.push(func)
+      }
+    }
+
+    // Step 3: Shake the requirements of each module, used by all of its
+    // individually packaged functions
+    const modules = [
+      ...new Set(individuallyPackagedFuncs.map((func) => func.module)),
+    ]
+    for (const module of modules) {
+      await shakeRequirementsFolder(
+        path.join(servicePath, '.serverless', module, 'requirements'),
+        path.join(servicePath, module),
+        individuallyPackagedFuncs.filter((func) => func.module === module),
+        events,
+        this,
+      )
+    }
+
+    // Step 4: Shake the requirements of the shared package
+    if (sharedPackagedFuncs.length > 0) {
+      await shakeRequirementsFolder(
+        path.join(servicePath, '.serverless', 'requirements'),
+        servicePath,
+        sharedPackagedFuncs,
+        events,
+        this,
+      )
+    }
+  } finally {
+    shakeProgress && shakeProgress.remove()
+  }
+}
+
+export { bytecodeSource, shakeRequirements }
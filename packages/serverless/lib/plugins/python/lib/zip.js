@@ -22,6 +22,32 @@ function getUnzipRequirementsPath() {
   return fileURLToPath(new URL('../unzip_requirements.py', import.meta.url))
 }
 
+/**
+ * Copy the vendor helper to the given path, with its settings, the constants
+ * at the top of unzip_requirements.py, set from the options
+ * @param {string} destination
+ * @return {Promise}
+ */
+async function copyVendorHelper(destination) {
+  const settings = {}
+  if (this.options.zip === 'lazy') settings.MODE = 'lazy'
+  if (this.options.zipExclude?.length) {
+    settings.EXCLUDE = this.options.zipExclude
+  }
+  if (!Object.keys(settings).length) {
+    return fse.copy(getUnzipRequirementsPath(), destination)
+  }
+  let helper = await fse.readFile(getUnzipRequirementsPath(), 'utf8')
+  for (const [name, value] of Object.entries(settings)) {
+    // JSON strings, numbers and arrays of them are valid Python literals
+    helper = helper.replace(
+      new RegExp(`^${name} = .*$`, 'm'),
+      `${name} = ${JSON.stringify(value)}`,
+    )
+  }
+  return fse.outputFile(destination, helper)
+}
+
 /**
  * Add the vendor helper to the current service tree.
  * @return {Promise}
@@ -81,8 +107,8 @@ async function addVendorHelper() {
             `Adding Python requirements helper to ${func.module}...`,
           )
         }
-        await fse.copy(
-          getUnzipRequirementsPath(),
+        await copyVendorHelper.call(
+          this,
           path.join(this.servicePath, func.module, 'unzip_requirements.py'),
         )
       }
@@ -103,8 +129,8 @@ async function addVendorHelper() {
 
       this.serverless.service.package.patterns.push('unzip_requirements.py')
 
-      await fse.copy(
-        getUnzipRequirementsPath(),
+      await copyVendorHelper.call(
+        this,
         path.join(this.servicePath, 'unzip_requirements.py'),
       )
     }
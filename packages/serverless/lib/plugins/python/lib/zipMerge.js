@@ -0,0 +1,410 @@
+import fs from 'fs'
+import fse from 'fs-extra'
+import zlib from 'zlib'
+import { pipeline } from 'stream/promises'
+
+const LOCAL_FILE_HEADER = 0x04034b50
+const CENTRAL_DIRECTORY_HEADER = 0x02014b50
+const END_OF_CENTRAL_DIRECTORY = 0x06054b50
+const LOCAL_FILE_HEADER_SIZE = 30
+const CENTRAL_DIRECTORY_HEADER_SIZE = 46
+const END_OF_CENTRAL_DIRECTORY_SIZE = 22
+const MAX_UINT16 = 0xffff
+const MAX_UINT32 = 0xffffffff
+
+const FLAG_DATA_DESCRIPTOR = 0x8
+const FLAG_UTF8 = 0x800
+const METHOD_DEFLATE = 8
+const VERSION = 20
+// 1980-01-01 00:00, the earliest DOS date, so that the same requirements are
+// always archived the same
+const DOS_TIME = 0
+const DOS_DATE = (1 << 5) | 1
+
+// Entries are copied, and files compressed, through buffers of this size
+const BUFFER_SIZE = 1024 * 1024
+
+let crcTable
+
+/**
+ * CRC-32 of data, continuing from a previous value, with zlib's where
+ * available (Node.js 20.15 and later)
+ * @param {Buffer} data
+ * @param {number} value
+ * @return {number}
+ */
+function crc32(data, value = 0) {
+  if (zlib.crc32) return zlib.crc32(data, value)
+  if (!crcTable) {
+    crcTable = new Uint32Array(256)
+    for (let n = 0; n < 256; n++) {
+      let c = n
+      for (let k = 0; k < 8; k++) {
+        c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1
+      }
+      crcTable[n] = c
+    }
+  }
+  let crc = ~value
+  for (const byte of data) {
+    crc = crcTable[(crc ^ byte) & 0xff] ^ (crc >>> 8)
+  }
+  return ~crc >>> 0
+}
+
+/**
+ * Copy a range of a file to another file through a buffer.
+ * @param {FileHandle} input
+ * @param {FileHandle} output
+ * @param {Buffer} buffer
+ * @param {number} inputPosition
+ * @param {number} outputPosition
+ * @param {number} length
+ * @return {Promise}
+ */
+async function copyRange(
+  input,
+  output,
+  buffer,
+  inputPosition,
+  outputPosition,
+  length,
+) {
+  while (length > 0) {
+    const { bytesRead } = await input.read(
+      buffer,
+      0,
+      Math.min(buffer.length, length),
+      inputPosition,
+    )
+    if (!bytesRead) throw new Error('Unexpected end of zip file')
+    await output.write(buffer, 0, bytesRead, outputPosition)
+    inputPosition += bytesRead
+    outputPosition += bytesRead
+    length -= bytesRead
+  }
+}
+
+/**
+ * Read the central directory of a zip file.
+ * @param {FileHandle} handle
+ * @return {Promise<Object|null>} the central directory record and name of
+ * every entry, and the offset of the directory, or null for zip files split
+ * over several disks or needing ZIP64, which are not supported
+ */
+async function readCentralDirectory(handle) {
+  const { size } = await handle.stat()
+  const tailSize = Math.min(size, END_OF_CENTRAL_DIRECTORY_SIZE + MAX_UINT16)
+  const tail = Buffer.alloc(tailSize)
+  await handle.read(tail, 0, tailSize, size - tailSize)
+  let end = tailSize - END_OF_CENTRAL_DIRECTORY_SIZE
+  while (end >= 0 && tail.readUInt32LE(end) !== END_OF_CENTRAL_DIRECTORY) {
+    end--
+  }
+  if (end < 0) return null
+
+  const count = tail.readUInt16LE(end + 10)
+  const directorySize = tail.readUInt32LE(end + 12)
+  const directoryOffset = tail.readUInt32LE(end + 16)
+  if (
+    tail.readUInt16LE(end + 4) !== 0 ||
+    tail.readUInt16LE(end + 6) !== 0 ||
+    count === MAX_UINT16 ||
+    directorySize === MAX_UINT32 ||
+    directoryOffset === MAX_UINT32
+  ) {
+    return null
+  }
+
+  const directory = Buffer.alloc(directorySize)
+  await handle.read(directory, 0, directorySize, directoryOffset)
+  const entries = []
+  let position = 0
+  for (let i = 0; i < count; i++) {
+    if (
+      position + CENTRAL_DIRECTORY_HEADER_SIZE > directory.length ||
+      directory.readUInt32LE(position) !== CENTRAL_DIRECTORY_HEADER
+    ) {
+      return null
+    }
+    const nameLength = directory.readUInt16LE(position + 28)
+    const length =
+      CENTRAL_DIRECTORY_HEADER_SIZE +
+      nameLength +
+      directory.readUInt16LE(position + 30) +
+      directory.readUInt16LE(position + 32)
+    const record = directory.subarray(position, position + length)
+    if (
+      record.readUInt32LE(20) === MAX_UINT32 ||
+      record.readUInt32LE(24) === MAX_UINT32 ||
+      record.readUInt32LE(42) === MAX_UINT32
+    ) {
+      return null
+    }
+    entries.push({
+      // Compared byte for byte, whatever the encoding of the name
+      name: record.toString(
+        'latin1',
+        CENTRAL_DIRECTORY_HEADER_SIZE,
+        CENTRAL_DIRECTORY_HEADER_SIZE + nameLength,
+      ),
+      record,
+    })
+    position += length
+  }
+  return { entries, offset: directoryOffset }
+}
+
+/**
+ * Write the central directory of a zip file and its end record.
+ * @param {FileHandle} output
+ * @param {Buffer[]} records
+ * @param {number} offset
+ * @return {Promise}
+ */
+async function writeCentralDirectory(output, records, offset) {
+  const directory = Buffer.concat(records)
+  const end = Buffer.alloc(END_OF_CENTRAL_DIRECTORY_SIZE)
+  end.writeUInt32LE(END_OF_CENTRAL_DIRECTORY, 0)
+  end.writeUInt16LE(records.length, 8)
+  end.writeUInt16LE(records.length, 10)
+  end.writeUInt32LE(directory.length, 12)
+  end.writeUInt32LE(offset, 16)
+  const data = Buffer.concat([directory, end])
+  await output.write(data, 0, data.length, offset)
+}
+
+/**
+ * Compress a file to a zip file, from a position.
+ * @param {string} file
+ * @param {number} fileSize
+ * @param {FileHandle} output
+ * @param {number} position
+ * @return {Promise<Object>} the CRC-32 and compressed size of the file
+ */
+async function deflateFile(file, fileSize, output, position) {
+  // Small files are compressed at once, larger ones streamed
+  if (fileSize <= BUFFER_SIZE) {
+    const data = await fse.readFile(file)
+    const compressed = zlib.deflateRawSync(data, { level: 9 })
+    await output.write(compressed, 0, compressed.length, position)
+    return { crc: crc32(data), compressedSize: compressed.length }
+  }
+
+  let crc = 0
+  let compressedSize = 0
+  await pipeline(
+    fs.createReadStream(file, { highWaterMark: BUFFER_SIZE }),
+    async function* (source) {
+      for await (const chunk of source) {
+        crc = crc32(chunk, crc)
+        yield chunk
+      }
+    },
+    zlib.createDeflateRaw({ level: 9 }),
+    async (source) => {
+      for await (const chunk of source) {
+        await output.write(chunk, 0, chunk.length, position + compressedSize)
+        compressedSize += chunk.length
+      }
+    },
+  )
+  return { crc, compressedSize }
+}
+
+/**
+ * Compress files to a zip file, one at a time, to be merged into packages
+ * with mergeRequirementsArchive.
+ * @param {string[][]} pairs paths of the files and their paths in the zip
+ * @param {string} targetPath
+ * @return {Promise<boolean>} false if the files need ZIP64, which is not
+ * supported, and no zip file was written
+ */
+async function writeRequirementsArchive(pairs, targetPath) {
+  if (pairs.length >= MAX_UINT16) return false
+
+  const unix = process.platform != 'win32'
+  const output = await fs.promises.open(targetPath, 'w')
+  let written = false
+  try {
+    const records = []
+    let offset = 0
+    for (const [file, zipPath] of pairs) {
+      const fileStat = await fse.stat(file)
+      const name = Buffer.from(zipPath)
+      const header = Buffer.alloc(LOCAL_FILE_HEADER_SIZE + name.length)
+      header.writeUInt32LE(LOCAL_FILE_HEADER, 0)
+      header.writeUInt16LE(VERSION, 4)
+      header.writeUInt16LE(name.length !== zipPath.length ? FLAG_UTF8 : 0, 6)
+      header.writeUInt16LE(METHOD_DEFLATE, 8)
+      header.writeUInt16LE(DOS_TIME, 10)
+      header.writeUInt16LE(DOS_DATE, 12)
+      header.writeUInt32LE(fileStat.size, 22)
+      header.writeUInt16LE(name.length, 26)
+      name.copy(header, LOCAL_FILE_HEADER_SIZE)
+
+      const { crc, compressedSize } = await deflateFile(
+        file,
+        fileStat.size,
+        output,
+        offset + header.length,
+      )
+      if (offset + header.length + compressedSize >= MAX_UINT32) return false
+      header.writeUInt32LE(crc, 14)
+      header.writeUInt32LE(compressedSize, 18)
+      await output.write(header, 0, header.length, offset)
+
+      const record = Buffer.alloc(CENTRAL_DIRECTORY_HEADER_SIZE + name.length)
+      record.writeUInt32LE(CENTRAL_DIRECTORY_HEADER, 0)
+      record.writeUInt16LE(((unix ? 3 : 0) << 8) | VERSION, 4)
+      // From the version needed to extract to the uncompressed size, the
+      // fields of both headers are the same
+      header.copy(record, 6, 4, 26)
+      record.writeUInt16LE(name.length, 28)
+      record.writeUInt32LE(
+        unix ? ((fileStat.mode & MAX_UINT16) << 16) >>> 0 : 0,
+        38,
+      )
+      record.writeUInt32LE(offset, 42)
+      name.copy(record, CENTRAL_DIRECTORY_HEADER_SIZE)
+      records.push(record)
+      offset += header.length + compressedSize
+    }
+    await writeCentralDirectory(output, records, offset)
+    written = true
+    return true
+  } finally {
+    await output.close()
+    if (!written) await fse.remove(targetPath)
+  }
+}
+
+/**
+ * Merge a requirements archive into a package, copying the compressed
+ * entries of both as they are, through a buffer of bounded size. Entries of
+ * the package with the same path as a requirement are replaced.
+ * @param {string} packagePath
+ * @param {string} archivePath written by writeRequirementsArchive
+ * @return {Promise<boolean>} false if the package or the result need ZIP64,
+ * which is not supported, and the package was left as it was
+ */
+async function mergeRequirementsArchive(packagePath, archivePath) {
+  const tempPath = `${packagePath}.tmp`
+  const source = await fs.promises.open(packagePath, 'r')
+  let requirements
+  let output
+  let merged = false
+  try {
+    requirements = await fs.promises.open(archivePath, 'r')
+    const sourceDirectory = await readCentralDirectory(source)
+    const requirementsDirectory = await readCentralDirectory(requirements)
+    if (!sourceDirectory || !requirementsDirectory) return false
+
+    const injected = new Set(
+      requirementsDirectory.entries.map(({ name }) => name),
+    )
+    const kept = sourceDirectory.entries.filter(
+      ({ name }) => !injected.has(name),
+    )
+    // Entries of the package are written without their data descriptors and
+    // extra fields, so are at most as large as the sum below
+    const size =
+      kept.reduce(
+        (sum, { record }) =>
+          sum +
+          LOCAL_FILE_HEADER_SIZE +
+          record.readUInt16LE(28) +
+          record.readUInt32LE(20) +
+          record.length,
+        0,
+      ) +
+      requirementsDirectory.offset +
+      requirementsDirectory.entries.reduce(
+        (sum, { record }) => sum + record.length,
+        0,
+      )
+    if (
+      kept.length + requirementsDirectory.entries.length >= MAX_UINT16 ||
+      size >= MAX_UINT32
+    ) {
+      return false
+    }
+
+    output = await fs.promises.open(tempPath, 'w')
+    const buffer = Buffer.alloc(BUFFER_SIZE)
+    const localHeader = Buffer.alloc(LOCAL_FILE_HEADER_SIZE)
+    const records = []
+    let offset = 0
+    for (const { record } of kept) {
+      const localOffset = record.readUInt32LE(42)
+      await source.read(localHeader, 0, LOCAL_FILE_HEADER_SIZE, localOffset)
+      if (localHeader.readUInt32LE(0) !== LOCAL_FILE_HEADER) return false
+
+      // Sizes and CRC-32 are taken from the central directory, as they are
+      // left out of the local headers of entries with data descriptors
+      const nameLength = record.readUInt16LE(28)
+      const flags = record.readUInt16LE(8) & ~FLAG_DATA_DESCRIPTOR
+      const compressedSize = record.readUInt32LE(20)
+      const header = Buffer.alloc(LOCAL_FILE_HEADER_SIZE + nameLength)
+      header.writeUInt32LE(LOCAL_FILE_HEADER, 0)
+      record.copy(header, 4, 6, 28)
+      header.writeUInt16LE(flags, 6)
+      header.writeUInt16LE(nameLength, 26)
+      record.copy(
+        header,
+        LOCAL_FILE_HEADER_SIZE,
+        CENTRAL_DIRECTORY_HEADER_SIZE,
+        CENTRAL_DIRECTORY_HEADER_SIZE + nameLength,
+      )
+      await output.write(header, 0, header.length, offset)
+      await copyRange(
+        source,
+        output,
+        buffer,
+        localOffset +
+          LOCAL_FILE_HEADER_SIZE +
+          localHeader.readUInt16LE(26) +
+          localHeader.readUInt16LE(28),
+        offset + header.length,
+        compressedSize,
+      )
+
+      const centralRecord = Buffer.from(record)
+      centralRecord.writeUInt16LE(flags, 8)
+      centralRecord.writeUInt32LE(offset, 42)
+      records.push(centralRecord)
+      offset += header.length + compressedSize
+    }
+
+    // The entries of the requirements archive are all before its central
+    // directory, and copied at once
+    await copyRange(
+      requirements,
+      output,
+      buffer,
+      0,
+      offset,
+      requirementsDirectory.offset,
+    )
+    for (const { record } of requirementsDirectory.entries) {
+      const centralRecord = Buffer.from(record)
+      centralRecord.writeUInt32LE(record.readUInt32LE(42) + offset, 42)
+      records.push(centralRecord)
+    }
+    offset += requirementsDirectory.offset
+
+    await writeCentralDirectory(output, records, offset)
+    await output.close()
+    output = null
+    await fse.rename(tempPath, packagePath)
+    merged = true
+    return true
+  } finally {
+    await source.close()
+    if (requirements) await requirements.close()
+    if (output) await output.close()
+    if (!merged) await fse.remove(tempPath)
+  }
+}
+
+export { crc32, mergeRequirementsArchive, writeRequirementsArchive }
@@ -1,24 +1,251 @@
+import fnmatch
+import hashlib
 import os
 import shutil
+import struct
 import sys
+import tempfile
+import threading
 import zipfile
+from importlib.machinery import PathFinder
 
+try:
+    import fcntl
+except ImportError:
+    # Windows, where requirements are only unzipped when invoking locally
+    fcntl = None
 
-pkgdir = '/tmp/sls-py-req'
 
-# We want our path to look like [working_dir, serverless_requirements, ...]
-sys.path.insert(1, pkgdir)
+# Set by the Framework when packaging, from custom.pythonRequirements.zip:
+# 'extract' extracts all the requirements on the first import, while 'lazy'
+# imports them from the archive, only extracting the packages which cannot be
+# imported from it, once imported
+MODE = 'extract'
+# Set from custom.pythonRequirements.zipExclude: glob patterns of the members
+# of the archive never extracted, e.g. '*/tests/*'
+EXCLUDE = []
 
-if not os.path.exists(pkgdir):
-    tempdir = '/tmp/_temp-sls-py-req'
-    if os.path.exists(tempdir):
-        shutil.rmtree(tempdir)
+# Requirements are extracted to a directory named after it, suffixed with a
+# digest of the archive, in /tmp on Lambda
+pkgdir = os.path.join(tempfile.gettempdir(), 'sls-py-req')
 
+
+def requirements_zip():
     default_lambda_task_root = os.environ.get('LAMBDA_TASK_ROOT', os.getcwd())
     lambda_task_root = os.getcwd() if os.environ.get('IS_LOCAL') == 'true' else default_lambda_task_root
-    zip_requirements = os.path.join(lambda_task_root, '.requirements.zip')
+    return os.path.join(lambda_task_root, '.requirements.zip')
+
+
+def archive_digest(archive):
+    """Digest of the central directory of the archive, which lists the path,
+    CRC and size of every member, along with the settings of the extraction"""
+    digest = hashlib.sha256(repr((MODE, EXCLUDE)).encode('utf-8'))
+    with open(archive, 'rb') as requirements:
+        size = requirements.seek(0, os.SEEK_END)
+        # The end of central directory record, 22 bytes followed by a comment
+        # of up to 64 KB, ends the archive
+        tail_size = min(size, 22 + 0xFFFF)
+        requirements.seek(size - tail_size)
+        tail = requirements.read(tail_size)
+        end = tail.rfind(b'PK\x05\x06')
+        if end >= 0 and end + 22 <= len(tail):
+            directory_size, directory_offset = struct.unpack('<II', tail[end + 12:end + 20])
+            # Both are set to 0xFFFFFFFF in ZIP64 archives
+            if 0xFFFFFFFF not in (directory_size, directory_offset):
+                requirements.seek(directory_offset)
+                digest.update(requirements.read(directory_size))
+                return digest.hexdigest()[:16]
+    with zipfile.ZipFile(archive) as requirements:
+        for info in requirements.infolist():
+            digest.update(repr((info.filename, info.CRC, info.file_size)).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def lock(lock_file, exclusive):
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def try_lock(lock_file):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def collect_garbage(current):
+    """Removes the directories of other archives, unless a process still
+    uses them, and leftovers of interrupted extractions"""
+    directory, name = os.path.split(pkgdir)
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        if not entry.startswith(name + '-') or entry.endswith('.lock') or path == current:
+            continue
+        version = path.partition('.tmp-')[0]
+        if version == current:
+            # Extractions of this archive only happen with its lock held
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+        try:
+            lock_file = open(version + '.lock', 'a')
+        except OSError:
+            continue
+        with lock_file:
+            # Processes using a directory hold a shared lock on it
+            if try_lock(lock_file):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def open_requirements(archive):
+    """Returns the directory the requirements of the archive are extracted
+    to, extracting them unless done already, and the lock file held as long as
+    it is in use"""
+    target = '{}-{}'.format(pkgdir, archive_digest(archive))
+    lock_file = open(target + '.lock', 'a')
+    lock(lock_file, False)
+    if not os.path.isdir(target):
+        # Processes extracting at the same time wait for the first one, and
+        # then use its extraction
+        lock(lock_file, True)
+        if not os.path.isdir(target):
+            tempdir = '{}.tmp-{}'.format(target, os.getpid())
+            shutil.rmtree(tempdir, ignore_errors=True)
+            if MODE == 'lazy':
+                os.makedirs(tempdir)
+            else:
+                extract(archive, tempdir)
+            os.rename(tempdir, target)  # Atomic
+            collect_garbage(target)
+        lock(lock_file, False)
+    return target, lock_file
+
+
+def needs_file(member):
+    # Python sources are imported from the archive by zipimport, anything
+    # else, native extension modules or data files read with open(), needs a
+    # real file
+    name = member.rsplit('/', 1)[-1]
+    return bool(name) and not name.endswith(('.py', '.pyc', '.pyi')) and name != 'py.typed'
+
+
+def excluded(member):
+    return any(fnmatch.fnmatchcase(member, pattern) for pattern in EXCLUDE)
+
+
+def extract(archive, target, members=None):
+    """Extracts members of the archive, all by default, with a thread per
+    CPU, as zlib releases the GIL while decompressing"""
+    os.makedirs(target, exist_ok=True)
+    with zipfile.ZipFile(archive) as requirements:
+        infos = [info for info in requirements.infolist()
+                 if not info.is_dir() and not excluded(info.filename)
+                 and (members is None or info.filename in members)]
+    threads = max(min(os.cpu_count() or 1, len(infos)), 1)
+    # Members are spread across threads by compressed size, largest first, to
+    # the thread with the least to decompress so far
+    partitions = [[] for _ in range(threads)]
+    sizes = [0] * threads
+    for info in sorted(infos, key=lambda info: info.compress_size, reverse=True):
+        index = sizes.index(min(sizes))
+        partitions[index].append(info)
+        sizes[index] += info.compress_size
+    # Directories are created upfront, so that threads do not race to
+    for directory in set(os.path.dirname(info.filename) for info in infos):
+        os.makedirs(os.path.join(target, directory), exist_ok=True)
+    errors = []
+
+    def extract_partition(partition):
+        try:
+            with zipfile.ZipFile(archive) as requirements:
+                for info in partition:
+                    requirements.extract(info, target)
+        except Exception as error:
+            errors.append(error)
+
+    workers = [threading.Thread(target=extract_partition, args=(partition,))
+               for partition in partitions[1:]]
+    for worker in workers:
+        worker.start()
+    extract_partition(partitions[0])
+    for worker in workers:
+        worker.join()
+    if errors:
+        raise errors[0]
+
+
+class LazyExtractor(object):
+    """Extracts the top-level packages and modules of the archive which
+    cannot be imported from it the first time they are imported, along with
+    the shared libraries vendored by wheels in *.libs directories"""
+
+    def __init__(self, archive, target):
+        self.archive = archive
+        self.target = target
+        # Members of every top-level package or module to extract, by name
+        self.members = {}
+        self.libs = []
+        with zipfile.ZipFile(archive) as requirements:
+            for member in requirements.namelist():
+                top, separator, _ = member.partition('/')
+                if not separator:
+                    # Top-level modules, e.g. six.py or _cffi_backend.*.so
+                    top = top.split('.', 1)[0]
+                elif top.endswith('.libs'):
+                    self.libs.append(member)
+                    continue
+                elif top.endswith(('.dist-info', '.egg-info')):
+                    # Metadata is read from the archive by importlib.metadata
+                    continue
+                self.members.setdefault(top, []).append(member)
+        self.members = {name: members for name, members in self.members.items()
+                        if any(needs_file(member) and not excluded(member)
+                               for member in members)}
+
+    def find_spec(self, name, path, target=None):
+        # Only top-level imports are handled, submodules of extracted packages
+        # are then found on disk through the __path__ of their package
+        if path is not None or name not in self.members:
+            return None
+        members = self.members.pop(name)
+        # Extracted already by a previous process of the same sandbox
+        if not os.path.exists(os.path.join(self.target, members[0].partition('/')[0])):
+            self.extract(members)
+        return PathFinder.find_spec(name, [self.target])
 
-    zipfile.ZipFile(zip_requirements, 'r').extractall(tempdir)
-    os.rename(tempdir, pkgdir)  # Atomic
+    def extract(self, members):
+        if self.libs:
+            members, self.libs = members + self.libs, []
+        # Extracted to a temporary directory first, and moved in place once
+        # complete, so that a process killed while extracting leaves no
+        # partial package behind
+        tempdir = tempfile.mkdtemp(prefix='.extract-', dir=self.target)
+        extract(self.archive, tempdir, set(members))
+        for entry in os.listdir(tempdir):
+            try:
+                os.rename(os.path.join(tempdir, entry), os.path.join(self.target, entry))
+            except OSError:
+                # Moved in place by another process in the meantime
+                pass
+        shutil.rmtree(tempdir, ignore_errors=True)
+        # The listing of the directory cached by its finder may predate these
+        sys.path_importer_cache.pop(self.target, None)
 
 
+# Set by the Framework when tracing the files loaded by handlers with treeShake,
+# before the requirements are archived, as they are imported from their folder
+if not os.environ.get('SLS_SKIP_UNZIP_REQUIREMENTS'):
+    zip_requirements = requirements_zip()
+    # The lock is held until the process exits, so that the directory is not
+    # collected while in use
+    requirements_dir, requirements_lock = open_requirements(zip_requirements)
+    if MODE == 'lazy':
+        # Packages extracted already are found on disk, and the others are
+        # imported from the archive: [working_dir, extracted, archive, ...]
+        sys.path[1:1] = [requirements_dir, zip_requirements]
+        sys.meta_path.insert(0, LazyExtractor(zip_requirements, requirements_dir))
+    else:
+        # We want our path to look like [working_dir, serverless_requirements, ...]
+        sys.path.insert(1, requirements_dir)
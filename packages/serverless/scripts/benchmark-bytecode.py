@@ -0,0 +1,83 @@
+"""Benchmarks the cold start of importing installed requirements, without their
+bytecode as slim leaves them, against with bytecode compiled ahead of time as
+compileBytecode does.
+
+Every run is a new Python process which cannot write bytecode, as in a Lambda
+execution environment where /var/task is read-only, importing the given
+modules from a copy of the requirements:
+
+    python scripts/benchmark-bytecode.py \\
+        .serverless/requirements numpy requests --runs 10
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+IMPORT = '''
+import time
+start = time.perf_counter()
+{imports}
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def remove_bytecode(path):
+    # As slim does, with its default patterns
+    for cache in glob.glob(os.path.join(path, '**', '__pycache__'), recursive=True):
+        shutil.rmtree(cache, ignore_errors=True)
+    for name in glob.glob(os.path.join(path, '**', '*.py[co]'), recursive=True):
+        os.remove(name)
+
+
+def prepare(python, requirements, target, compiled):
+    shutil.copytree(requirements, target, symlinks=True)
+    remove_bytecode(target)
+    if compiled:
+        subprocess.run(
+            [python, '-m', 'compileall', '-q', '-f', '-j', '0',
+             '--invalidation-mode', 'unchecked-hash', target],
+            check=True, stdout=subprocess.DEVNULL)
+
+
+def run(python, target, modules):
+    code = IMPORT.format(imports='\n'.join('import ' + module for module in modules))
+    output = subprocess.run(
+        [python, '-c', code], check=True, stdout=subprocess.PIPE,
+        env=dict(os.environ, PYTHONPATH=target, PYTHONDONTWRITEBYTECODE='1'))
+    return float(output.stdout.splitlines()[-1])
+
+
+def directory_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('requirements', help='Path to a directory of installed requirements')
+    parser.add_argument('modules', nargs='+', help='Modules imported by the handler')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--python', default=sys.executable,
+                        help='Python of the runtime, e.g. python3.12')
+    args = parser.parse_args()
+
+    print('{:<10} {:>10} {:>10} {:>10} {:>10}'.format('bytecode', 'mean (ms)', 'min (ms)', 'max (ms)', 'size (MB)'))
+    with tempfile.TemporaryDirectory() as tempdir:
+        for compiled in (False, True):
+            target = os.path.join(tempdir, 'compiled' if compiled else 'slim')
+            prepare(args.python, args.requirements, target, compiled)
+            times = [run(args.python, target, args.modules) for _ in range(args.runs)]
+            print('{:<10} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+                'yes' if compiled else 'no', sum(times) / len(times), min(times), max(times),
+                directory_size(target) / 1024.0 / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Benchmarks the cold start of unzip_requirements.py, extracting all the
+requirements against importing them lazily from the archive.
+
+Every run is a new Python process, starting from an empty extraction
+directory as a new Lambda execution environment would, which imports
+unzip_requirements then the given modules:
+
+    python scripts/benchmark-unzip-requirements.py \\
+        .serverless/requirements.zip numpy requests --runs 10
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HELPER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      '..', 'lib', 'plugins', 'python', 'unzip_requirements.py')
+
+IMPORT = '''
+import time
+start = time.perf_counter()
+import unzip_requirements
+{imports}
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def write_helper(path, settings):
+    # Settings are set as the Framework does when packaging
+    with open(HELPER) as helper:
+        source = helper.read()
+    for name, value in settings.items():
+        source = re.sub(r'^{} = .*$'.format(name), '{} = {!r}'.format(name, value),
+                        source, flags=re.M)
+    with open(path, 'w') as helper:
+        helper.write(source)
+
+
+def directory_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return size
+
+
+def run(python, archive, modules, mode):
+    with tempfile.TemporaryDirectory() as task_root:
+        pkgdir = os.path.join(task_root, 'sls-py-req')
+        write_helper(os.path.join(task_root, 'unzip_requirements.py'),
+                     {'MODE': mode, 'pkgdir': pkgdir})
+        shutil.copy(archive, os.path.join(task_root, '.requirements.zip'))
+        code = IMPORT.format(imports='\n'.join('import ' + module for module in modules))
+        output = subprocess.run(
+            [python, '-c', code], cwd=task_root, check=True, stdout=subprocess.PIPE,
+            env=dict(os.environ, IS_LOCAL='true', PYTHONDONTWRITEBYTECODE='1'))
+        # Requirements are extracted to a directory suffixed with a digest
+        return float(output.stdout.splitlines()[-1]), sum(
+            directory_size(path) for path in glob.glob(pkgdir + '-*'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('archive', help='Path to a .requirements.zip archive')
+    parser.add_argument('modules', nargs='+', help='Modules imported by the handler')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--python', default=sys.executable)
+    args = parser.parse_args()
+
+    print('{:<8} {:>10} {:>10} {:>10} {:>12}'.format('mode', 'mean (ms)', 'min (ms)', 'max (ms)', '/tmp (MB)'))
+    for mode in ('extract', 'lazy'):
+        times = []
+        for _ in range(args.runs):
+            duration, size = run(args.python, os.path.abspath(args.archive), args.modules, mode)
+            times.append(duration)
+        print('{:<8} {:>10.1f} {:>10.1f} {:>10.1f} {:>12.1f}'.format(
+            mode, sum(times) / len(times), min(times), max(times), size / 1024.0 / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import { PassThrough } from 'stream'
+import {
+  createServiceDir,
+  describeWithPython,
+  python,
+  removeServiceDir,
+  wrapperPath,
+} from './runtime-wrappers/given.js'
+
+const mockWriteText = jest.fn()
+
+jest.unstable_mockModule('@serverless/util', () => ({
+  log: { warning: jest.fn(), error: jest.fn(), info: jest.fn() },
+  progress: { get: () => ({ notice: jest.fn(), remove: jest.fn() }) },
+  writeText: mockWriteText,
+}))
+
+const { default: AwsInvokeLocal } =
+  await import('../../../../../../lib/plugins/aws/invoke-local/index.js')
+
+describeWithPython('invokeLocalPythonWarm', () => {
+  jest.setTimeout(60_000)
+
+  const stdin = Object.getOwnPropertyDescriptor(process, 'stdin')
+  const { PYTHONPATH } = process.env
+  let serviceDir
+  let input
+
+  // Invokes warm workers of the handler with the lines written to stdin
+  const invokeWarm = (handler, args = []) =>
+    AwsInvokeLocal.prototype.invokeLocalPythonWarm.call(
+      { options: {} },
+      python,
+      ['-u', wrapperPath, handler, 'hello', ...args],
+      { name: 'service-dev-hello', timeout: 1 },
+    )
+
+  const getOutput = () =>
+    mockWriteText.mock.calls
+      .map(([text]) => text)
+      .join('')
+      .split('\n')
+      .filter((line) => line.startsWith('{'))
+      .map((line) => JSON.parse(line))
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({
+      'broken.py': "raise ImportError('broken')\n",
+      'sleepy.py': `import time
+
+
+def hello(event, context):
+    time.sleep(event['sleep'])
+    return event
+`,
+    })
+    // Workers import the handler from the service directory
+    process.env.PYTHONPATH = serviceDir
+    input = new PassThrough()
+    Object.defineProperty(process, 'stdin', {
+      value: input,
+      configurable: true,
+    })
+    mockWriteText.mockClear()
+    process.exitCode = undefined
+  })
+
+  afterEach(() => {
+    Object.defineProperty(process, 'stdin', stdin)
+    if (PYTHONPATH === undefined) delete process.env.PYTHONPATH
+    else process.env.PYTHONPATH = PYTHONPATH
+    process.exitCode = undefined
+    removeServiceDir(serviceDir)
+  })
+
+  test('rejects once a worker fails to import the handler', async () => {
+    // stdin is left open, so that a worker would be replaced for ever
+    input.write(`${JSON.stringify({ name: 'a' })}\n`)
+
+    await expect(invokeWarm('broken')).rejects.toMatchObject({
+      code: 'INVOKE_LOCAL_LAMBDA_INITIALIZATION_FAILED',
+    })
+    expect(getOutput()).toEqual([])
+  })
+
+  test('replaces a worker killed past the timeout', async () => {
+    const invoked = invokeWarm('sleepy', ['--enforce-timeout'])
+    input.write(`${JSON.stringify({ sleep: 3 })}\n`)
+    input.end(`${JSON.stringify({ sleep: 0 })}\n`)
+
+    await invoked
+    expect(getOutput()).toEqual([
+      {
+        errorMessage: 'Task timed out after 1.00 seconds',
+        errorType: 'Sandbox.Timedout',
+      },
+      { sleep: 0 },
+    ])
+    expect(process.exitCode).toBe(1)
+  })
+
+  test('sets the exit code on errors of the handler', async () => {
+    const invoked = invokeWarm('handler')
+    input.end(`${JSON.stringify({ fail: true })}\n`)
+
+    await invoked
+    expect(getOutput()).toEqual([
+      expect.objectContaining({ errorMessage: 'failed' }),
+    ])
+    expect(process.exitCode).toBe(1)
+  })
+
+  test('exits with success once every request succeeded', async () => {
+    const invoked = invokeWarm('handler')
+    input.end(`${JSON.stringify({ name: 'a' })}\n`)
+
+    await invoked
+    expect(getOutput()).toEqual([{ name: 'a', function: 'service-dev-hello' }])
+    expect(process.exitCode).toBeUndefined()
+  })
+})
@@ -0,0 +1,356 @@
+import { describe, beforeEach, afterEach, it, expect } from '@jest/globals'
+import fs from 'fs'
+import os from 'os'
+import path from 'path'
+
+const { default: AwsInvokeLocal } =
+  await import('../../../../../../lib/plugins/aws/invoke-local/index.js')
+
+describe('invoke local Python options', () => {
+  let serviceDir
+
+  const createPlugin = (options, { runtime = 'python3.12' } = {}) => {
+    const provider = {
+      getStage: () => 'dev',
+      getRegion: () => 'us-east-1',
+      getRuntime: (functionRuntime) => functionRuntime || runtime,
+      naming: { getLogGroupName: (name) => `/aws/lambda/${name}` },
+    }
+    return new AwsInvokeLocal(
+      {
+        serviceDir,
+        getProvider: () => provider,
+        service: {
+          provider: { name: 'aws', runtime },
+          getFunction: () => ({
+            name: 'service-dev-hello',
+            handler: 'handler.hello',
+            timeout: 3,
+            memorySize: 256,
+          }),
+        },
+      },
+      // Data is given so that stdin is not read
+      { function: 'hello', data: '{}', ...options },
+      { progress: { remove: () => {} }, log: {} },
+    )
+  }
+
+  beforeEach(() => {
+    serviceDir = fs.mkdtempSync(path.join(os.tmpdir(), 'sls-invoke-py-'))
+    fs.writeFileSync(path.join(serviceDir, 'events.jsonl'), '{"event":{}}\n')
+  })
+
+  afterEach(() => {
+    fs.rmSync(serviceDir, { recursive: true, force: true })
+  })
+
+  describe('extendedValidate', () => {
+    const rejects = (options, code) =>
+      expect(createPlugin(options).extendedValidate()).rejects.toMatchObject({
+        code,
+      })
+
+    it('resolves the replayed events and the number of workers', async () => {
+      const plugin = createPlugin({ replay: 'events.jsonl', workers: '4' })
+      await plugin.extendedValidate()
+      expect(plugin.options.replay).toEqual(
+        path.join(serviceDir, 'events.jsonl'),
+      )
+      expect(plugin.options.workers).toEqual(4)
+    })
+
+    it('rejects replaying events from a missing file', async () => {
+      await rejects({ replay: 'missing.jsonl' }, 'INVOKE_LOCAL_MISSING_FILE')
+    })
+
+    it('rejects numbers of workers which are not positive integers', async () => {
+      for (const workers of ['0', '1.5', 'two']) {
+        await rejects({ workers }, 'INVOKE_LOCAL_INVALID_WORKERS')
+      }
+    })
+
+    it('rejects an event file combined with other events', async () => {
+      for (const options of [
+        { path: 'events.jsonl' },
+        { warm: true },
+        { replay: 'events.jsonl' },
+        { serve: '3000' },
+      ]) {
+        await rejects(
+          { 'event-file': 'events.jsonl', data: '', ...options },
+          'INVOKE_LOCAL_INVALID_EVENT_FILE_OPTION',
+        )
+      }
+    })
+
+    it('rejects event formats without an event file or not supported', async () => {
+      await rejects(
+        { 'event-format': 'str' },
+        'INVOKE_LOCAL_INVALID_EVENT_FORMAT',
+      )
+      await rejects(
+        { 'event-file': 'events.jsonl', data: '', 'event-format': 'xml' },
+        'INVOKE_LOCAL_INVALID_EVENT_FORMAT',
+      )
+    })
+
+    it('accepts a fractional benchmark threshold only', async () => {
+      const plugin = createPlugin({ warmup: '2', threshold: '2.5' })
+      await plugin.extendedValidate()
+      expect(plugin.options.warmup).toEqual(2)
+      expect(plugin.options.threshold).toEqual(2.5)
+
+      await rejects({ warmup: '1.5' }, 'INVOKE_LOCAL_INVALID_BENCHMARK_OPTION')
+      await rejects(
+        { iterations: '-1' },
+        'INVOKE_LOCAL_INVALID_BENCHMARK_OPTION',
+      )
+      await rejects(
+        { threshold: 'high' },
+        'INVOKE_LOCAL_INVALID_BENCHMARK_OPTION',
+      )
+    })
+
+    it('accepts a fractional idle expiry only', async () => {
+      const plugin = createPlugin({ concurrency: '10', 'idle-expiry': '0.5' })
+      await plugin.extendedValidate()
+      expect(plugin.options.concurrency).toEqual(10)
+      expect(plugin.options['idle-expiry']).toEqual(0.5)
+
+      await rejects(
+        { concurrency: '1.5' },
+        'INVOKE_LOCAL_INVALID_SIMULATION_OPTION',
+      )
+      await rejects(
+        { provisioned: '-1' },
+        'INVOKE_LOCAL_INVALID_SIMULATION_OPTION',
+      )
+    })
+
+    it('rejects a negative maximum queue length', async () => {
+      await rejects({ 'max-queue': '-1' }, 'INVOKE_LOCAL_INVALID_MAX_QUEUE')
+    })
+
+    it('rejects unsupported report and profile formats', async () => {
+      await rejects(
+        { 'report-format': 'xml' },
+        'INVOKE_LOCAL_INVALID_REPORT_FORMAT',
+      )
+      await rejects(
+        { 'profile-format': 'svg' },
+        'INVOKE_LOCAL_INVALID_PROFILE_FORMAT',
+      )
+    })
+
+    it('rejects streaming responses of several events', async () => {
+      for (const options of [
+        { warm: true },
+        { replay: 'events.jsonl' },
+        { simulate: 'events.jsonl' },
+        { serve: '3000' },
+      ]) {
+        await rejects(
+          { stream: true, ...options },
+          'INVOKE_LOCAL_INVALID_STREAM_OPTION',
+        )
+      }
+    })
+
+    it('rejects reloading the handler without a warm worker', async () => {
+      await rejects({ reload: true }, 'INVOKE_LOCAL_INVALID_RELOAD_OPTION')
+    })
+
+    it('rejects forking without replaying events or while profiling', async () => {
+      await rejects({ fork: true }, 'INVOKE_LOCAL_INVALID_FORK_OPTION')
+      await rejects(
+        { fork: true, replay: 'events.jsonl', 'cpu-profile': true },
+        'INVOKE_LOCAL_INVALID_FORK_OPTION',
+      )
+      await rejects(
+        { fork: true, replay: 'events.jsonl', 'profile-format': 'collapsed' },
+        'INVOKE_LOCAL_INVALID_FORK_OPTION',
+      )
+    })
+
+    it('rejects snapshot hooks which are not given as MODULE:FUNCTION', async () => {
+      for (const options of [
+        { 'before-snapshot': 'hooks.close' },
+        { 'after-restore': ['hooks:open', 'hooks'] },
+        { 'after-restore': 'hooks:open:now' },
+      ]) {
+        await rejects(
+          { fork: true, replay: 'events.jsonl', ...options },
+          'INVOKE_LOCAL_INVALID_SNAPSHOT_HOOK',
+        )
+      }
+    })
+
+    it('accepts snapshot hooks of packaged modules', async () => {
+      const plugin = createPlugin({
+        fork: true,
+        replay: 'events.jsonl',
+        'before-snapshot': 'lib.hooks:close',
+        'after-restore': ['hooks:open', 'hooks:seed'],
+      })
+      await expect(plugin.extendedValidate()).resolves.toBeUndefined()
+    })
+  })
+
+  describe('invokeLocal', () => {
+    it('rejects Python options for other runtimes', async () => {
+      const plugin = createPlugin({ warm: true }, { runtime: 'nodejs20.x' })
+      await plugin.extendedValidate()
+      await expect(plugin.invokeLocal()).rejects.toMatchObject({
+        code: 'INVOKE_LOCAL_PYTHON_ONLY_OPTION',
+        message: expect.stringContaining('"--warm"'),
+      })
+    })
+
+    it('rejects Python options for functions invoked with Docker', async () => {
+      const plugin = createPlugin({ 'cpu-profile': true, docker: true })
+      await plugin.extendedValidate()
+      await expect(plugin.invokeLocal()).rejects.toMatchObject({
+        code: 'INVOKE_LOCAL_PYTHON_ONLY_OPTION',
+        message: expect.stringContaining('"--cpu-profile"'),
+      })
+    })
+  })
+
+  describe('getPythonWrapperArgs', () => {
+    const getArgs = async (options) => {
+      const plugin = createPlugin(options)
+      await plugin.extendedValidate()
+      return {
+        plugin,
+        args: plugin.getPythonWrapperArgs(
+          'invoke.py',
+          'handler',
+          'hello',
+          plugin.options.context,
+        ),
+      }
+    }
+
+    it('passes the handler to the wrapper', async () => {
+      const { args } = await getArgs({})
+      expect(args).toEqual(['-u', 'invoke.py', 'handler', 'hello'])
+    })
+
+    it('passes the profiling options', async () => {
+      const { plugin, args } = await getArgs({
+        'profile-imports': true,
+        'profile-format': 'collapsed',
+        'report-format': 'json',
+      })
+      const profileDirectory = plugin.getProfileDirectory()
+      expect(
+        profileDirectory.startsWith(
+          path.join(serviceDir, '.serverless', 'profiles', 'hello'),
+        ),
+      ).toBe(true)
+      expect(args.slice(4)).toEqual([
+        '--report',
+        'json',
+        '--profile-imports',
+        path.join(profileDirectory, 'imports.trace.json'),
+        '--cpu-profile',
+        profileDirectory,
+        '--profile-format',
+        'collapsed',
+      ])
+    })
+
+    it('passes the memory size of the function with memory options', async () => {
+      const { args } = await getArgs({
+        'enforce-memory': true,
+        'enforce-timeout': true,
+      })
+      expect(args.slice(4)).toEqual([
+        '--enforce-timeout',
+        '--memory-limit',
+        '256',
+        '--enforce-memory',
+      ])
+    })
+
+    it('passes nothing but the reload option to a warm worker', async () => {
+      const { args } = await getArgs({
+        warm: true,
+        reload: true,
+        compact: true,
+      })
+      expect(args.slice(4)).toEqual(['--reload'])
+    })
+
+    it('passes the replay options along with the function context', async () => {
+      const { args } = await getArgs({
+        replay: 'events.jsonl',
+        'replay-output': 'results.jsonl',
+        workers: '2',
+        unordered: true,
+        fork: true,
+        'before-snapshot': 'hooks:close',
+        'after-restore': ['hooks:open', 'hooks:seed'],
+      })
+      const contextIndex = args.indexOf('--context') + 1
+      expect(JSON.parse(args[contextIndex])).toEqual({
+        name: 'service-dev-hello',
+        version: 'LATEST',
+        logGroupName: '/aws/lambda/service-dev-hello',
+        timeout: 3,
+        memorySize: 256,
+      })
+      expect(args.slice(4)).toEqual([
+        '--replay',
+        path.join(serviceDir, 'events.jsonl'),
+        '--context',
+        args[contextIndex],
+        '--output',
+        path.join(serviceDir, 'results.jsonl'),
+        '--workers',
+        '2',
+        '--unordered',
+        '--fork',
+        '--before-snapshot',
+        'hooks:close',
+        '--after-restore',
+        'hooks:open',
+        '--after-restore',
+        'hooks:seed',
+      ])
+    })
+
+    it('passes the event file and its format', async () => {
+      const { args } = await getArgs({
+        'event-file': 'events.jsonl',
+        'event-format': 'bytes',
+        data: '',
+      })
+      expect(args.slice(4)).toEqual([
+        '--event-file',
+        path.join(serviceDir, 'events.jsonl'),
+        '--event-format',
+        'bytes',
+      ])
+    })
+
+    it('passes the simulation options', async () => {
+      const { args } = await getArgs({
+        simulate: 'events.jsonl',
+        concurrency: '10',
+        'idle-expiry': '0.5',
+      })
+      expect(args.slice(4, 6)).toEqual([
+        '--simulate',
+        path.join(serviceDir, 'events.jsonl'),
+      ])
+      expect(args.slice(8)).toEqual([
+        '--concurrency',
+        '10',
+        '--idle-expiry',
+        '0.5',
+      ])
+    })
+  })
+})
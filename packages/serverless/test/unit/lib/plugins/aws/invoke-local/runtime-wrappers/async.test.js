@@ -0,0 +1,71 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import {
+  context,
+  createServiceDir,
+  describeWithPython,
+  invocation,
+  parseLines,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+// Records the loop running every invocation
+const asyncSource = `import asyncio
+
+loops = []
+
+
+async def hello(event, context):
+    loops.append(asyncio.get_running_loop())
+    await asyncio.sleep(0)
+    return {'invocations': len(loops), 'sameLoop': len(set(loops)) == 1}
+
+
+async def stream(event, context):
+    for item in event['items']:
+        await asyncio.sleep(0)
+        yield item
+`
+
+describeWithPython('invoke.py async handlers', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({
+      'asynchandler.py': asyncSource,
+      'events.jsonl': '{}\n{}\n{}\n',
+    })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('runs every invocation on the same event loop', () => {
+    const { status, stdout } = runWrapper(
+      serviceDir,
+      ['--replay', 'events.jsonl', '--context', JSON.stringify(context)],
+      { handler: 'asynchandler' },
+    )
+
+    expect(status).toBe(0)
+    expect(parseLines(stdout)).toEqual([
+      { invocations: 1, sameLoop: true },
+      { invocations: 2, sameLoop: true },
+      { invocations: 3, sameLoop: true },
+    ])
+  })
+
+  test('collects the items of async generators', () => {
+    const { status, stdout } = runWrapper(serviceDir, ['--compact'], {
+      handler: 'asynchandler',
+      name: 'stream',
+      input: invocation({ items: ['a', 'b'] }),
+    })
+
+    expect(status).toBe(0)
+    expect(stdout).toBe('["a","b"]')
+  })
+})
@@ -0,0 +1,111 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import fs from 'fs'
+import path from 'path'
+import {
+  context,
+  createServiceDir,
+  describeWithPython,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+// Keeps the CPU busy for the number of milliseconds given by the event
+const busySource = `import time
+
+
+def hello(event, context):
+    end = time.perf_counter() + event['ms'] / 1000
+    while time.perf_counter() < end:
+        pass
+`
+
+const statistics = (mean) => ({ mean, stdev: 0.01, n: 5, ci95: 0.01 })
+
+describeWithPython('invoke.py --benchmark', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  const benchmark = (args) =>
+    runWrapper(
+      serviceDir,
+      [
+        '--benchmark',
+        'event.json',
+        '--context',
+        JSON.stringify(context),
+        '--warmup',
+        '1',
+        '--iterations',
+        '5',
+        ...args,
+      ],
+      { handler: 'busy' },
+    )
+
+  const writeBaseline = (mean) =>
+    fs.writeFileSync(
+      path.join(serviceDir, 'baseline.json'),
+      JSON.stringify({
+        results: {
+          'event.json': { wallMs: statistics(mean), cpuMs: statistics(mean) },
+        },
+      }),
+    )
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({
+      'busy.py': busySource,
+      'event.json': '{"ms": 5}',
+    })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('measures wall and CPU times of the handler calls alike', () => {
+    const { status } = benchmark(['--save-baseline', 'baseline.json'])
+
+    expect(status).toBe(0)
+    const baseline = JSON.parse(
+      fs.readFileSync(path.join(serviceDir, 'baseline.json'), 'utf8'),
+    )
+    expect(baseline).toMatchObject({
+      handler: 'busy.hello',
+      warmup: 1,
+      iterations: 5,
+    })
+    const { wallMs, cpuMs } = baseline.results['event.json']
+    expect(wallMs.n).toBe(5)
+    expect(wallMs.mean).toBeGreaterThanOrEqual(5)
+    // A handler busy on the CPU uses it for as long as it runs
+    expect(cpuMs.mean).toBeGreaterThan(wallMs.mean * 0.5)
+    expect(cpuMs.mean).toBeLessThan(wallMs.mean * 1.5)
+  })
+
+  test('exits with an error on regressions over the baseline', () => {
+    writeBaseline(1)
+
+    const { status, stdout, stderr } = benchmark([
+      '--compare',
+      'baseline.json',
+    ])
+
+    expect(status).toBe(1)
+    expect(stdout).toMatch(/event\.json {2}wall: \+\d+\.\d% .*, regression/)
+    expect(stderr).toContain(
+      'Performance regressions: event.json wall, event.json cpu',
+    )
+  })
+
+  test('passes the comparison to a slower baseline', () => {
+    writeBaseline(50)
+
+    const { status, stdout } = benchmark(['--compare', 'baseline.json'])
+
+    expect(status).toBe(0)
+    expect(stdout).toMatch(/event\.json {2}wall: -\d+\.\d%/)
+    expect(stdout).not.toContain('regression')
+  })
+})
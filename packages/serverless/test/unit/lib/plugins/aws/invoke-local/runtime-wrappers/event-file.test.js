@@ -0,0 +1,92 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import fs from 'fs'
+import path from 'path'
+import {
+  createServiceDir,
+  describeWithPython,
+  invocation,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+const handlerSource = `def hello(event, context):
+    if isinstance(event, bytes):
+        return {'type': 'bytes', 'event': list(event)}
+    return {'type': type(event).__name__, 'event': event}
+`
+
+describeWithPython('invoke.py --event-file', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({ 'handler.py': handlerSource })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  const invokeWithFile = (content, args = []) => {
+    fs.writeFileSync(path.join(serviceDir, 'event'), content)
+    const { status, stdout, stderr } = runWrapper(
+      serviceDir,
+      ['--event-file', 'event', ...args],
+      { input: invocation({ ignored: true }) },
+    )
+    expect(stderr).toBe('')
+    expect(status).toBe(0)
+    return JSON.parse(stdout)
+  }
+
+  test('parses the file as JSON in place of the event', () => {
+    expect(invokeWithFile('{"name": "café", "items": [1, 2]}')).toEqual({
+      type: 'dict',
+      event: { name: 'café', items: [1, 2] },
+    })
+  })
+
+  test('passes an empty JSON file as an empty event', () => {
+    expect(invokeWithFile('')).toEqual({ type: 'dict', event: {} })
+  })
+
+  test('passes the file as a string with the str format', () => {
+    expect(
+      invokeWithFile('line 1\nline é\n', ['--event-format', 'str']),
+    ).toEqual({
+      type: 'str',
+      event: 'line 1\nline é\n',
+    })
+    expect(invokeWithFile('', ['--event-format', 'str'])).toEqual({
+      type: 'str',
+      event: '',
+    })
+  })
+
+  test('passes the file unchanged with the bytes format', () => {
+    const content = Buffer.from([0, 255, 10, 128, 65])
+
+    expect(invokeWithFile(content, ['--event-format', 'bytes'])).toEqual({
+      type: 'bytes',
+      event: [...content],
+    })
+    expect(invokeWithFile('', ['--event-format', 'bytes'])).toEqual({
+      type: 'bytes',
+      event: [],
+    })
+  })
+
+  test('rejects an event format without an event file', () => {
+    const { status, stderr } = runWrapper(
+      serviceDir,
+      ['--event-format', 'str'],
+      { input: invocation({}) },
+    )
+
+    expect(status).toBe(2)
+    expect(stderr).toContain(
+      '--event-format can only be used with --event-file',
+    )
+  })
+})
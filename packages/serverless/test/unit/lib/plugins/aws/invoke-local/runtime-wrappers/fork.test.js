@@ -0,0 +1,165 @@
+import {
+  jest,
+  describe,
+  beforeEach,
+  afterEach,
+  test,
+  expect,
+} from '@jest/globals'
+import fs from 'fs'
+import path from 'path'
+import {
+  context,
+  createServiceDir,
+  describeWithPython,
+  parseLines,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+// Hooks recording the process they run in
+const hooksSource = `import os
+
+pids = {}
+
+
+def close():
+    pids['before_snapshot'] = os.getpid()
+
+
+def open():
+    pids['after_restore'] = os.getpid()
+`
+
+const forkedSource = `import os
+
+import hooks
+
+
+def hello(event, context):
+    return {
+        'snapshot': hooks.pids.get('before_snapshot') not in (None, os.getpid()),
+        'restored': hooks.pids.get('after_restore') == os.getpid(),
+    }
+`
+
+const slowSource = `import time
+
+print('imported')
+
+
+def hello(event, context):
+    time.sleep(event['sleep'])
+    return event['sleep']
+`
+
+const describeWithFork =
+  process.platform === 'win32' ? describe.skip : describeWithPython
+
+describeWithFork('invoke.py --fork', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  const replay = (args) =>
+    runWrapper(
+      serviceDir,
+      [
+        '--replay',
+        'events.jsonl',
+        '--context',
+        JSON.stringify(context),
+        '--fork',
+        ...args,
+      ],
+      { handler: 'forked' },
+    )
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({
+      'hooks.py': hooksSource,
+      'forked.py': forkedSource,
+      'slow.py': slowSource,
+      'events.jsonl': '{}\n{}\n',
+    })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('runs the hooks before the snapshot and after every restore', () => {
+    const { status, stdout, stderr } = replay([
+      '--before-snapshot',
+      'hooks:close',
+      '--after-restore',
+      'hooks:open',
+    ])
+
+    expect(status).toBe(0)
+    expect(parseLines(stdout)).toEqual([
+      { snapshot: true, restored: true },
+      { snapshot: true, restored: true },
+    ])
+    expect(stderr).toMatch(/Fork latency p50: [\d.]+ ms/)
+  })
+
+  test('runs no hooks unless given', () => {
+    const { status, stdout } = replay([])
+
+    expect(status).toBe(0)
+    expect(parseLines(stdout)).toEqual([
+      { snapshot: false, restored: false },
+      { snapshot: false, restored: false },
+    ])
+  })
+
+  test('rejects hooks which are not given as MODULE:FUNCTION', () => {
+    const { status, stderr } = replay(['--before-snapshot', 'hooks.close'])
+
+    expect(status).toBe(2)
+    expect(stderr).toContain('hooks must be given as MODULE:FUNCTION')
+  })
+
+  test('imports the handler once, reporting restores instead', () => {
+    fs.writeFileSync(
+      path.join(serviceDir, 'events.jsonl'),
+      '{"sleep": 10}\n{"sleep": 0}\n{"sleep": 0}\n',
+    )
+
+    const { status, stdout, stderr } = runWrapper(
+      serviceDir,
+      [
+        '--replay',
+        'events.jsonl',
+        '--context',
+        JSON.stringify({ ...context, timeout: 1 }),
+        '--fork',
+        '--enforce-timeout',
+        '--report',
+        'text',
+      ],
+      { handler: 'slow' },
+    )
+
+    expect(status).toBe(0)
+    expect(stderr.match(/imported/g)).toHaveLength(1)
+    // The process forked for the first event is killed past the timeout,
+    // without affecting the next ones
+    expect(parseLines(stdout)).toEqual([
+      {
+        errorMessage: 'Task timed out after 1.00 seconds',
+        errorType: 'Sandbox.Timedout',
+      },
+    ])
+    expect(stdout.trim().split('\n').slice(-2)).toEqual(['0', '0'])
+    const reports = stderr
+      .split('\n')
+      .filter((line) => line.startsWith('REPORT'))
+    expect(reports).toHaveLength(3)
+    for (const report of reports.slice(1)) {
+      expect(report).toMatch(/\tRestore Duration: [\d.]+ ms\t$/)
+      expect(report).not.toContain('Init Duration')
+    }
+  })
+})
@@ -0,0 +1,94 @@
+/**
+ * Helpers of the tests of the Python runtime wrapper, spawned as
+ * `invoke local` spawns it, with a real Python interpreter
+ */
+
+import { describe } from '@jest/globals'
+import { spawn, spawnSync } from 'child_process'
+import fs from 'fs'
+import os from 'os'
+import path from 'path'
+import { fileURLToPath } from 'url'
+
+export const wrapperPath = path.resolve(
+  path.dirname(fileURLToPath(import.meta.url)),
+  '../../../../../../../lib/plugins/aws/invoke-local/runtime-wrappers/invoke.py',
+)
+
+export const python = process.platform === 'win32' ? 'python' : 'python3'
+
+const hasPython = spawnSync(python, ['--version']).status === 0
+
+export const describeWithPython = hasPython ? describe : describe.skip
+
+export const handlerSource = `print('imported')
+
+
+def hello(event, context):
+    if event.get('fail'):
+        raise ValueError('failed')
+    return {'name': event.get('name'), 'function': context.function_name}
+`
+
+export const context = { name: 'service-dev-hello', timeout: 3 }
+
+/**
+ * Creates a service directory holding `files`, by path relative to it, with
+ * the default handler module unless given
+ */
+export const createServiceDir = (files = {}) => {
+  const serviceDir = fs.mkdtempSync(path.join(os.tmpdir(), 'sls-invoke-py-'))
+  for (const [filePath, content] of Object.entries({
+    'handler.py': handlerSource,
+    ...files,
+  })) {
+    fs.mkdirSync(path.dirname(path.join(serviceDir, filePath)), {
+      recursive: true,
+    })
+    fs.writeFileSync(path.join(serviceDir, filePath), content)
+  }
+  return serviceDir
+}
+
+export const removeServiceDir = (serviceDir) =>
+  fs.rmSync(serviceDir, { recursive: true, force: true })
+
+const getArgs = (args, { handler = 'handler', name = 'hello' }) => [
+  '-u',
+  wrapperPath,
+  handler,
+  name,
+  ...args,
+]
+
+/**
+ * Runs the wrapper to completion in `serviceDir`, writing `input` to its stdin
+ */
+export const runWrapper = (serviceDir, args, { input, ...options } = {}) =>
+  spawnSync(python, getArgs(args, options), {
+    cwd: serviceDir,
+    input,
+    encoding: 'utf8',
+  })
+
+/**
+ * Spawns the wrapper in `serviceDir`, for modes run until stopped
+ */
+export const spawnWrapper = (serviceDir, args, options = {}) => {
+  const child = spawn(python, getArgs(args, options), { cwd: serviceDir })
+  child.stdout.setEncoding('utf8')
+  child.stderr.setEncoding('utf8')
+  return child
+}
+
+/**
+ * Event of a single invocation, as written to the stdin of the wrapper
+ */
+export const invocation = (event, invocationContext = context) =>
+  JSON.stringify({ event, context: invocationContext })
+
+export const parseLines = (output) =>
+  output
+    .split('\n')
+    .filter((line) => line.startsWith('{'))
+    .map((line) => JSON.parse(line))
@@ -0,0 +1,53 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import {
+  createServiceDir,
+  describeWithPython,
+  invocation,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+describeWithPython('invoke.py', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  beforeEach(() => {
+    serviceDir = createServiceDir()
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('invokes the handler with a single event', () => {
+    const { status, stdout } = runWrapper(serviceDir, [], {
+      input: invocation({ name: 'a' }),
+    })
+
+    expect(status).toBe(0)
+    expect(JSON.parse(stdout.slice(stdout.indexOf('{')))).toEqual({
+      name: 'a',
+      function: 'service-dev-hello',
+    })
+  })
+
+  test('exits with the error of the handler', () => {
+    const { status, stdout, stderr } = runWrapper(serviceDir, [], {
+      input: invocation({ fail: true }),
+    })
+
+    expect(status).toBe(1)
+    expect(stdout).toBe('imported\n')
+    expect(stderr).toContain('ValueError: failed')
+  })
+
+  test('rejects options of other modes', () => {
+    const { status, stderr } = runWrapper(serviceDir, ['--reload'], {
+      input: invocation({}),
+    })
+
+    expect(status).toBe(2)
+    expect(stderr).toContain('--reload can only be used with --warm')
+  })
+})
@@ -0,0 +1,197 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import { spawnSync } from 'child_process'
+import fs from 'fs'
+import path from 'path'
+import {
+  context,
+  createServiceDir,
+  describeWithPython,
+  invocation,
+  python,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+// Imports a package which is used by the handler, and one which is not
+const importerSource = `import lazypkg
+import usedpkg.helpers
+
+
+def hello(event, context):
+    return usedpkg.helpers.double(2)
+`
+
+// Keeps the CPU busy in a function called by the handler
+const busySource = `import time
+
+
+def spin(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def hello(event, context):
+    spin(0.2)
+`
+
+describeWithPython('invoke.py profiling', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({
+      'events.jsonl': '{"name": "a"}\n',
+      'importer.py': importerSource,
+      'busy.py': busySource,
+      'usedpkg/__init__.py': 'import time\n\ntime.sleep(0.05)\n',
+      'usedpkg/helpers.py': 'def double(value):\n    return value * 2\n',
+      'lazypkg/__init__.py': 'def unused():\n    pass\n',
+    })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('exits once the CPU profile of replayed events is written', () => {
+    const { status } = runWrapper(serviceDir, [
+      '--replay',
+      'events.jsonl',
+      '--context',
+      JSON.stringify(context),
+      '--cpu-profile',
+      'profiles',
+      '--profile-format',
+      'collapsed',
+    ])
+
+    expect(status).toBe(0)
+    expect(
+      fs.existsSync(path.join(serviceDir, 'profiles', 'profile.collapsed.txt')),
+    ).toBe(true)
+  })
+
+  test('profiles the import of the handler', () => {
+    const { status, stdout, stderr } = runWrapper(
+      serviceDir,
+      ['--profile-imports', 'profiles/imports.trace.json'],
+      { handler: 'importer', input: invocation({}) },
+    )
+
+    expect(status).toBe(0)
+    expect(stdout.trim()).toBe('4')
+    expect(stderr).toContain('Import time of 4 modules (ms):')
+    // Modules are listed by self time, nested under the import of the handler
+    const [slowest] = stderr.split('\n').slice(2, 3)
+    expect(slowest).toMatch(/^ +[\d.]+ +[\d.]+ {4,}usedpkg$/)
+    expect(stderr).toMatch(/^ +[\d.]+ +[\d.]+ {2}importer$/m)
+    const unused = stderr.slice(stderr.indexOf('candidates for lazy imports'))
+    expect(unused).toContain('lazypkg')
+    expect(unused).not.toContain('usedpkg')
+
+    const trace = JSON.parse(
+      fs.readFileSync(
+        path.join(serviceDir, 'profiles', 'imports.trace.json'),
+        'utf8',
+      ),
+    )
+    expect(trace.traceEvents.map(({ name }) => name).sort()).toEqual([
+      'importer',
+      'lazypkg',
+      'usedpkg',
+      'usedpkg.helpers',
+    ])
+    const usedpkg = trace.traceEvents.find(({ name }) => name === 'usedpkg')
+    expect(usedpkg).toMatchObject({ cat: 'import', ph: 'X' })
+    expect(usedpkg.dur).toBeGreaterThanOrEqual(50_000)
+  })
+
+  const profile = (format, args = []) =>
+    runWrapper(
+      serviceDir,
+      [
+        '--replay',
+        'events.jsonl',
+        '--context',
+        JSON.stringify(context),
+        '--cpu-profile',
+        'profiles',
+        '--profile-format',
+        format,
+        ...args,
+      ],
+      { handler: 'busy' },
+    )
+
+  test('samples the stacks of handler calls only', () => {
+    const { status, stderr } = profile('collapsed')
+
+    expect(status).toBe(0)
+    expect(stderr).toContain('CPU profile written to profiles')
+    const stacks = fs
+      .readFileSync(
+        path.join(serviceDir, 'profiles', 'profile.collapsed.txt'),
+        'utf8',
+      )
+      .trim()
+      .split('\n')
+      .map((line) => line.split(' ('))
+    // Stacks start at the handler, leaving out the frames of the wrapper
+    expect(stacks.length).toBeGreaterThan(0)
+    for (const [root] of stacks) expect(root).toBe('hello')
+    expect(stacks.some((frames) => frames[1].endsWith(';spin'))).toBe(true)
+    expect(fs.readdirSync(path.join(serviceDir, 'profiles'))).toEqual([
+      'profile.collapsed.txt',
+    ])
+  })
+
+  test('merges the profiles of all workers', () => {
+    fs.writeFileSync(path.join(serviceDir, 'events.jsonl'), '{}\n{}\n{}\n')
+
+    const { status } = profile('speedscope', ['--workers', '2'])
+
+    expect(status).toBe(0)
+    expect(fs.readdirSync(path.join(serviceDir, 'profiles'))).toEqual([
+      'profile.speedscope.json',
+    ])
+    const {
+      shared: { frames },
+      profiles: [sampled],
+    } = JSON.parse(
+      fs.readFileSync(
+        path.join(serviceDir, 'profiles', 'profile.speedscope.json'),
+        'utf8',
+      ),
+    )
+    expect(frames).toContainEqual({
+      name: 'spin',
+      file: path.join(serviceDir, 'busy.py'),
+      line: 4,
+    })
+    expect(sampled).toMatchObject({ type: 'sampled', unit: 'microseconds' })
+    expect(sampled.samples).toHaveLength(sampled.weights.length)
+    // Three calls keeping the CPU busy for 200 ms each
+    const total = sampled.weights.reduce((sum, weight) => sum + weight, 0)
+    expect(total).toBeGreaterThan(300_000)
+    expect(total).toBe(sampled.endValue)
+  })
+
+  test('writes the profile of handler calls as pstats', () => {
+    const { status } = profile('pstats')
+
+    expect(status).toBe(0)
+    const { stdout } = spawnSync(
+      python,
+      [
+        '-c',
+        'import pstats, sys; print(sorted(name for _, _, name in pstats.Stats(sys.argv[1]).stats))',
+        path.join('profiles', 'profile.pstats'),
+      ],
+      { cwd: serviceDir, encoding: 'utf8' },
+    )
+    expect(stdout).toContain("'hello'")
+    expect(stdout).toContain("'spin'")
+  })
+})
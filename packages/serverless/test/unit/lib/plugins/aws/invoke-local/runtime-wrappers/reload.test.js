@@ -0,0 +1,90 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import fs from 'fs'
+import path from 'path'
+import readline from 'readline'
+import {
+  createServiceDir,
+  describeWithPython,
+  invocation,
+  removeServiceDir,
+  spawnWrapper,
+} from './given.js'
+
+const greeterSource = `from greeting import GREETING
+
+calls = []
+
+
+def hello(event, context):
+    calls.append(event)
+    return {'greeting': GREETING, 'calls': len(calls)}
+`
+
+describeWithPython('invoke.py --warm --reload', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+  let worker
+  let results
+
+  // Sends a request to the warm worker, resolving its result
+  const request = async (event) => {
+    worker.stdin.write(`${invocation(event)}\n`)
+    const { value } = await results.next()
+    return JSON.parse(value)
+  }
+
+  const writeGreeting = (greeting) =>
+    fs.writeFileSync(
+      path.join(serviceDir, 'greeting.py'),
+      `GREETING = ${JSON.stringify(greeting)}\n`,
+    )
+
+  beforeEach(async () => {
+    serviceDir = createServiceDir({ 'greeter.py': greeterSource })
+    writeGreeting('hello')
+    worker = spawnWrapper(
+      serviceDir,
+      ['--warm', '--reload', '--notify-ready'],
+      { handler: 'greeter' },
+    )
+    results = readline
+      .createInterface({ input: worker.stdout })
+      [Symbol.asyncIterator]()
+    // Handler imported
+    await results.next()
+  })
+
+  afterEach(() => {
+    worker.kill()
+    removeServiceDir(serviceDir)
+  })
+
+  test('reloads changed modules along with the ones depending on them', async () => {
+    let stderr = ''
+    worker.stderr.on('data', (data) => {
+      stderr += data
+    })
+    expect(await request({})).toEqual({ greeting: 'hello', calls: 1 })
+    expect(await request({})).toEqual({ greeting: 'hello', calls: 2 })
+
+    writeGreeting('good morning')
+    // The handler module is reloaded as well, starting over
+    expect(await request({})).toEqual({ greeting: 'good morning', calls: 1 })
+    expect(stderr).toMatch(/Reloaded greeting, greeter in [\d.]+ ms/)
+  })
+
+  test('keeps the previous modules when a change cannot be loaded', async () => {
+    let stderr = ''
+    worker.stderr.on('data', (data) => {
+      stderr += data
+    })
+    fs.writeFileSync(path.join(serviceDir, 'greeting.py'), 'GREETING = (\n')
+
+    expect(await request({})).toEqual({ greeting: 'hello', calls: 1 })
+    expect(stderr).toContain('Could not reload greeting: ')
+
+    writeGreeting('hi')
+    expect(await request({})).toEqual({ greeting: 'hi', calls: 1 })
+  })
+})
@@ -0,0 +1,168 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import fs from 'fs'
+import path from 'path'
+import {
+  context,
+  createServiceDir,
+  describeWithPython,
+  parseLines,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+// Exits the process on events asking to, and sleeps to leave time for other
+// workers to pick events up
+const poolSource = `import os
+import time
+
+
+def hello(event, context):
+    if event.get('exit'):
+        os._exit(3)
+    time.sleep(0.1)
+    return {'name': event['name'], 'pid': os.getpid()}
+`
+
+describeWithPython('invoke.py --replay', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({
+      'pool.py': poolSource,
+      'events.jsonl': '{"name": "a"}\n{"fail": true}\n{"name": "b"}\n',
+    })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('replays events with several workers', () => {
+    const { status, stderr } = runWrapper(serviceDir, [
+      '--replay',
+      'events.jsonl',
+      '--context',
+      JSON.stringify(context),
+      '--workers',
+      '2',
+      '--output',
+      'results.jsonl',
+    ])
+
+    expect(status).toBe(0)
+    expect(stderr).toContain('Replayed 3 events (1 errors)')
+    expect(
+      parseLines(
+        fs.readFileSync(path.join(serviceDir, 'results.jsonl'), 'utf8'),
+      ),
+    ).toEqual([
+      { name: 'a', function: 'service-dev-hello' },
+      expect.objectContaining({ errorMessage: 'failed' }),
+      { name: 'b', function: 'service-dev-hello' },
+    ])
+  })
+
+  test('writes a result per event in order, skipping blank lines', () => {
+    fs.writeFileSync(
+      path.join(serviceDir, 'events.jsonl'),
+      '{"name": "a"}\nnot json\n\n{"name": "b"}\n',
+    )
+
+    const { status, stdout, stderr } = runWrapper(serviceDir, [
+      '--replay',
+      'events.jsonl',
+      '--context',
+      JSON.stringify(context),
+    ])
+
+    expect(status).toBe(0)
+    expect(parseLines(stdout)).toEqual([
+      { name: 'a', function: 'service-dev-hello' },
+      expect.objectContaining({ errorType: 'JSONDecodeError' }),
+      { name: 'b', function: 'service-dev-hello' },
+    ])
+    expect(stderr).toMatch(
+      /Replayed 3 events \(1 errors\) in [\d.]+ s with 1 worker\(s\), [\d.]+ events\/s/,
+    )
+    expect(stderr).toMatch(
+      /Duration p50: [\d.]+ ms, p90: [\d.]+ ms, p99: [\d.]+ ms, max: [\d.]+ ms/,
+    )
+  })
+
+  test('tags results with the index of their event when unordered', () => {
+    const { status, stdout } = runWrapper(serviceDir, [
+      '--replay',
+      'events.jsonl',
+      '--context',
+      JSON.stringify(context),
+      '--unordered',
+    ])
+
+    expect(status).toBe(0)
+    const results = parseLines(stdout).sort((a, b) => a.index - b.index)
+    expect(results).toEqual([
+      { index: 0, result: { name: 'a', function: 'service-dev-hello' } },
+      {
+        index: 1,
+        result: expect.objectContaining({ errorMessage: 'failed' }),
+      },
+      { index: 2, result: { name: 'b', function: 'service-dev-hello' } },
+    ])
+  })
+
+  const replayInPool = (events, workers) => {
+    fs.writeFileSync(
+      path.join(serviceDir, 'events.jsonl'),
+      events.map((event) => JSON.stringify(event)).join('\n'),
+    )
+    return runWrapper(
+      serviceDir,
+      [
+        '--replay',
+        'events.jsonl',
+        '--context',
+        JSON.stringify(context),
+        '--workers',
+        String(workers),
+        '--chunk-size',
+        '1',
+      ],
+      { handler: 'pool' },
+    )
+  }
+
+  test('spreads events across workers', () => {
+    const { status, stdout } = replayInPool(
+      ['a', 'b', 'c', 'd'].map((name) => ({ name })),
+      2,
+    )
+
+    expect(status).toBe(0)
+    const results = parseLines(stdout)
+    expect(results.map(({ name }) => name)).toEqual(['a', 'b', 'c', 'd'])
+    expect(new Set(results.map(({ pid }) => pid)).size).toBe(2)
+  })
+
+  test('replaces workers which exit, failing their event', () => {
+    // Both workers exit on their first event
+    const { status, stdout, stderr } = replayInPool(
+      [{ exit: true }, { exit: true }, { name: 'a' }, { name: 'b' }],
+      2,
+    )
+
+    expect(status).toBe(0)
+    expect(stderr).toContain('Replayed 4 events (2 errors)')
+    const exitError = {
+      errorMessage: 'Runtime exited with error: exit status 3',
+      errorType: 'Runtime.ExitError',
+    }
+    expect(parseLines(stdout)).toEqual([
+      exitError,
+      exitError,
+      { name: 'a', pid: expect.any(Number) },
+      { name: 'b', pid: expect.any(Number) },
+    ])
+  })
+})
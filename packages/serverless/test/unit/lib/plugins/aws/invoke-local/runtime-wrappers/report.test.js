@@ -0,0 +1,84 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import {
+  context,
+  createServiceDir,
+  describeWithPython,
+  parseLines,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+describeWithPython('invoke.py --report', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  const replay = (format) =>
+    runWrapper(serviceDir, [
+      '--replay',
+      'events.jsonl',
+      '--context',
+      JSON.stringify({ ...context, memorySize: 256 }),
+      '--report',
+      format,
+    ])
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({
+      'events.jsonl': '{"name": "a"}\n{"fail": true}\n',
+    })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('writes START, END and REPORT lines for every invocation', () => {
+    const { status, stderr } = replay('text')
+
+    expect(status).toBe(0)
+    const lines = stderr.split('\n')
+    const starts = lines.filter((line) => line.startsWith('START'))
+    const reports = lines.filter((line) => line.startsWith('REPORT'))
+    expect(starts).toHaveLength(2)
+    expect(starts[0]).toMatch(/^START RequestId: [\w-]+ Version: \$LATEST$/)
+    expect(lines.filter((line) => line.startsWith('END'))).toHaveLength(2)
+    expect(reports).toHaveLength(2)
+    expect(reports[0]).toMatch(
+      /^REPORT RequestId: [\w-]+\tDuration: [\d.]+ ms\tBilled Duration: \d+ ms\tMemory Size: 256 MB\tMax Memory Used: \d+ MB\tInit Duration: [\d.]+ ms\t$/,
+    )
+    // As with Lambda, only the first invocation reports the init duration
+    expect(reports[1]).not.toContain('Init Duration')
+  })
+
+  test('writes JSON platform events with the status of invocations', () => {
+    const { status, stderr } = replay('json')
+
+    expect(status).toBe(0)
+    const events = parseLines(stderr)
+    expect(events.map(({ type }) => type)).toEqual([
+      'platform.start',
+      'platform.report',
+      'platform.start',
+      'platform.report',
+    ])
+    const [start, report, , failedReport] = events
+    expect(start.record).toEqual({
+      requestId: expect.any(String),
+      version: '$LATEST',
+    })
+    expect(report.record).toEqual({
+      requestId: start.record.requestId,
+      status: 'success',
+      metrics: {
+        durationMs: expect.any(Number),
+        billedDurationMs: expect.any(Number),
+        memorySizeMB: 256,
+        maxMemoryUsedMB: expect.any(Number),
+        initDurationMs: expect.any(Number),
+      },
+    })
+    expect(failedReport.record.status).toBe('error')
+    expect(failedReport.record.metrics).not.toHaveProperty('initDurationMs')
+  })
+})
@@ -0,0 +1,111 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import {
+  context,
+  createServiceDir,
+  describeWithPython,
+  removeServiceDir,
+  spawnWrapper,
+} from './given.js'
+
+// Sleeps for the number of seconds given by the event
+const slowSource = `import time
+
+
+def hello(event, context):
+    time.sleep(event.get('sleep', 0))
+    if event.get('fail'):
+        raise ValueError('failed')
+    return {'function': context.function_name}
+`
+
+describeWithPython('invoke.py --serve', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+  let server
+  let stderr
+
+  // Starts the server on a free port, resolving its address once listening
+  const serve = (args) => {
+    server = spawnWrapper(
+      serviceDir,
+      ['--serve', '127.0.0.1:0', '--context', JSON.stringify(context), ...args],
+      { handler: 'slow' },
+    )
+    stderr = ''
+    return new Promise((resolve, reject) => {
+      server.stderr.on('data', (data) => {
+        stderr += data
+        const address = stderr.match(/listening on (http:\/\/[\d.:]+)/)
+        if (address) resolve(address[1])
+      })
+      server.on('close', () => reject(new Error(stderr)))
+    })
+  }
+
+  // Stops the server, resolving what it wrote to stderr
+  const stop = () =>
+    new Promise((resolve) => {
+      server.on('close', () => resolve(stderr))
+      server.kill('SIGTERM')
+    })
+
+  const invoke = (address, event) =>
+    fetch(`${address}/2015-03-31/functions/service-dev-hello/invocations`, {
+      method: 'POST',
+      body: JSON.stringify(event),
+    })
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({ 'slow.py': slowSource })
+  })
+
+  afterEach(() => {
+    if (server.exitCode === null && !server.signalCode) {
+      server.kill('SIGKILL')
+    }
+    removeServiceDir(serviceDir)
+  })
+
+  test('serves invocations and writes a summary once stopped', async () => {
+    const address = await serve([])
+
+    const response = await invoke(address, {})
+    expect(response.status).toBe(200)
+    expect(await response.json()).toEqual({ function: 'service-dev-hello' })
+
+    const failed = await invoke(address, { fail: true })
+    expect(failed.status).toBe(200)
+    expect(failed.headers.get('x-amz-function-error')).toBe('Unhandled')
+    expect(await failed.json()).toMatchObject({ errorMessage: 'failed' })
+
+    expect(await stop()).toMatch(
+      /Served 2 invocations \(1 errors, 0 throttled\) in [\d.]+ s with 1 worker\(s\)/,
+    )
+    expect(stderr).toMatch(/Queueing delay p50: [\d.]+ ms/)
+    expect(stderr).toMatch(/Handler time p50: [\d.]+ ms/)
+  })
+
+  test('throttles invocations beyond the workers and the queue', async () => {
+    const address = await serve(['--workers', '1', '--max-queue', '1'])
+
+    const running = invoke(address, { sleep: 1 })
+    // Sent once the first one runs, so that they wait in the queue or are
+    // throttled rather than run
+    await new Promise((resolve) => setTimeout(resolve, 300))
+    const queued = invoke(address, {})
+    await new Promise((resolve) => setTimeout(resolve, 100))
+    const throttled = await invoke(address, {})
+
+    expect(throttled.status).toBe(429)
+    expect(throttled.headers.get('x-amzn-errortype')).toBe(
+      'TooManyRequestsException',
+    )
+    expect((await running).status).toBe(200)
+    expect((await queued).status).toBe(200)
+
+    expect(await stop()).toContain(
+      'Served 2 invocations (0 errors, 1 throttled)',
+    )
+  })
+})
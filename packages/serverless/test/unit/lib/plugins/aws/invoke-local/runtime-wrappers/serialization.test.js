@@ -0,0 +1,84 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import {
+  createServiceDir,
+  describeWithPython,
+  invocation,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+const resultsSource = `import datetime
+import decimal
+
+
+def hello(event, context):
+    if event.get('unserializable'):
+        return {'value': object()}
+    return {
+        'count': decimal.Decimal('3'),
+        'price': decimal.Decimal('1.5'),
+        'date': datetime.date(2024, 1, 2),
+        'tags': {'a'},
+        'data': b'hi',
+    }
+`
+
+describeWithPython('invoke.py result serialization', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  const invoke = (event, args) =>
+    runWrapper(serviceDir, args, {
+      handler: 'results',
+      input: invocation(event),
+    })
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({ 'results.py': resultsSource })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('writes values json does not handle as Lambda does', () => {
+    const { status, stdout } = invoke({}, [])
+
+    expect(status).toBe(0)
+    expect(JSON.parse(stdout)).toEqual({
+      count: 3,
+      price: 1.5,
+      date: '2024-01-02',
+      tags: ['a'],
+      data: 'aGk=',
+    })
+    expect(stdout).toContain('\n    "count": 3')
+  })
+
+  test('writes compact results on a single line with their size', () => {
+    const { status, stdout, stderr } = invoke({}, ['--compact'])
+
+    expect(status).toBe(0)
+    expect(stdout).toBe(
+      '{"count":3,"price":1.5,"date":"2024-01-02","tags":["a"],"data":"aGk="}',
+    )
+    expect(stderr).toContain(
+      `Serialized the result (${stdout.length} characters)`,
+    )
+  })
+
+  test('writes a marshal error for results which cannot be serialized', () => {
+    for (const args of [[], ['--compact']]) {
+      const { status, stdout } = invoke({ unserializable: true }, args)
+
+      expect(status).toBe(1)
+      expect(JSON.parse(stdout)).toEqual({
+        errorMessage:
+          'Unable to marshal response: Object of type object is not JSON serializable',
+        errorType: 'Runtime.MarshalError',
+        stackTrace: [],
+      })
+    }
+  })
+})
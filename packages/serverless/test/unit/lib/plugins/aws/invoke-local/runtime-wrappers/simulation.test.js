@@ -0,0 +1,138 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import fs from 'fs'
+import path from 'path'
+import {
+  context,
+  createServiceDir,
+  describeWithPython,
+  parseLines,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+const handlerSource = `def hello(event, context):
+    return {'n': event['n']}
+`
+
+const throttled = {
+  errorMessage: 'Rate Exceeded.',
+  errorType: 'TooManyRequestsException',
+}
+
+describeWithPython('invoke.py --simulate', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({ 'handler.py': handlerSource })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  // Arrivals are seconds apart, far longer than the handler runs for
+  const simulate = (times, args) => {
+    fs.writeFileSync(
+      path.join(serviceDir, 'trace.jsonl'),
+      times
+        .map((time, n) => JSON.stringify({ time, event: { n } }))
+        .join('\n'),
+    )
+    const { status, stdout, stderr } = runWrapper(serviceDir, [
+      '--simulate',
+      'trace.jsonl',
+      '--context',
+      JSON.stringify(context),
+      ...args,
+    ])
+    expect(status).toBe(0)
+    return { results: parseLines(stdout), stderr }
+  }
+
+  test('throttles arrivals beyond the concurrency limit', () => {
+    const { results, stderr } = simulate([0, 0, 10], ['--concurrency', '1'])
+
+    expect(results).toEqual([{ n: 0 }, throttled, { n: 2 }])
+    expect(stderr).toContain('Simulated 3 invocations over 10.00 s')
+    expect(stderr).toContain(
+      'Cold starts: 1, warm starts: 1, throttles: 1, peak concurrency: 1',
+    )
+  })
+
+  test('queues arrivals beyond the concurrency limit', () => {
+    const { results, stderr } = simulate(
+      [0, 0, 0],
+      ['--concurrency', '1', '--max-queue', '1'],
+    )
+
+    expect(results).toEqual([{ n: 0 }, { n: 1 }, throttled])
+    expect(stderr).toContain(
+      'Cold starts: 1, warm starts: 1, throttles: 1, peak concurrency: 1',
+    )
+  })
+
+  test('creates environments on demand up to the concurrency limit', () => {
+    const { results, stderr } = simulate(
+      [0, 0, 0, 10, 10],
+      ['--concurrency', '3'],
+    )
+
+    expect(results).toEqual([0, 1, 2, 3, 4].map((n) => ({ n })))
+    expect(stderr).toContain(
+      'Cold starts: 3, warm starts: 2, throttles: 0, peak concurrency: 3',
+    )
+  })
+
+  test('uses provisioned environments before creating others', () => {
+    const { stderr } = simulate(
+      [0, 0, 10],
+      ['--concurrency', '2', '--provisioned', '1'],
+    )
+
+    expect(stderr).toContain('(1 provisioned)')
+    expect(stderr).toContain(
+      'Cold starts: 1, warm starts: 2, throttles: 0, peak concurrency: 2',
+    )
+    expect(stderr).toMatch(/Provisioned init duration: [\d.]+ ms/)
+  })
+
+  test('removes environments idle for longer than their expiry', () => {
+    const { stderr } = simulate(
+      [0, 1, 100],
+      ['--concurrency', '1', '--idle-expiry', '10'],
+    )
+
+    expect(stderr).toContain(
+      'Cold starts: 2, warm starts: 1, throttles: 0, peak concurrency: 1',
+    )
+  })
+
+  test('keeps provisioned environments past their expiry', () => {
+    const { stderr } = simulate(
+      [0, 100],
+      ['--concurrency', '1', '--provisioned', '1', '--idle-expiry', '10'],
+    )
+
+    expect(stderr).toContain(
+      'Cold starts: 0, warm starts: 2, throttles: 0, peak concurrency: 1',
+    )
+  })
+
+  test('rejects more provisioned environments than the concurrency', () => {
+    const { status, stderr } = runWrapper(serviceDir, [
+      '--simulate',
+      'trace.jsonl',
+      '--concurrency',
+      '1',
+      '--provisioned',
+      '2',
+    ])
+
+    expect(status).toBe(2)
+    expect(stderr).toContain(
+      '--provisioned must be between 0 and --concurrency',
+    )
+  })
+})
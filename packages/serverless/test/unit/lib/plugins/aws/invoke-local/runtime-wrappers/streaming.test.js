@@ -0,0 +1,102 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import {
+  createServiceDir,
+  describeWithPython,
+  invocation,
+  removeServiceDir,
+  runWrapper,
+  spawnWrapper,
+} from './given.js'
+
+const streamingSource = `import asyncio
+import time
+
+
+def generator(event, context):
+    print('printed')
+    yield 'text,'
+    yield b'bytes,'
+    yield {'json': True}
+
+
+def writer(event, context):
+    context.response_stream.write('written,')
+    context.response_stream.write(b'chunks')
+
+
+async def asynchronous(event, context):
+    for chunk in ('a', 'b'):
+        await asyncio.sleep(0)
+        yield chunk
+
+
+def slow(event, context):
+    yield 'first'
+    time.sleep(1)
+    yield 'last'
+`
+
+describeWithPython('invoke.py --stream', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  const stream = (name) =>
+    runWrapper(serviceDir, ['--stream'], {
+      handler: 'streaming',
+      name,
+      input: invocation({}),
+    })
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({ 'streaming.py': streamingSource })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('streams the items of generators, keeping prints out', () => {
+    const { status, stdout, stderr } = stream('generator')
+
+    expect(status).toBe(0)
+    expect(stdout).toBe('text,bytes,{"json": true}')
+    expect(stderr).toContain('printed')
+    expect(stderr).toMatch(
+      /Streamed 25 bytes in 3 chunks, time to first chunk: [\d.]+ ms/,
+    )
+  })
+
+  test('streams what handlers write to the response stream', () => {
+    const { status, stdout, stderr } = stream('writer')
+
+    expect(status).toBe(0)
+    expect(stdout).toBe('written,chunks')
+    expect(stderr).toContain('Streamed 14 bytes in 2 chunks')
+  })
+
+  test('streams the items of async generators', () => {
+    const { status, stdout } = stream('asynchronous')
+
+    expect(status).toBe(0)
+    expect(stdout).toBe('ab')
+  })
+
+  test('writes chunks as soon as they are produced', async () => {
+    const child = spawnWrapper(serviceDir, ['--stream'], {
+      handler: 'streaming',
+      name: 'slow',
+    })
+    child.stdin.end(invocation({}))
+
+    const firstChunk = await new Promise((resolve) =>
+      child.stdout.once('data', (chunk) => resolve({ chunk, at: Date.now() })),
+    )
+    const exitedAt = await new Promise((resolve) =>
+      child.on('close', () => resolve(Date.now())),
+    )
+
+    expect(firstChunk.chunk).toBe('first')
+    expect(exitedAt - firstChunk.at).toBeGreaterThanOrEqual(900)
+  })
+})
@@ -0,0 +1,58 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import {
+  createServiceDir,
+  describeWithPython,
+  invocation,
+  parseLines,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+describeWithPython('invoke.py --warm', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  beforeEach(() => {
+    serviceDir = createServiceDir()
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('writes one result per request', () => {
+    const { status, stdout, stderr } = runWrapper(serviceDir, ['--warm'], {
+      input: [
+        invocation({ name: 'a' }),
+        '[1]',
+        invocation({ fail: true }),
+        '',
+      ].join('\n'),
+    })
+
+    expect(status).toBe(0)
+    // Output of the handler module on import is kept out of the results
+    expect(stderr).toContain('imported')
+    expect(stdout).not.toContain('imported')
+    expect(stdout.trim().split('\n')).toHaveLength(3)
+    const [result, formatError, handlerError] = parseLines(stdout)
+    expect(result).toEqual({ name: 'a', function: 'service-dev-hello' })
+    expect(formatError).toMatchObject({ errorType: 'ValueError' })
+    expect(handlerError).toMatchObject({
+      errorMessage: 'failed',
+      errorType: 'ValueError',
+    })
+  })
+
+  test('notifies that the handler is imported before the results', () => {
+    const { status, stdout } = runWrapper(
+      serviceDir,
+      ['--warm', '--notify-ready'],
+      { input: `${invocation({ name: 'a' })}\n` },
+    )
+
+    expect(status).toBe(0)
+    expect(stdout).toBe('\n{"name": "a", "function": "service-dev-hello"}\n')
+  })
+})
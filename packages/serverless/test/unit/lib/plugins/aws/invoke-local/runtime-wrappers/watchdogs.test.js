@@ -0,0 +1,151 @@
+import { jest, beforeEach, afterEach, test, expect } from '@jest/globals'
+import {
+  context,
+  createServiceDir,
+  describeWithPython,
+  invocation,
+  parseLines,
+  removeServiceDir,
+  runWrapper,
+} from './given.js'
+
+// Allocates 10 MB at a time, up to the size given by the event
+const allocateSource = `def hello(event, context):
+    data = []
+    while len(data) < event['size'] / 10:
+        data.append(bytearray(10 * 1024 * 1024))
+    return len(data)
+`
+
+// Sleeps for the number of seconds given by the event, in a nested function
+const slowSource = `import time
+
+
+def wait(seconds):
+    time.sleep(seconds)
+
+
+def hello(event, context):
+    wait(event['sleep'])
+    return event['sleep']
+`
+
+describeWithPython('invoke.py memory enforcement', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  const allocate = (size, args) =>
+    runWrapper(
+      serviceDir,
+      ['--enforce-memory', '--memory-limit', '128', ...args],
+      { handler: 'allocate', input: invocation({ size }) },
+    )
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({ 'allocate.py': allocateSource })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('kills the process using more than the memory size', () => {
+    const { status, stdout, stderr } = allocate(1000, [])
+
+    expect(status).toBe(137)
+    expect(stderr).toMatch(/used \d+ MB of 128 MB/)
+    expect(parseLines(stdout)).toEqual([
+      {
+        errorMessage: 'Runtime exited with error: signal: killed',
+        errorType: 'Runtime.OutOfMemory',
+      },
+    ])
+  })
+
+  test('writes the top allocation sites near the memory size', () => {
+    const { status, stderr } = allocate(1000, ['--track-allocations'])
+
+    expect(status).toBe(137)
+    expect(stderr).toContain('top allocation sites')
+    expect(stderr).toContain('allocate.py", line 4')
+  })
+
+  test('leaves invocations within the memory size alone', () => {
+    const { status, stdout } = allocate(20, [])
+
+    expect(status).toBe(0)
+    expect(stdout.trim()).toBe('2')
+  })
+})
+
+describeWithPython('invoke.py timeout enforcement', () => {
+  jest.setTimeout(60_000)
+
+  let serviceDir
+
+  beforeEach(() => {
+    serviceDir = createServiceDir({
+      'slow.py': slowSource,
+      'events.jsonl': '{"sleep": 10}\n{"sleep": 0}\n',
+    })
+  })
+
+  afterEach(() => {
+    removeServiceDir(serviceDir)
+  })
+
+  test('kills the process past the timeout with the stacks of its threads', () => {
+    const { status, stdout, stderr } = runWrapper(
+      serviceDir,
+      ['--enforce-timeout'],
+      {
+        handler: 'slow',
+        input: invocation({ sleep: 10 }, { ...context, timeout: 1 }),
+      },
+    )
+
+    expect(status).toBe(124)
+    expect(parseLines(stdout)).toEqual([
+      {
+        errorMessage: 'Task timed out after 1.00 seconds',
+        errorType: 'Sandbox.Timedout',
+      },
+    ])
+    expect(stderr).toContain('Stack of thread MainThread')
+    // Stacks start at the handler, and end where it was running
+    const stack = stderr.slice(stderr.indexOf('Stack of thread MainThread'))
+    expect(stack.split('\n').slice(1, 5)).toEqual([
+      expect.stringMatching(/slow\.py", line 9, in hello$/),
+      "    wait(event['sleep'])",
+      expect.stringMatching(/slow\.py", line 5, in wait$/),
+      '    time.sleep(seconds)',
+    ])
+    expect(stderr).toMatch(/Task timed out after 1\.\d\d seconds/)
+  })
+
+  test('fails replayed events past the timeout, and runs the next ones', () => {
+    const { status, stdout } = runWrapper(
+      serviceDir,
+      [
+        '--replay',
+        'events.jsonl',
+        '--context',
+        JSON.stringify({ ...context, timeout: 1 }),
+        '--workers',
+        '2',
+        '--enforce-timeout',
+      ],
+      { handler: 'slow' },
+    )
+
+    expect(status).toBe(0)
+    expect(parseLines(stdout)).toEqual([
+      {
+        errorMessage: 'Task timed out after 1.00 seconds',
+        errorType: 'Sandbox.Timedout',
+      },
+    ])
+    expect(stdout.trim().split('\n')[1]).toBe('0')
+  })
+})
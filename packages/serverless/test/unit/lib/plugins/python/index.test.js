@@ -0,0 +1,45 @@
+import { jest, describe, afterEach, it, expect } from '@jest/globals'
+import os from 'os'
+
+const { default: ServerlessPythonRequirements } =
+  await import('../../../../../lib/plugins/python/index.js')
+
+describe('ServerlessPythonRequirements options', () => {
+  const createPlugin = (pythonRequirements) =>
+    new ServerlessPythonRequirements({
+      config: { servicePath: process.cwd() },
+      cli: {},
+      service: {
+        provider: { name: 'aws', runtime: 'python3.12' },
+        custom: { pythonRequirements },
+      },
+    })
+
+  afterEach(() => {
+    jest.restoreAllMocks()
+  })
+
+  it('installs as many requirements at a time as there are CPUs', () => {
+    jest.spyOn(os, 'cpus').mockReturnValue([{}, {}, {}])
+    expect(createPlugin({}).options.installConcurrency).toEqual(3)
+  })
+
+  it('installs requirements one at a time when no CPUs are listed', () => {
+    jest.spyOn(os, 'cpus').mockReturnValue([])
+    expect(createPlugin({}).options.installConcurrency).toEqual(1)
+  })
+
+  it('accepts the install concurrency as a string', () => {
+    expect(
+      createPlugin({ installConcurrency: '2' }).options.installConcurrency,
+    ).toEqual(2)
+  })
+
+  it('rejects install concurrencies which are not positive integers', () => {
+    for (const installConcurrency of [0, -1, 1.5, 'many']) {
+      expect(() => createPlugin({ installConcurrency }).options).toThrow(
+        'installConcurrency must be a positive integer',
+      )
+    }
+  })
+})
@@ -0,0 +1,91 @@
+import { describe, beforeEach, afterEach, it, expect } from '@jest/globals'
+import fse from 'fs-extra'
+import os from 'os'
+import path from 'path'
+
+const { getDistributionKey, linkDistributions } =
+  await import('../../../../../../lib/plugins/python/lib/distributions.js')
+
+describe('getDistributionKey', () => {
+  it('keys wheels by name, version and tags', () => {
+    expect(
+      getDistributionKey(
+        'NumPy',
+        '2.1.0',
+        'https://files.pythonhosted.org/packages/ab/cd/numpy-2.1.0-cp312-cp312-manylinux_2_17_x86_64.manylinux2014_x86_64.whl#sha256=abc',
+      ),
+    ).toEqual(
+      'numpy-2.1.0-cp312-cp312-manylinux_2_17_x86_64.manylinux2014_x86_64',
+    )
+  })
+
+  it('normalizes names', () => {
+    expect(
+      getDistributionKey(
+        'typing.Extensions',
+        '4.15.0',
+        'https://example.com/typing_extensions-4.15.0-py3-none-any.whl',
+      ),
+    ).toEqual('typing_extensions-4.15.0-py3-none-any')
+  })
+
+  it('leaves out build tags', () => {
+    expect(
+      getDistributionKey(
+        'pkg',
+        '1.0',
+        'file:///wheels/pkg-1.0-1-py3-none-any.whl',
+      ),
+    ).toEqual('pkg-1.0-py3-none-any')
+  })
+
+  it('does not key source distributions', () => {
+    expect(
+      getDistributionKey('pkg', '1.0', 'https://example.com/pkg-1.0.tar.gz'),
+    ).toBeNull()
+  })
+})
+
+describe('linkDistributions', () => {
+  const key = 'pkg-1.0-cp312-cp312-manylinux_2_17_x86_64'
+  let tmpDir
+  let options
+  let cachedFile
+
+  beforeEach(() => {
+    tmpDir = fse.mkdtempSync(path.join(os.tmpdir(), 'sls-py-dist-'))
+    options = { cacheLocation: path.join(tmpDir, 'cache') }
+    cachedFile = path.join(
+      options.cacheLocation,
+      'distributions.slspyc',
+      key,
+      'pkg/_native.so',
+    )
+    fse.outputFileSync(cachedFile, 'unstripped')
+  })
+
+  afterEach(() => {
+    fse.removeSync(tmpDir)
+  })
+
+  it('links the cached distributions into the target folder', () => {
+    const targetFolder = path.join(tmpDir, 'target')
+    linkDistributions([{ key }], targetFolder, options, false)
+    expect(
+      fse.statSync(path.join(targetFolder, 'pkg/_native.so')).ino,
+    ).toEqual(fse.statSync(cachedFile).ino)
+  })
+
+  it('copies the cached distributions when they are modified once installed', () => {
+    const targetFolder = path.join(tmpDir, 'target')
+    linkDistributions([{ key }], targetFolder, options, true)
+    const targetFile = path.join(targetFolder, 'pkg/_native.so')
+    expect(fse.statSync(targetFile).ino).not.toEqual(
+      fse.statSync(cachedFile).ino,
+    )
+    // As strip does, writing the file in place
+    fse.writeFileSync(targetFile, 'stripped')
+    expect(fse.readFileSync(cachedFile, 'utf-8')).toEqual('unstripped')
+    expect(fse.readFileSync(targetFile, 'utf-8')).toEqual('stripped')
+  })
+})
@@ -0,0 +1,122 @@
+import { describe, beforeEach, afterEach, it, expect } from '@jest/globals'
+import fse from 'fs-extra'
+import JSZip from 'jszip'
+import os from 'os'
+import path from 'path'
+
+const { getRequirementsFiles, injectRequirements } =
+  await import('../../../../../../lib/plugins/python/lib/inject.js')
+
+describe('getRequirementsFiles', () => {
+  let requirementsPath
+
+  const injectedFiles = (options) =>
+    getRequirementsFiles(requirementsPath, '.', options)
+      .map(([, relativeFile]) => relativeFile)
+      .sort()
+
+  beforeEach(() => {
+    requirementsPath = fse.mkdtempSync(path.join(os.tmpdir(), 'sls-py-req-'))
+    for (const file of [
+      'six.py',
+      '__pycache__/six.cpython-312.pyc',
+      'idna/__init__.py',
+      'idna/__pycache__/__init__.cpython-312.pyc',
+      'boto3/__init__.py',
+      '__pycache__/boto3_stubs.cpython-312.pyc',
+    ]) {
+      fse.outputFileSync(path.join(requirementsPath, file), '')
+    }
+  })
+
+  afterEach(() => {
+    fse.removeSync(requirementsPath)
+  })
+
+  it('leaves out the bytecode of top-level modules', () => {
+    expect(injectedFiles({ noDeploy: ['boto3'] })).toEqual([
+      'idna/__init__.py',
+      'idna/__pycache__/__init__.cpython-312.pyc',
+      'six.py',
+    ])
+  })
+
+  it('keeps the bytecode of top-level modules compiled ahead of time', () => {
+    expect(
+      injectedFiles({ noDeploy: ['boto3'], compileBytecode: true }),
+    ).toEqual([
+      '__pycache__/boto3_stubs.cpython-312.pyc',
+      '__pycache__/six.cpython-312.pyc',
+      'idna/__init__.py',
+      'idna/__pycache__/__init__.cpython-312.pyc',
+      'six.py',
+    ])
+  })
+
+  it('leaves out the bytecode of top-level modules not deployed', () => {
+    expect(
+      injectedFiles({ noDeploy: ['six'], compileBytecode: true }),
+    ).toEqual([
+      '__pycache__/boto3_stubs.cpython-312.pyc',
+      'boto3/__init__.py',
+      'idna/__init__.py',
+      'idna/__pycache__/__init__.cpython-312.pyc',
+    ])
+  })
+})
+
+describe('injectRequirements', () => {
+  let tmpDir
+  let requirementsPath
+
+  const inject = async (packageName, archives) => {
+    const packageZip = new JSZip()
+    packageZip.file('handler.py', 'def handler(event, context): pass\n')
+    packageZip.file('six.py', 'outdated\n')
+    const packagePath = path.join(tmpDir, packageName)
+    fse.writeFileSync(
+      packagePath,
+      await packageZip.generateAsync({
+        type: 'nodebuffer',
+        compression: 'DEFLATE',
+      }),
+    )
+
+    await injectRequirements(requirementsPath, packagePath, '.', {}, archives)
+
+    const injected = await JSZip.loadAsync(fse.readFileSync(packagePath))
+    const entries = await Promise.all(
+      Object.values(injected.files)
+        .filter((file) => !file.dir)
+        .map(async (file) => [file.name, await file.async('string')]),
+    )
+    return entries.sort()
+  }
+
+  beforeEach(() => {
+    tmpDir = fse.mkdtempSync(path.join(os.tmpdir(), 'sls-py-inject-'))
+    requirementsPath = path.join(tmpDir, 'requirements')
+    fse.outputFileSync(path.join(requirementsPath, 'six.py'), 'six\n')
+    fse.outputFileSync(path.join(requirementsPath, 'idna/core.py'), 'idna\n')
+  })
+
+  afterEach(() => {
+    fse.removeSync(tmpDir)
+  })
+
+  it('injects the same files when rewriting packages in memory', async () => {
+    const merged = await inject('merged.zip', new Map())
+    // As when the requirements are too many or too large for an archive
+    const rewritten = await inject(
+      'rewritten.zip',
+      new Map([[requirementsPath, Promise.resolve(null)]]),
+    )
+
+    expect(merged).toEqual([
+      ['handler.py', 'def handler(event, context): pass\n'],
+      ['idna/core.py', 'idna\n'],
+      ['six.py', 'six\n'],
+    ])
+    expect(rewritten).toEqual(merged)
+  })
+})
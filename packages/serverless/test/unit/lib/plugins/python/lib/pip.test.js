@@ -0,0 +1,182 @@
+import {
+  jest,
+  describe,
+  beforeEach,
+  afterEach,
+  it,
+  expect,
+} from '@jest/globals'
+import fse from 'fs-extra'
+import os from 'os'
+import path from 'path'
+
+// Installs running at the same time, and the most seen at once
+let running
+let peak
+// Version of Python pythonBin runs
+let pythonVersion
+
+// Stands in for pip, installing the requirements after a delay, unless they
+// include "broken", which fail sooner
+const spawnMock = jest.fn(async (cmd, args) => {
+  if (args[0] === '-c') return { stdoutBuffer: Buffer.from(pythonVersion) }
+  if (!args.includes('-r')) return { stdoutBuffer: Buffer.from('') }
+  const requirements = fse.readFileSync(args[args.indexOf('-r') + 1], 'utf8')
+  const broken = requirements.includes('broken')
+  running += 1
+  peak = Math.max(peak, running)
+  try {
+    await new Promise((resolve) => setTimeout(resolve, broken ? 10 : 20))
+    if (broken) throw new Error('pip failed')
+  } finally {
+    running -= 1
+  }
+  fse.outputFileSync(
+    path.join(args[args.indexOf('--target') + 1], 'installed'),
+    requirements,
+  )
+  return {}
+})
+
+jest.unstable_mockModule('child-process-ext/spawn.js', () => ({
+  default: spawnMock,
+}))
+
+const { installAllRequirements } =
+  await import('../../../../../../lib/plugins/python/lib/pip.js')
+
+describe('installAllRequirements', () => {
+  let servicePath
+  let log
+
+  // Installs the requirements of every module, by module name
+  const install = (requirements, options = {}) => {
+    for (const [module, contents] of Object.entries(requirements)) {
+      fse.outputFileSync(
+        path.join(servicePath, module, 'requirements.txt'),
+        contents,
+      )
+    }
+    return installAllRequirements.call({
+      servicePath,
+      options: {
+        fileName: 'requirements.txt',
+        pythonBin: 'python3',
+        pipCmdExtraArgs: [],
+        noDeploy: [],
+        useStaticCache: false,
+        useDownloadCache: false,
+        strip: false,
+        installConcurrency: 2,
+        ...options,
+      },
+      targetFuncs: Object.keys(requirements).map((module) => ({
+        module,
+        runtime: 'python3.12',
+        package: { individually: true },
+      })),
+      serverless: {
+        cli: { log: () => {} },
+        service: { provider: { runtime: 'python3.12' }, package: {} },
+      },
+      log,
+    })
+  }
+
+  const installs = () =>
+    spawnMock.mock.calls.filter(([, args]) => args.includes('-r')).length
+
+  const installed = (module) =>
+    path.join(servicePath, '.serverless', module, 'requirements', 'installed')
+
+  beforeEach(() => {
+    spawnMock.mockClear()
+    running = 0
+    peak = 0
+    pythonVersion = '3.12\n'
+    log = { info: jest.fn(), warning: jest.fn(), error: jest.fn() }
+    servicePath = fse.mkdtempSync(path.join(os.tmpdir(), 'sls-py-pip-'))
+  })
+
+  afterEach(() => {
+    fse.removeSync(servicePath)
+  })
+
+  it('installs identical requirements once', async () => {
+    await install({
+      first: 'requests==2.32.3\n',
+      second: 'requests==2.32.3\n',
+      third: 'boto3==1.35.0\n',
+    })
+
+    expect(installs()).toBe(2)
+    for (const module of ['first', 'second', 'third']) {
+      expect(fse.existsSync(installed(module))).toBe(true)
+    }
+    expect(fse.readFileSync(installed('second'), 'utf8')).toContain(
+      'requests==2.32.3',
+    )
+  })
+
+  it('caps the number of concurrent installs', async () => {
+    await install(
+      {
+        first: 'a==1\n',
+        second: 'b==1\n',
+        third: 'c==1\n',
+        fourth: 'd==1\n',
+      },
+      { installConcurrency: 2 },
+    )
+
+    expect(installs()).toBe(4)
+    expect(peak).toBe(2)
+  })
+
+  it('skips the installs not started once one failed', async () => {
+    await expect(
+      install({
+        first: 'broken==1\n',
+        second: 'b==1\n',
+        third: 'c==1\n',
+        fourth: 'd==1\n',
+      }),
+    ).rejects.toThrow('pip failed')
+
+    expect(running).toBe(0)
+    expect(installs()).toBe(2)
+    expect(fse.existsSync(installed('second'))).toBe(true)
+    expect(fse.existsSync(installed('third'))).toBe(false)
+  })
+  describe('with compileBytecode', () => {
+    const compiles = () =>
+      spawnMock.mock.calls.filter(([, args]) => args.includes('compileall'))
+
+    it('compiles the requirements with the Python of the runtime', async () => {
+      await install({ first: 'a==1\n' }, { compileBytecode: true })
+
+      expect(compiles()).toEqual([
+        [
+          'python3',
+          expect.arrayContaining([
+            path.join(servicePath, '.serverless', 'first', 'requirements'),
+          ]),
+        ],
+      ])
+      expect(log.warning).not.toHaveBeenCalled()
+    })
+
+    it('skips compiling with another version of Python', async () => {
+      pythonVersion = '3.11\n'
+
+      await install({ first: 'a==1\n' }, { compileBytecode: true })
+
+      expect(compiles()).toEqual([])
+      expect(log.warning).toHaveBeenCalledWith(
+        expect.stringContaining(
+          'Skipping compileBytecode for module "first", as python3 is not Python 3.12 like the runtime but 3.11',
+        ),
+      )
+    })
+  })
+})
@@ -0,0 +1,246 @@
+import { describe, beforeEach, afterEach, it, expect } from '@jest/globals'
+import { spawnSync } from 'child_process'
+import fse from 'fs-extra'
+import os from 'os'
+import path from 'path'
+import { fileURLToPath } from 'url'
+
+const { bytecodeSource, shakeRequirements } =
+  await import('../../../../../../lib/plugins/python/lib/treeShake.js')
+
+const pythonBin = process.platform === 'win32' ? 'python' : 'python3'
+
+const unzipRequirementsPath = fileURLToPath(
+  new URL(
+    '../../../../../../lib/plugins/python/unzip_requirements.py',
+    import.meta.url,
+  ),
+)
+
+// A shared library to load with ctypes, which only the memory map of the
+// process reports, as no audit event records the file it opens
+const sharedLibrary = (() => {
+  if (process.platform !== 'linux') return null
+  const { status, stdout } = spawnSync(
+    pythonBin,
+    ['-c', 'import _ctypes; print(_ctypes.__file__)'],
+    { encoding: 'utf8' },
+  )
+  return status === 0 ? stdout.trim() : null
+})()
+
+describe('bytecodeSource', () => {
+  it('resolves the module a bytecode file is compiled from', () => {
+    expect(bytecodeSource('idna/__pycache__/core.cpython-312.pyc')).toEqual(
+      'idna/core.py',
+    )
+  })
+
+  it('resolves top-level modules', () => {
+    expect(bytecodeSource('__pycache__/six.cpython-312.pyc')).toEqual('six.py')
+  })
+
+  it('resolves optimized bytecode files', () => {
+    expect(
+      bytecodeSource('yaml/__pycache__/nodes.cpython-312.opt-1.pyc'),
+    ).toEqual('yaml/nodes.py')
+  })
+
+  it('ignores files which are not bytecode', () => {
+    expect(bytecodeSource('idna/core.py')).toBeNull()
+    expect(bytecodeSource('numpy/core/_multiarray_umath.so')).toBeNull()
+  })
+})
+
+const describeOnLinux = sharedLibrary ? describe : describe.skip
+
+describeOnLinux('shakeRequirements', () => {
+  let servicePath
+  let messages
+
+  const requirementsFiles = {
+    'requirements.txt': 'used\n',
+    'used-1.0.dist-info/METADATA': 'Name: used\n',
+    'used/__init__.py': '',
+    'used/__pycache__/__init__.cpython-312.pyc': '',
+    'used/data.json': '{}\n',
+    'used/unused.py': '',
+    'native/__init__.py': [
+      'import ctypes',
+      'import os',
+      '',
+      "ctypes.CDLL(os.path.join(os.path.dirname(__file__), '_native.so'))",
+      '',
+    ].join('\n'),
+    'native/_other.so': '',
+    'unused/__init__.py': '',
+  }
+
+  const shakenFiles = (requirementsPath) =>
+    fse
+      .readdirSync(requirementsPath, { recursive: true })
+      .map((file) => file.replace(/\\/g, '/'))
+      .filter((file) =>
+        fse.statSync(path.join(requirementsPath, file)).isFile(),
+      )
+      .sort()
+
+  const shake = (options = {}) =>
+    shakeRequirements.call({
+      options: {
+        pythonBin,
+        pipCmdExtraArgs: [],
+        treeShake: { events: ['events/*.json'] },
+        ...options,
+      },
+      servicePath,
+      targetFuncs: [{ handler: 'handler.hello' }],
+      serverless: {
+        cli: { log: (message) => messages.push(message) },
+        service: { provider: { runtime: 'python3.12' }, package: {} },
+      },
+    })
+
+  const writeRequirements = (requirementsPath) => {
+    for (const [file, contents] of Object.entries(requirementsFiles)) {
+      fse.outputFileSync(path.join(requirementsPath, file), contents)
+    }
+    fse.copySync(
+      sharedLibrary,
+      path.join(requirementsPath, 'native/_native.so'),
+    )
+  }
+
+  const handlerSource = [
+    'import os',
+    '',
+    'import native',
+    'import used',
+    '',
+    '',
+    'def hello(event, context):',
+    "    with open(os.path.join(os.path.dirname(used.__file__), 'data.json')):",
+    '        return {}',
+    '',
+  ].join('\n')
+
+  const expectedFiles = [
+    'native/__init__.py',
+    'native/_native.so',
+    'requirements.txt',
+    'used-1.0.dist-info/METADATA',
+    'used/__init__.py',
+    'used/__pycache__/__init__.cpython-312.pyc',
+    'used/data.json',
+  ]
+
+  beforeEach(() => {
+    servicePath = fse.mkdtempSync(path.join(os.tmpdir(), 'sls-py-shake-'))
+    messages = []
+    fse.outputFileSync(path.join(servicePath, 'handler.py'), handlerSource)
+    fse.outputJsonSync(path.join(servicePath, 'events/hello.json'), {})
+  })
+
+  afterEach(() => {
+    fse.removeSync(servicePath)
+  })
+
+  it('removes the requirements never loaded by the handler', async () => {
+    const requirementsPath = path.join(
+      servicePath,
+      '.serverless',
+      'requirements',
+    )
+    writeRequirements(requirementsPath)
+
+    await shake()
+
+    expect(shakenFiles(requirementsPath)).toEqual(expectedFiles)
+    expect(fse.existsSync(path.join(requirementsPath, 'unused'))).toBe(false)
+  })
+
+  it('leaves a linked requirements folder whole', async () => {
+    const cachePath = path.join(servicePath, 'cache')
+    writeRequirements(cachePath)
+    const requirementsPath = path.join(
+      servicePath,
+      '.serverless',
+      'requirements',
+    )
+    fse.ensureSymlinkSync(cachePath, requirementsPath)
+
+    await shake()
+
+    expect(fse.lstatSync(requirementsPath).isSymbolicLink()).toBe(false)
+    expect(shakenFiles(requirementsPath)).toEqual(expectedFiles)
+    expect(shakenFiles(cachePath)).toHaveLength(
+      Object.keys(requirementsFiles).length + 1,
+    )
+  })
+  it('traces handlers importing the requirements with the zip option', async () => {
+    const requirementsPath = path.join(
+      servicePath,
+      '.serverless',
+      'requirements',
+    )
+    writeRequirements(requirementsPath)
+    // Not archived yet, so the helper would fail to extract them
+    fse.copySync(
+      unzipRequirementsPath,
+      path.join(servicePath, 'unzip_requirements.py'),
+    )
+    fse.outputFileSync(
+      path.join(servicePath, 'handler.py'),
+      [
+        'try:',
+        '    import unzip_requirements',
+        'except ImportError:',
+        '    pass',
+        handlerSource,
+      ].join('\n'),
+    )
+
+    await shake()
+
+    expect(shakenFiles(requirementsPath)).toEqual(expectedFiles)
+  })
+
+  it('fails when a handler cannot be traced', async () => {
+    const requirementsPath = path.join(
+      servicePath,
+      '.serverless',
+      'requirements',
+    )
+    writeRequirements(requirementsPath)
+    fse.outputFileSync(path.join(servicePath, 'handler.py'), 'import missing\n')
+
+    await expect(shake()).rejects.toThrow(
+      'Could not trace the files loaded by handler.hello',
+    )
+    expect(shakenFiles(requirementsPath)).toHaveLength(
+      Object.keys(requirementsFiles).length + 1,
+    )
+  })
+
+  it('skips requirements built for another platform', async () => {
+    const requirementsPath = path.join(
+      servicePath,
+      '.serverless',
+      'requirements',
+    )
+    writeRequirements(requirementsPath)
+
+    await shake({ dockerizePip: true })
+    await shake({
+      pipCmdExtraArgs: ['--platform', 'manylinux2014_aarch64'],
+    })
+
+    expect(shakenFiles(requirementsPath)).toHaveLength(
+      Object.keys(requirementsFiles).length + 1,
+    )
+    expect(messages).toEqual([
+      'WARNING: Skipping treeShake, as the requirements are built for another platform with dockerizePip',
+      'WARNING: Skipping treeShake, as the requirements are built for another platform with --platform',
+    ])
+  })
+})
@@ -5,6 +5,8 @@ jest.unstable_mockModule('fs-extra', () => ({
   default: {
     copy: jest.fn(async () => {}),
     remove: jest.fn(async () => {}),
+    readFile: jest.fn(async () => "import os\n\nMODE = 'extract'\n"),
+    outputFile: jest.fn(async () => {}),
   },
 }))
 
@@ -65,6 +67,20 @@ describe('python zip helpers', () => {
         path.join('/', 'service', 'module2', 'unzip_requirements.py'),
       ])
     })
+
+    it('sets the mode of the helper in lazy mode', async () => {
+      context.options.zip = 'lazy'
+
+      await addVendorHelper.call(context)
+
+      expect(fse.copy).not.toHaveBeenCalled()
+      expect(fse.outputFile).toHaveBeenCalledTimes(2)
+      const [destination, helper] = fse.outputFile.mock.calls[0]
+      expect(destination).toEqual(
+        path.join('/', 'service', 'module1', 'unzip_requirements.py'),
+      )
+      expect(helper).toEqual('import os\n\nMODE = "lazy"\n')
+    })
   })
 
   describe('removeVendorHelper', () => {
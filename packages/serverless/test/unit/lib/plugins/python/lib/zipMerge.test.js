@@ -0,0 +1,210 @@
+import { describe, beforeEach, afterEach, it, expect } from '@jest/globals'
+import fse from 'fs-extra'
+import JSZip from 'jszip'
+import os from 'os'
+import path from 'path'
+import zlib from 'zlib'
+
+const { crc32, mergeRequirementsArchive, writeRequirementsArchive } =
+  await import('../../../../../../lib/plugins/python/lib/zipMerge.js')
+
+describe('crc32', () => {
+  it('computes the CRC-32 of data in parts', () => {
+    const data = Buffer.from('hello world')
+    expect(crc32(data)).toEqual(0x0d4a1185)
+    expect(crc32(data.subarray(5), crc32(data.subarray(0, 5)))).toEqual(
+      0x0d4a1185,
+    )
+  })
+
+  it('computes the CRC-32 without zlib', () => {
+    const zlibCrc32 = zlib.crc32
+    zlib.crc32 = undefined
+    try {
+      expect(crc32(Buffer.from('hello world'))).toEqual(0x0d4a1185)
+    } finally {
+      zlib.crc32 = zlibCrc32
+    }
+  })
+})
+
+/**
+ * Entries listed by the central directory of a zip file, along with the
+ * fields of their local headers
+ */
+function readEntries(data) {
+  const end = data.lastIndexOf(Buffer.from([0x50, 0x4b, 0x05, 0x06]))
+  const entries = []
+  let position = data.readUInt32LE(end + 16)
+  for (let i = 0; i < data.readUInt16LE(end + 10); i++) {
+    const nameLength = data.readUInt16LE(position + 28)
+    const localOffset = data.readUInt32LE(position + 42)
+    entries.push({
+      name: data.toString('utf8', position + 46, position + 46 + nameLength),
+      flags: data.readUInt16LE(position + 8),
+      crc: data.readUInt32LE(position + 16),
+      compressedSize: data.readUInt32LE(position + 20),
+      localFlags: data.readUInt16LE(localOffset + 6),
+      localCrc: data.readUInt32LE(localOffset + 14),
+      localCompressedSize: data.readUInt32LE(localOffset + 18),
+    })
+    position +=
+      46 +
+      nameLength +
+      data.readUInt16LE(position + 30) +
+      data.readUInt16LE(position + 32)
+  }
+  return entries
+}
+
+describe('mergeRequirementsArchive', () => {
+  let tmpDir
+
+  const writePackage = async (files, options) => {
+    const packagePath = path.join(tmpDir, 'package.zip')
+    const packageZip = new JSZip()
+    for (const [name, contents] of Object.entries(files)) {
+      packageZip.file(name, contents)
+    }
+    fse.writeFileSync(
+      packagePath,
+      await packageZip.generateAsync({
+        type: 'nodebuffer',
+        compression: 'DEFLATE',
+        ...options,
+      }),
+    )
+    return packagePath
+  }
+
+  const writeArchive = async (files) => {
+    const archivePath = path.join(tmpDir, 'requirements.zip')
+    const pairs = Object.entries(files).map(([name, contents]) => {
+      fse.outputFileSync(path.join(tmpDir, 'req', name), contents)
+      return [path.join(tmpDir, 'req', name), name]
+    })
+    expect(await writeRequirementsArchive(pairs, archivePath)).toBe(true)
+    return archivePath
+  }
+
+  beforeEach(() => {
+    tmpDir = fse.mkdtempSync(path.join(os.tmpdir(), 'sls-py-zip-'))
+  })
+
+  afterEach(() => {
+    fse.removeSync(tmpDir)
+  })
+
+  it('merges the requirements into a package', async () => {
+    const packagePath = path.join(tmpDir, 'package.zip')
+    const packageZip = new JSZip()
+    packageZip.file('handler.py', 'def handler(event, context): pass\n')
+    packageZip.file('six.py', 'outdated\n')
+    fse.writeFileSync(
+      packagePath,
+      await packageZip.generateAsync({
+        type: 'nodebuffer',
+        compression: 'DEFLATE',
+      }),
+    )
+
+    fse.outputFileSync(path.join(tmpDir, 'req/six.py'), 'six\n')
+    fse.outputFileSync(path.join(tmpDir, 'req/idna/core.py'), 'idna\n')
+    const archivePath = path.join(tmpDir, 'requirements.zip')
+    expect(
+      await writeRequirementsArchive(
+        [
+          [path.join(tmpDir, 'req/six.py'), 'six.py'],
+          [path.join(tmpDir, 'req/idna/core.py'), 'idna/core.py'],
+        ],
+        archivePath,
+      ),
+    ).toBe(true)
+
+    expect(await mergeRequirementsArchive(packagePath, archivePath)).toBe(true)
+
+    const merged = await JSZip.loadAsync(fse.readFileSync(packagePath))
+    expect(Object.keys(merged.files).sort()).toEqual([
+      'handler.py',
+      'idna/core.py',
+      'six.py',
+    ])
+    expect(await merged.file('six.py').async('string')).toEqual('six\n')
+    expect(await merged.file('handler.py').async('string')).toEqual(
+      'def handler(event, context): pass\n',
+    )
+    expect(fse.existsSync(`${packagePath}.tmp`)).toBe(false)
+  })
+  it('rewrites the headers of entries with data descriptors', async () => {
+    const packagePath = await writePackage(
+      { 'handler.py': 'def handler(event, context): pass\n' },
+      // Sizes and CRC-32 are then written after the data of the entries
+      { streamFiles: true },
+    )
+    expect(
+      readEntries(fse.readFileSync(packagePath))[0].flags & 0x8,
+    ).not.toEqual(0)
+    const archivePath = await writeArchive({ 'six.py': 'six\n' })
+
+    expect(await mergeRequirementsArchive(packagePath, archivePath)).toBe(true)
+
+    const data = fse.readFileSync(packagePath)
+    const entries = readEntries(data)
+    expect(entries.map(({ name }) => name)).toEqual(['handler.py', 'six.py'])
+    for (const entry of entries) {
+      expect(entry.flags & 0x8).toEqual(0)
+      expect(entry.localFlags).toEqual(entry.flags)
+      expect(entry.localCrc).toEqual(entry.crc)
+      expect(entry.localCompressedSize).toEqual(entry.compressedSize)
+    }
+    const merged = await JSZip.loadAsync(data)
+    expect(await merged.file('handler.py').async('string')).toEqual(
+      'def handler(event, context): pass\n',
+    )
+  })
+
+  it('replaces the entries of the package also in the requirements', async () => {
+    const packagePath = await writePackage({
+      'handler.py': 'def handler(event, context): pass\n',
+      'six.py': 'outdated\n',
+    })
+    const archivePath = await writeArchive({
+      'six.py': 'six\n',
+      'idna.py': 'idna\n',
+    })
+
+    expect(await mergeRequirementsArchive(packagePath, archivePath)).toBe(true)
+
+    const data = fse.readFileSync(packagePath)
+    expect(readEntries(data).map(({ name }) => name)).toEqual([
+      'handler.py',
+      'six.py',
+      'idna.py',
+    ])
+    const merged = await JSZip.loadAsync(data)
+    expect(await merged.file('six.py').async('string')).toEqual('six\n')
+  })
+
+  it('leaves packages needing ZIP64 as they are', async () => {
+    const archivePath = await writeArchive({ 'six.py': 'six\n' })
+    // Fields of the end of central directory record set to their maximum
+    // value are found in the ZIP64 record instead
+    for (const [field, write] of [
+      [10, (data, position) => data.writeUInt16LE(0xffff, position)],
+      [16, (data, position) => data.writeUInt32LE(0xffffffff, position)],
+    ]) {
+      const packagePath = await writePackage({
+        'handler.py': 'def handler(event, context): pass\n',
+      })
+      const data = fse.readFileSync(packagePath)
+      write(data, data.length - 22 + field)
+      fse.writeFileSync(packagePath, data)
+
+      expect(await mergeRequirementsArchive(packagePath, archivePath)).toBe(
+        false,
+      )
+      expect(fse.readFileSync(packagePath).equals(data)).toBe(true)
+      expect(fse.existsSync(`${packagePath}.tmp`)).toBe(false)
+    }
+  })
+})
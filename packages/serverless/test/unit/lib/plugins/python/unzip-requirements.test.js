@@ -0,0 +1,247 @@
+import { describe, beforeEach, afterEach, it, expect } from '@jest/globals'
+import { spawnSync } from 'child_process'
+import crypto from 'crypto'
+import fs from 'fs'
+import os from 'os'
+import path from 'path'
+import { fileURLToPath } from 'url'
+
+const helperPath = fileURLToPath(
+  new URL(
+    '../../../../../lib/plugins/python/unzip_requirements.py',
+    import.meta.url,
+  ),
+)
+
+const pythonBin = process.platform === 'win32' ? 'python' : 'python3'
+
+// A native extension module, to vendor in a package which cannot be imported
+// from the archive
+const extensionPath = (() => {
+  const { status, stdout } = spawnSync(
+    pythonBin,
+    ['-c', 'import _bisect; print(_bisect.__file__)'],
+    { encoding: 'utf8' },
+  )
+  return status === 0 ? stdout.trim() : null
+})()
+
+// Writes the archive with python, as the Lambda runtime reads it
+const writeArchive = `import json
+import sys
+import zipfile
+
+spec = json.load(sys.stdin)
+with zipfile.ZipFile(spec['path'], 'w', zipfile.ZIP_DEFLATED) as archive:
+    for name, content in spec['members'].items():
+        archive.writestr(name, content)
+    for name, source in spec['files'].items():
+        archive.write(source, name)
+`
+
+const describeWithExtension = extensionPath ? describe : describe.skip
+
+describeWithExtension('unzip_requirements', () => {
+  let servicePath
+  let tempPath
+
+  const members = {
+    'pure/__init__.py': 'VALUE = 1\n',
+    'pure-1.0.dist-info/METADATA': 'Name: pure\n',
+    'native/__init__.py': 'from . import _bisect as extension\n',
+    'pure/tests/__init__.py': '',
+    'pure/tests/test_pure.py': 'from pure import VALUE\n',
+    // Enough members of different sizes to spread across threads
+    ...Object.fromEntries(
+      Array.from({ length: 16 }, (_, index) => [
+        `data/chunk-${index}.txt`,
+        `${index}\n`.repeat(4096 * (index + 1)),
+      ]),
+    ),
+  }
+
+  const digest = (content) =>
+    crypto.createHash('sha256').update(content).digest('hex')
+
+  const createArchive = (archiveMembers = members) => {
+    const { status, stderr } = spawnSync(pythonBin, ['-c', writeArchive], {
+      input: JSON.stringify({
+        path: path.join(servicePath, '.requirements.zip'),
+        members: archiveMembers,
+        files: {
+          [`native/${path.basename(extensionPath)}`]: extensionPath,
+        },
+      }),
+      encoding: 'utf8',
+    })
+    expect(stderr).toBe('')
+    expect(status).toBe(0)
+  }
+
+  beforeEach(() => {
+    servicePath = fs.mkdtempSync(path.join(os.tmpdir(), 'sls-py-unzip-'))
+    tempPath = path.join(servicePath, 'tmp')
+    fs.mkdirSync(tempPath)
+    createArchive()
+  })
+
+  afterEach(() => {
+    fs.rmSync(servicePath, { recursive: true, force: true })
+  })
+
+  // Runs `script` after importing the helper, with its settings replaced as
+  // when packaging, and returns what it printed as JSON
+  const runHelper = (script, settings = {}) => {
+    let helper = fs.readFileSync(helperPath, 'utf8')
+    for (const [name, value] of Object.entries(settings)) {
+      helper = helper.replace(
+        new RegExp(`^${name} = .*$`, 'm'),
+        `${name} = ${JSON.stringify(value)}`,
+      )
+    }
+    fs.writeFileSync(path.join(servicePath, 'unzip_requirements.py'), helper)
+    const { status, stdout, stderr } = spawnSync(
+      pythonBin,
+      ['-c', `import json\nimport os\nimport unzip_requirements\n${script}`],
+      {
+        cwd: servicePath,
+        env: { ...process.env, IS_LOCAL: 'true', TMPDIR: tempPath },
+        encoding: 'utf8',
+      },
+    )
+    expect(stderr).toBe('')
+    expect(status).toBe(0)
+    return JSON.parse(stdout)
+  }
+
+  describe('lazy mode', () => {
+    it('imports pure packages from the archive', () => {
+      const result = runHelper(
+        `import pure
+print(json.dumps({
+    'file': pure.__file__,
+    'extracted': os.listdir(unzip_requirements.requirements_dir),
+}))`,
+        { MODE: 'lazy' },
+      )
+
+      expect(result).toEqual({
+        file: path.join(servicePath, '.requirements.zip', 'pure/__init__.py'),
+        extracted: [],
+      })
+    })
+
+    it('extracts packages with native extensions on first import', () => {
+      const result = runHelper(
+        `before = os.listdir(unzip_requirements.requirements_dir)
+import native
+print(json.dumps({
+    'before': before,
+    'after': os.listdir(unzip_requirements.requirements_dir),
+    'directory': unzip_requirements.requirements_dir,
+    'file': native.extension.__file__,
+    'bisect': native.extension.bisect_left([1, 2, 3], 2),
+}))`,
+        { MODE: 'lazy' },
+      )
+
+      expect(result.directory).toMatch(
+        new RegExp(`^${tempPath}/sls-py-req-[0-9a-f]{16}$`),
+      )
+      expect(result).toMatchObject({
+        before: [],
+        after: ['native'],
+        file: path.join(
+          result.directory,
+          'native',
+          path.basename(extensionPath),
+        ),
+        bisect: 1,
+      })
+    })
+  })
+  describe('extract mode', () => {
+    it('extracts every member but the excluded ones', () => {
+      // Extracted again with several threads, whatever the number of CPUs
+      const result = runHelper(
+        `import hashlib
+
+
+def digests(root):
+    result = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as member:
+                digest = hashlib.sha256(member.read()).hexdigest()
+            result[os.path.relpath(path, root).replace(os.sep, '/')] = digest
+    return result
+
+
+os.cpu_count = lambda: 4
+unzip_requirements.extract(unzip_requirements.zip_requirements, 'threaded')
+print(json.dumps({
+    'default': digests(unzip_requirements.requirements_dir),
+    'threaded': digests('threaded'),
+}))`,
+        { EXCLUDE: ['*/tests/*'] },
+      )
+
+      const expected = {
+        ...Object.fromEntries(
+          Object.entries(members)
+            .filter(([name]) => !name.includes('/tests/'))
+            .map(([name, content]) => [name, digest(content)]),
+        ),
+        [`native/${path.basename(extensionPath)}`]: digest(
+          fs.readFileSync(extensionPath),
+        ),
+      }
+      expect(result).toEqual({ default: expected, threaded: expected })
+    })
+  })
+  describe('extraction directory', () => {
+    const importPure = `import pure
+print(json.dumps({
+    'directory': unzip_requirements.requirements_dir,
+    'value': pure.VALUE,
+}))`
+
+    it('reuses the extraction of the same archive', () => {
+      const { directory } = runHelper(importPure)
+      fs.writeFileSync(path.join(directory, 'marker'), '')
+
+      expect(runHelper(importPure)).toEqual({ directory, value: 1 })
+      expect(fs.existsSync(path.join(directory, 'marker'))).toBe(true)
+    })
+
+    it('extracts a changed archive again', () => {
+      const { directory } = runHelper(importPure)
+      createArchive({ ...members, 'pure/__init__.py': 'VALUE = 2\n' })
+
+      const result = runHelper(importPure)
+
+      expect(result.directory).not.toBe(directory)
+      expect(result.value).toBe(2)
+    })
+
+    it('removes the directories of other archives', () => {
+      const { directory } = runHelper(importPure)
+      // Another archive, and an extraction of this one which was interrupted
+      const stale = path.join(tempPath, 'sls-py-req-0123456789abcdef')
+      fs.mkdirSync(stale)
+      fs.writeFileSync(`${stale}.lock`, '')
+      fs.mkdirSync(`${directory}.tmp-1`)
+      createArchive({ ...members, 'pure/__init__.py': 'VALUE = 2\n' })
+
+      const result = runHelper(importPure)
+
+      expect(
+        fs
+          .readdirSync(tempPath)
+          .filter((entry) => !entry.endsWith('.lock'))
+          .map((entry) => path.join(tempPath, entry)),
+      ).toEqual([result.directory])
+    })
+  })
+})